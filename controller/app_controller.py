@@ -19,8 +19,7 @@ class AppController:
     def __init__(self, kb: KnowledgeBase, ui: BaseUI):
         self.kb = kb
         self.ui = ui
-        #self.wm = None
-        self.wm = WorkingMemory(self.kb)
+        self.wm = WorkingMemory(self.kb)  # partagée par les services : une seule mémoire de travail par session
         
         self.um = UserManager(self.kb) # self.um = UserManager(self.kb, self.wm)
 
@@ -38,7 +37,6 @@ class AppController:
         user_id, username, role = self.um.login(self.ui)
         self.user_id = user_id  # Store for commands
         self.role = role
-        self.wm = WorkingMemory(self.kb)
         # choices = ["0","1","2","3","4","5","6","7","8","9","10","11","12","13","14","15"]
         # if role == 'admin':
         #    choices += ["20", "21"]
@@ -90,7 +88,7 @@ class AppController:
         elif choice_num == "3":  
             name_q = Question("input", "class_name", "Nom de la classe")
             answer = self.ui.ask_question(name_q)
-            parent_q = Question("choice", "parent", "Parent (optional)", choices=self.kb.get_all_class_names())
+            parent_q = Question("choice", "parent", "Parent (optional)", choices=self.wm.overlay.class_names())
             parent_answer = self.ui.ask_question(parent_q)
             cmd = Command("add_class", parameters={"name": answer.value, "parent": parent_answer.value}, actor=self.user_id)
             # For add_class (already using WM)
@@ -104,7 +102,7 @@ class AppController:
             answer = self.ui.ask_question(name_q)
             type_q = Question("choice", "type", "Type de propriété", choices=["string", "int", "float", "bool"])
             type_answer = self.ui.ask_question(type_q)
-            class_q = Question("choice", "class_name", "Attacher à classe (optional)", choices=self.kb.get_all_class_names())
+            class_q = Question("choice", "class_name", "Attacher à classe (optional)", choices=self.wm.overlay.class_names())
             class_answer = self.ui.ask_question(class_q)
             cmd = Command("add_property", parameters={"name": answer.value, "type": type_answer.value, "class_name": class_answer.value}, actor=self.user_id)
             # Similar for property and instance
@@ -119,7 +117,7 @@ class AppController:
             #if not answer.value:
             #    return
 
-            class_q = Question("choice", "class_name", "Classe associée", choices=self.kb.get_all_class_names())
+            class_q = Question("choice", "class_name", "Classe associée", choices=self.wm.overlay.class_names())
             class_answer = self.ui.ask_question(class_q)
             # class_name = class_answer.value.strip() if class_answer.value else None
             #if not class_name:
@@ -178,7 +176,8 @@ class AppController:
                 return
 
             cmd = Command("modify_instance", parameters={"name": answer.value, "class_name": class_answer.value, "new_name": new_name}, actor=self.user_id)
-            event = self.instance_service.handle_command(cmd)
+            with self.kb.transaction():  # écritures de la commande validées ensemble
+                event = self.instance_service.handle_command(cmd)
             self.ui.handle_event(event)
 
         # "10: Supprimer propriété"
@@ -214,7 +213,8 @@ class AppController:
                 return
 
             cmd = Command("delete_instance", parameters={"name": answer.value, "class_name": class_answer.value}, actor=self.user_id)
-            event = self.instance_service.handle_command(cmd)
+            with self.kb.transaction():  # écritures de la commande validées ensemble
+                event = self.instance_service.handle_command(cmd)
             self.ui.handle_event(event)
 
 
@@ -250,7 +250,8 @@ class AppController:
                 return
 
             cmd = Command("modify_value", parameters={"inst_name": inst_answer.value, "class_name": class_answer.value, "prop_name": prop_answer.value, "new_value": value_answer.value}, actor=self.user_id)
-            event = self.instance_service.handle_command(cmd)
+            with self.kb.transaction():  # écritures de la commande validées ensemble
+                event = self.instance_service.handle_command(cmd)
             self.ui.handle_event(event)
         
         # "17 : Supprimer valeur"
@@ -275,7 +276,8 @@ class AppController:
                 return
 
             cmd = Command("delete_value", parameters={"inst_name": inst_answer.value, "class_name": class_answer.value, "prop_name": prop_answer.value}, actor=self.user_id)
-            event = self.instance_service.handle_command(cmd)
+            with self.kb.transaction():  # écritures de la commande validées ensemble
+                event = self.instance_service.handle_command(cmd)
             self.ui.handle_event(event)
 
         #"18: Afficher valeurs instance"
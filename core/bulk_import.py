@@ -0,0 +1,75 @@
+# core/bulk_import.py
+"""
+Import en masse (exports usine) -> KnowledgeBase.bulk_load
+
+Formats streamés (lecture ligne par ligne, mémoire constante) :
+    CSV         : colonnes class, instance, [parent], puis une colonne par propriété
+    JSON-lines  : un objet par ligne {"class": ..., "instance": ..., "values": {...}}
+
+Usage :
+    python -m core.bulk_import exports/moteurs.csv
+    python -m core.bulk_import exports/moteurs.jsonl --db data/XXpert.db --chunk 5000
+"""
+import argparse
+import csv
+import json
+import sys
+
+from rich.console import Console
+
+from core.connection import PROFILES
+from core.database import KnowledgeBase, DB_FILE
+
+console = Console()
+
+
+def iter_csv(path, delimiter=","):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+
+def iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(path, fmt=None, delimiter=","):
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt == "csv":
+        return iter_csv(path, delimiter)
+    return iter_jsonl(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import en masse de classes / instances / valeurs")
+    parser.add_argument("path", help="Fichier CSV ou JSON-lines")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="Déduit de l'extension par défaut")
+    parser.add_argument("--delimiter", default=",", help="Séparateur CSV")
+    parser.add_argument("--db", default=DB_FILE, help="Base SQLite cible")
+    parser.add_argument("--chunk", type=int, default=1000, help="Lignes par executemany")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="bulk_load", help="Preset PRAGMA pendant l'import")
+    args = parser.parse_args(argv)
+
+    kb = KnowledgeBase(args.db)
+    try:
+        with kb.use_profile(args.profile):
+            report = kb.bulk_load(iter_records(args.path, args.format, args.delimiter), chunk_size=args.chunk)
+    finally:
+        kb.close()
+
+    console.print(f"[green]{report['rows']} lignes[/] importées en {report['elapsed']:.2f} s "
+                  f"([bold]{report['rows_per_s']:.0f} lignes/s[/])")
+    console.print(f"  classes créées : {report['classes']} — instances : {report['instances']} — "
+                  f"valeurs : {report['values']} — propriétés inconnues ignorées : {report['skipped']}")
+    for row_num, message in report["errors"][:20]:
+        console.print(f"  [red]ligne {row_num}[/] : {message}")
+    if len(report["errors"]) > 20:
+        console.print(f"  [red]... {len(report['errors']) - 20} autres erreurs[/]")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
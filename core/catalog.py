@@ -0,0 +1,166 @@
+# core/catalog.py
+"""
+Catalogue en mémoire des noms -> ids (classes, propriétés, types)
+Responsabilité : éviter les scans `WHERE LOWER(name) = LOWER(?)` répétés.
+
+Les maps sont chargées paresseusement au premier accès puis conservées
+jusqu'à invalidation explicite par les méthodes qui modifient `seclass`,
+`seprop` (add_class, move_class, add_property, modify_property, delete_property)
+ou `seclass_prop` (link / attach_property_to_class, bulk_load, fusion de soumissions).
+"""
+from contextlib import nullcontext
+from typing import Callable, Optional, List, Dict, Set, Tuple
+
+from core.codecs import Codec, get_codec
+
+
+class CatalogCache:
+    """Cache nom -> id pour les classes et nom -> (id, type) pour les propriétés"""
+
+    def __init__(self, conn, reading: Optional[Callable] = None):
+        """reading : fabrique de context manager -> connexion (ex. kb._reading), sinon conn"""
+        self.conn = conn
+        self._reading = reading or (lambda: nullcontext(conn))
+        self._classes: Optional[Dict[str, int]] = None
+        self._class_names: Optional[List[str]] = None
+        self._props: Optional[Dict[str, Tuple[int, str]]] = None
+        self._props_by_id: Optional[Dict[int, Tuple[str, str]]] = None
+        self._prop_codecs: Optional[Dict[str, Optional[Codec]]] = None
+        self._prop_names: Optional[List[str]] = None
+        self._hierarchy: Optional[List[Tuple[int, str, Optional[int], int]]] = None
+        self._parents: Optional[Dict[int, Optional[int]]] = None
+        self._class_props: Optional[Dict[int, Set[int]]] = None  # class_id -> prop_ids liés directement
+
+    # ========== CHARGEMENT ==========
+
+    def _load_classes(self):
+        # Cursor dédié : ne jamais écraser le résultat en cours du cursor partagé
+        with self._reading() as conn:
+            rows = conn.execute("SELECT id, name, parent_id FROM seclass ORDER BY id").fetchall()
+        classes = {}
+        for cid, name, _ in rows:
+            # Comme fetchone() sur un scan : le plus petit id gagne en cas de doublon de casse
+            classes.setdefault(name.lower(), cid)
+        self._classes = classes
+        self._class_names = sorted(name for _, name, _ in rows)
+        self._parents = {cid: parent_id for cid, _, parent_id in rows}
+
+    def _load_properties(self):
+        with self._reading() as conn:
+            rows = conn.execute("SELECT id, name, type FROM seprop ORDER BY id").fetchall()
+        props = {}
+        for pid, name, ptype in rows:
+            props.setdefault(name.lower(), (pid, ptype))
+        self._props = props
+        self._prop_codecs = {key: get_codec(ptype) for key, (_, ptype) in props.items()}
+        self._props_by_id = {pid: (name, ptype) for pid, name, ptype in rows}
+        self._prop_names = sorted(name for _, name, _ in rows)
+
+    # ========== CLASSES ==========
+
+    def class_id(self, name) -> Optional[int]:
+        if not isinstance(name, str):
+            return None
+        if self._classes is None:
+            self._load_classes()
+        return self._classes.get(name.strip().lower())
+
+    def class_names(self) -> List[str]:
+        if self._class_names is None:
+            self._load_classes()
+        return list(self._class_names)
+
+    def hierarchy(self) -> List[Tuple[int, str, Optional[int], int]]:
+        """(id, name, parent_id, level) triés par niveau puis nom — level = profondeur max dans seclass_closure"""
+        if self._hierarchy is None:
+            with self._reading() as conn:
+                self._hierarchy = conn.execute("""
+                    SELECT c.id, c.name, c.parent_id, MAX(cc.depth) AS level
+                    FROM seclass c JOIN seclass_closure cc ON cc.descendant_id = c.id
+                    GROUP BY c.id
+                    ORDER BY level, c.name
+                """).fetchall()
+        return list(self._hierarchy)
+
+    # ========== PROPRIÉTÉS ==========
+
+    def property(self, name) -> Optional[Tuple[int, str]]:
+        """Retourne (id, type) ou None"""
+        if not isinstance(name, str):
+            return None
+        if self._props is None:
+            self._load_properties()
+        return self._props.get(name.strip().lower())
+
+    def property_id(self, name) -> Optional[int]:
+        entry = self.property(name)
+        return entry[0] if entry else None
+
+    def property_type(self, name) -> Optional[str]:
+        entry = self.property(name)
+        return entry[1] if entry else None
+
+    def property_codec(self, name) -> Optional[Codec]:
+        """Codec du type de la propriété, résolu une fois au chargement"""
+        if not isinstance(name, str):
+            return None
+        if self._prop_codecs is None:
+            self._load_properties()
+        return self._prop_codecs.get(name.strip().lower())
+
+    def property_type_by_id(self, prop_id) -> Optional[str]:
+        if self._props_by_id is None:
+            self._load_properties()
+        entry = self._props_by_id.get(prop_id)
+        return entry[1] if entry else None
+
+    def property_names(self) -> List[str]:
+        if self._prop_names is None:
+            self._load_properties()
+        return list(self._prop_names)
+
+    # ========== LIENS CLASSE -> PROPRIÉTÉS ==========
+
+    def class_property_names(self, class_id, inherited=True) -> List[str]:
+        """Noms triés des propriétés de la classe (héritées comprises), sans requête une fois chargé"""
+        if self._class_props is None:
+            links = {}
+            with self._reading() as conn:
+                rows = conn.execute("SELECT class_id, prop_id FROM seclass_prop").fetchall()
+            for c_id, p_id in rows:
+                links.setdefault(c_id, set()).add(p_id)
+            self._class_props = links
+        if self._parents is None:
+            self._load_classes()
+        if self._props_by_id is None:
+            self._load_properties()
+
+        prop_ids, seen = set(), set()
+        while class_id is not None and class_id not in seen:  # remonte parent_id (même chemin que seclass_closure)
+            seen.add(class_id)
+            prop_ids |= self._class_props.get(class_id, set())
+            class_id = self._parents.get(class_id) if inherited else None
+        return sorted(self._props_by_id[p_id][0] for p_id in prop_ids if p_id in self._props_by_id)
+
+    # ========== INVALIDATION ==========
+
+    def invalidate_classes(self):
+        self._classes = None
+        self._class_names = None
+        self._hierarchy = None
+        self._parents = None
+        self._class_props = None
+
+    def invalidate_properties(self):
+        self._props = None
+        self._props_by_id = None
+        self._prop_codecs = None
+        self._prop_names = None
+        self._class_props = None
+
+    def invalidate_links(self):
+        self._class_props = None
+
+    def invalidate(self):
+        self.invalidate_classes()
+        self.invalidate_properties()
@@ -0,0 +1,64 @@
+# core/classification.py
+"""
+Classement LL / L / M / H / HH de toute une classe en une opération NumPy
+
+    report = kb.classify_class("Moteur")
+    report.bands              # int8 (instances x propriétés) : -2 LL, -1 L, 0 M, 1 H, 2 HH, MISSING
+    report.summary()          # {prop: {"LL": n, "L": n, "M": n, "H": n, "HH": n, "missing": n}}
+    report.out_of_band()      # [(instance, prop, "HH", valeur), ...] pour alertes / show_table
+
+Bornes (NaN = seuil absent, jamais franchi) :
+    v < LL -> LL     LL <= v < L -> L     L <= v <= H -> M     H < v <= HH -> H     v > HH -> HH
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+BANDS = {-2: "LL", -1: "L", 0: "M", 1: "H", 2: "HH"}
+MISSING = np.int8(-128)  # pas de valeur pour (instance, propriété)
+
+
+def threshold_matrix(thresholds: Sequence[Dict[str, Optional[float]]]) -> np.ndarray:
+    """[{LL, L, H, HH}, ...] (une entrée par propriété) -> float64 (4 x n_props), None -> NaN"""
+    return np.array([[np.nan if t.get(key) is None else t[key] for t in thresholds]
+                     for key in ("LL", "L", "H", "HH")], dtype=np.float64).reshape(4, len(thresholds))
+
+
+def classify(values: np.ndarray, limits: np.ndarray) -> np.ndarray:
+    """values (n x p, NaN = absent), limits (4 x p) -> codes int8 (n x p)"""
+    ll, l, h, hh = limits[:, np.newaxis, :]  # chaque borne : (1 x p), diffusée sur les lignes
+    with np.errstate(invalid="ignore"):
+        bands = ((values > h).astype(np.int8) + (values > hh) - (values < l) - (values < ll)).astype(np.int8)
+    bands[np.isnan(values)] = MISSING
+    return bands
+
+
+class ClassReport:
+    def __init__(self, class_name, instances: List[str], properties: List[str],
+                 values: np.ndarray, limits: np.ndarray):
+        self.class_name = class_name
+        self.instances = instances
+        self.properties = properties
+        self.values = values
+        self.limits = limits
+        self.bands = classify(values, limits)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        out = {}
+        for j, prop in enumerate(self.properties):
+            column = self.bands[:, j]
+            counts = {label: int(np.count_nonzero(column == code)) for code, label in BANDS.items()}
+            counts["missing"] = int(np.count_nonzero(column == MISSING))
+            out[prop] = counts
+        return out
+
+    def out_of_band(self, min_level: int = 1) -> List[tuple]:
+        """Cellules avec |code| >= min_level (1 : L/H et au-delà, 2 : LL/HH seulement)"""
+        mask = (self.bands != MISSING) & (np.abs(self.bands) >= min_level)
+        rows, cols = np.nonzero(mask)
+        return [(self.instances[i], self.properties[j], BANDS[int(self.bands[i, j])], float(self.values[i, j]))
+                for i, j in zip(rows, cols)]
+
+    def band(self, instance, prop) -> Optional[str]:
+        code = int(self.bands[self.instances.index(instance), self.properties.index(prop)])
+        return BANDS.get(code)  # None si valeur absente
@@ -0,0 +1,214 @@
+# core/codecs.py
+"""
+Registre des codecs de propriétés : type -> (encode, decode, projection numérique)
+
+Chaque codec est résolu une fois par propriété (voir CatalogCache.property_codec)
+au lieu de parcourir une chaîne if/elif à chaque valeur.
+
+    encode(value)   -> (valeur Python normalisée, texte stocké)   ValueError/TypeError si invalide
+    decode(stored)  -> valeur Python, None si le texte est invalide
+    to_number(v)    -> REAL pour la colonne num_value, None si non ordonnable
+
+Ajouter un type (ex. enum) sans toucher à KnowledgeBase :
+
+    register_codec(Codec("enum", coerce=..., dump=str, load=str))
+"""
+import datetime
+import json
+import re
+import urllib.parse
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+class Codec:
+    """Conversion texte <-> valeur Python pour un type de propriété"""
+
+    def __init__(self, name: str, coerce: Callable[[Any], Any], dump: Callable[[Any], str] = str,
+                 load: Callable[[str], Any] = str, to_number: Optional[Callable[[Any], float]] = None):
+        self.name = name
+        self.coerce = coerce        # valeur saisie -> valeur Python validée
+        self.dump = dump            # valeur Python -> texte stocké
+        self.load = load            # texte stocké -> valeur Python
+        self._to_number = to_number
+
+    def encode(self, value) -> Tuple[Any, Optional[str]]:
+        if value is None:
+            return None, None
+        value = self.coerce(value)
+        return value, self.dump(value)
+
+    def decode(self, stored):
+        if stored is None:
+            return None
+        try:
+            return self.load(stored)
+        except (ValueError, TypeError):
+            return None  # Invalid stored value for type
+
+    def to_number(self, value) -> Optional[float]:
+        if value is None or self._to_number is None:
+            return None
+        try:
+            return self._to_number(value)
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+
+_REGISTRY: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    _REGISTRY[codec.name] = codec
+    return codec
+
+
+def get_codec(ptype) -> Optional[Codec]:
+    return _REGISTRY.get(ptype)
+
+
+def codec_names() -> Set[str]:
+    return set(_REGISTRY)
+
+
+# ========== BATCH ==========
+
+def encode_many(ptype, values: Iterable) -> List[Optional[Tuple[Optional[str], Optional[float]]]]:
+    """Colonne de valeurs -> [(texte, num_value)], None pour chaque valeur invalide"""
+    codec = get_codec(ptype)
+    out = []
+    for value in values:
+        if codec is None:
+            out.append(None)
+            continue
+        try:
+            value, stored = codec.encode(value)
+        except (ValueError, TypeError):
+            out.append(None)
+            continue
+        out.append((stored, codec.to_number(value)))
+    return out
+
+
+def decode_many(ptype, stored_values: Iterable) -> List:
+    """Colonne de textes stockés -> valeurs Python (type inconnu : texte brut)"""
+    codec = get_codec(ptype)
+    if codec is None:
+        return list(stored_values)
+    decode = codec.decode
+    return [decode(stored) for stored in stored_values]
+
+
+def stored_number(ptype, stored) -> Optional[float]:
+    """Texte stocké -> num_value (même projection que encode_many, pour migrations et écritures brutes)"""
+    codec = get_codec(ptype)
+    return None if codec is None else codec.to_number(codec.decode(stored))
+
+
+def decode_row(ptypes: Sequence, stored_values: Sequence) -> List:
+    """Ligne (un type par cellule) -> valeurs Python"""
+    out = []
+    for ptype, stored in zip(ptypes, stored_values):
+        codec = get_codec(ptype)
+        out.append(stored if codec is None else codec.decode(stored))
+    return out
+
+
+# ========== CODECS STANDARD ==========
+
+def _require(kind):
+    def coerce(value):
+        if not isinstance(value, kind):
+            raise TypeError(f"{kind} attendu")
+        return value
+    return coerce
+
+
+def _from_iso(kind):
+    def coerce(value):
+        if isinstance(value, str):
+            return kind.fromisoformat(value)
+        if isinstance(value, kind):
+            return value
+        raise TypeError(f"{kind.__name__} attendu")
+    return coerce
+
+
+def _coerce_date(value):
+    value = _from_iso(datetime.date)(value)
+    # datetime est une sous-classe de date : on ne garde que la date
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def _coerce_timedelta(value):
+    if isinstance(value, str):
+        return datetime.timedelta(seconds=float(value))
+    if isinstance(value, datetime.timedelta):
+        return value
+    raise TypeError("timedelta attendu")
+
+
+_LEGACY_TIMEDELTA = re.compile(r"^(?:(-?\d+) days?, )?(\d+):(\d{2}):(\d{2}(?:\.\d+)?)$")
+
+
+def _load_timedelta(stored):
+    try:
+        return datetime.timedelta(seconds=float(stored))
+    except ValueError:
+        # Anciennes lignes stockées via str(timedelta) : "1 day, 2:00:00"
+        match = _LEGACY_TIMEDELTA.match(stored)
+        if not match:
+            raise
+        days, hours, minutes, seconds = match.groups()
+        return datetime.timedelta(days=int(days or 0), hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+
+def _coerce_uuid(value):
+    if isinstance(value, str):
+        return uuid.UUID(value)
+    if isinstance(value, uuid.UUID):
+        return value
+    raise TypeError("uuid attendu")
+
+
+def _coerce_url(value):
+    if not isinstance(value, str):
+        raise TypeError("url attendue")
+    parsed = urllib.parse.urlparse(value)
+    if not parsed.scheme or not parsed.netloc:  # Basic validation: scheme (http/https) and netloc required
+        raise ValueError("url invalide")
+    return value
+
+
+def _timestamp(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def _date_timestamp(value):
+    return datetime.datetime(value.year, value.month, value.day, tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _time_seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+
+
+register_codec(Codec("string", _require(str)))
+register_codec(Codec("bool", _require(bool),
+                     dump=lambda v: "true" if v else "false",
+                     load=lambda s: s.lower() in ("true", "1", "yes"),
+                     to_number=lambda v: 1.0 if v else 0.0))
+register_codec(Codec("int", int, load=int, to_number=float))
+register_codec(Codec("float", float, load=float, to_number=float))
+register_codec(Codec("date", _coerce_date, dump=lambda v: v.isoformat(),
+                     load=datetime.date.fromisoformat, to_number=_date_timestamp))
+register_codec(Codec("datetime", _from_iso(datetime.datetime), dump=lambda v: v.isoformat(),
+                     load=datetime.datetime.fromisoformat, to_number=_timestamp))
+register_codec(Codec("time", _from_iso(datetime.time), dump=lambda v: v.isoformat(),
+                     load=datetime.time.fromisoformat, to_number=_time_seconds))
+register_codec(Codec("json", lambda v: v, dump=json.dumps, load=json.loads))
+register_codec(Codec("timedelta", _coerce_timedelta, dump=lambda v: str(v.total_seconds()),
+                     load=_load_timedelta, to_number=lambda v: v.total_seconds()))
+register_codec(Codec("uuid", _coerce_uuid, load=uuid.UUID))
+register_codec(Codec("url", _coerce_url))
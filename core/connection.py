@@ -0,0 +1,209 @@
+# core/connection.py
+"""
+Gestion des connexions SQLite : un writer + N lecteurs read-only (mode WAL)
+
+- writer   : connexion unique pour toutes les écritures (KnowledgeBase.conn / cursor).
+             Utilisable depuis un autre thread uniquement via `with pool.write() as conn`.
+- lecteurs : connexions `mode=ro` empruntées par `with pool.reader() as conn`.
+             Une connexion n'est jamais utilisée par deux threads en même temps ;
+             en WAL les lectures ne bloquent pas les écritures (et inversement).
+
+Base ":memory:" : pas de WAL ni de lecteurs séparés, tout passe par le writer.
+
+Profils de performance (PRAGMA appliqués à la connexion) :
+
+    KnowledgeBase(db_file, profile="reporting")
+    with kb.use_profile("bulk_load"):
+        kb.bulk_load(records)
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+
+class PerformanceProfile:
+    """Jeu de PRAGMA SQLite + taille du cache de requêtes préparées"""
+
+    PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "foreign_keys")
+
+    def __init__(self, name="custom", journal_mode="WAL", synchronous="NORMAL", cache_size=-16000,
+                 mmap_size=0, temp_store="DEFAULT", foreign_keys=False, cached_statements=128):
+        self.name = name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size            # < 0 : en KiB, > 0 : en pages
+        self.mmap_size = mmap_size              # octets, 0 = pas de mmap
+        self.temp_store = temp_store
+        self.foreign_keys = foreign_keys
+        self.cached_statements = cached_statements  # connect() uniquement, pas modifiable à chaud
+
+    def __repr__(self):
+        return f"PerformanceProfile({self.name!r})"
+
+    def replace(self, **changes):
+        """Copie modifiée : PROFILES["interactive"].replace(cache_size=-64000)"""
+        values = {key: getattr(self, key) for key in self.PRAGMAS + ("name", "cached_statements")}
+        values.update(changes)
+        return PerformanceProfile(**values)
+
+    def apply(self, conn, journal=True):
+        """
+        Applique les PRAGMA à une connexion ouverte.
+        journal=False : on ne touche pas au mode de journal (base :memory:, lecteur read-only,
+        transaction en cours) ; foreign_keys est sans effet dans une transaction (limite SQLite).
+        """
+        for pragma in self.PRAGMAS:
+            if pragma == "journal_mode" and not journal:
+                continue
+            value = getattr(self, pragma)
+            if isinstance(value, bool):
+                value = "ON" if value else "OFF"
+            conn.execute(f"PRAGMA {pragma}={value}")
+
+
+PROFILES = {
+    # Application interactive : durable (WAL + NORMAL)
+    #   foreign_keys reste OFF comme avant les profils : une base existante peut contenir des lignes orphelines
+    #   (activer par PROFILES["interactive"].replace(foreign_keys=True) après PRAGMA foreign_key_check)
+    "interactive": PerformanceProfile("interactive", synchronous="NORMAL", cache_size=-16000,
+                                      mmap_size=64 * 1024 * 1024, temp_store="MEMORY"),
+    # Import en masse : pas de fsync à chaque commit, gros cache, pas de contrôle FK
+    "bulk_load": PerformanceProfile("bulk_load", synchronous="OFF", cache_size=-128000,
+                                    mmap_size=256 * 1024 * 1024, temp_store="MEMORY", foreign_keys=False,
+                                    cached_statements=256),
+    # Rapports en lecture : gros cache et mmap pour les scans, tris temporaires en mémoire
+    "reporting": PerformanceProfile("reporting", synchronous="NORMAL", cache_size=-64000,
+                                    mmap_size=512 * 1024 * 1024, temp_store="MEMORY",
+                                    cached_statements=256),
+}
+
+
+def get_profile(profile=None) -> PerformanceProfile:
+    """None -> "interactive", nom de preset -> PerformanceProfile, instance -> elle-même"""
+    if profile is None:
+        return PROFILES["interactive"]
+    if isinstance(profile, PerformanceProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Profil inconnu : {profile!r} ({', '.join(PROFILES)})") from None
+
+
+def open_readonly(db_file, timeout=5.0, profile=None, check_same_thread=True):
+    """Connexion `mode=ro` + query_only (lecteurs du pool, workers de core/parallel_inference.py)"""
+    if db_file == ":memory:":
+        raise ValueError("Base :memory: : pas de connexion en lecture seule séparée")
+    profile = get_profile(profile)
+    uri = f"file:{pathname2url(os.path.abspath(db_file))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=check_same_thread,
+                           cached_statements=profile.cached_statements)
+    conn.execute("PRAGMA query_only=1")
+    profile.apply(conn, journal=False)
+    return conn
+
+
+class ConnectionManager:
+    """Pool writer / lecteurs pour un fichier SQLite"""
+
+    def __init__(self, db_file, readers=4, timeout=5.0, profile=None):
+        self.db_file = db_file
+        self.timeout = timeout
+        self.memory = db_file == ":memory:"
+        self.profile = get_profile(profile)
+        self.writer = sqlite3.connect(db_file, timeout=timeout, check_same_thread=False,
+                                      cached_statements=self.profile.cached_statements)
+        self.writer_lock = threading.RLock()
+        # Base neuve : auto_vacuum doit précéder le passage en WAL et la première table
+        # (sans effet sur une base existante, voir core/event_archive.ensure_incremental_vacuum)
+        self.writer.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.profile.apply(self.writer, journal=not self.memory)
+        self._reader_profiles = {}  # id(lecteur) -> profil appliqué
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, readers))
+        self._opened = []
+        self._closed = False
+
+    def _open_reader(self):
+        conn = open_readonly(self.db_file, self.timeout, self.profile, check_same_thread=False)
+        self._opened.append(conn)
+        return conn
+
+    def connect(self):
+        """
+        Connexion lecture/écriture supplémentaire (ex. thread du journal d'événements).
+        Appartient à l'appelant, qui la ferme. Indisponible pour ":memory:" (base privée au writer).
+        """
+        if self.memory:
+            raise ValueError("Base :memory: : pas de connexion supplémentaire possible")
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout)
+        self.profile.apply(conn, journal=False)
+        return conn
+
+    def _sync_reader(self, conn):
+        # Un lecteur emprunté prend le profil courant (use_profile change self.profile)
+        if self._reader_profiles.get(id(conn)) is not self.profile:
+            self.profile.apply(conn, journal=False)
+            self._reader_profiles[id(conn)] = self.profile
+
+    @contextmanager
+    def reader(self):
+        """Connexion read-only empruntée pour la durée du bloc (bloque si N lecteurs sont occupés)"""
+        if self.memory:
+            with self.writer_lock:
+                yield self.writer
+            return
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_reader()
+            self._sync_reader(conn)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()  # libère le snapshot WAL
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def write(self):
+        """Accès exclusif au writer depuis un thread quelconque"""
+        with self.writer_lock:
+            yield self.writer
+
+    @contextmanager
+    def use_profile(self, profile):
+        """Bascule temporaire de profil (writer + lecteurs), restauré à la sortie du bloc"""
+        previous = self.profile
+        new = get_profile(profile)
+        with self.writer_lock:
+            self._switch(new, previous)
+        try:
+            yield new
+        finally:
+            with self.writer_lock:
+                self._switch(previous, new)
+
+    def _switch(self, new, current):
+        # journal_mode ne peut pas changer dans une transaction : seulement si nécessaire
+        journal = (not self.memory and not self.writer.in_transaction
+                   and new.journal_mode.lower() != current.journal_mode.lower())
+        new.apply(self.writer, journal=journal)
+        self.profile = new
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for conn in self._opened:
+            conn.close()
+        self._opened.clear()
+        self.writer.commit()
+        self.writer.close()
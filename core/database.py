@@ -1,26 +1,61 @@
 # core/database.py
+import atexit
 import statistics  # Pour median et stdev
 import sqlite3
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
 from rich.panel import Panel
-from core.models.event import Event
-from core.inference import ForwardEngine, BackwardEngine
+from core.models.event import Event, Severity
+from core.inference import ForwardEngine, BackwardEngine, register_default_rules, default_forward_engine
 from core.services.EntityService import EntityService
+from core.catalog import CatalogCache
+from core.stats import RunningStats
+from core.thresholds import ThresholdResolver
+from core.codecs import get_codec, codec_names, decode_many, stored_number
+from core.connection import ConnectionManager
+from core.paging import KeysetQuery
+from core.event_sink import EventSink, event_row
+from core.event_archive import ARCHIVE_DIR, archive_expired_events, ensure_incremental_vacuum, incremental_vacuum
+from core.hierarchy import ensure_closure, closure_insert, closure_move, is_descendant
+from core.workflow.merge import SubmissionMerger
+from core.parallel_inference import run_parallel_inference
 import json
 import uuid
 import datetime  # Ensure at top
-import urllib.parse
+import time
+import threading
+from itertools import islice
+from contextlib import contextmanager
 
 console = Console()
 DB_FILE = "data/XXpert.db"
 DEBUG = True  # Ou False pour désactiver
 
 class KnowledgeBase:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_FILE)
-        self.cursor = self.conn.cursor()
+    def __init__(self, db_file=DB_FILE, profile=None, readers=4, event_sink=True):
+        self.db_file = db_file
+        # WAL : 1 writer + N lecteurs read-only ; profile : preset ("interactive", "bulk_load", "reporting")
+        self.pool = ConnectionManager(db_file, readers=readers, profile=profile)
+        self._owner_thread = threading.get_ident()  # seul thread autorisé sur le writer (voir conn / cursor)
+        self._conn = self.pool.writer
+        self._cursor = self._conn.cursor()
+        self.catalog = CatalogCache(self.conn, self._reading)  # noms -> ids en mémoire
+        self.thresholds = ThresholdResolver(self.conn, self._reading)  # seuils fusionnés manuels + stats
+        self._tx_depth = 0  # profondeur de transaction() en cours (0 = auto-commit)
+        self._running_stats = {}  # (class_id, prop_id) -> RunningStats, chargé à la demande
+        self._stats_deferred = 0  # profondeur de deferred_stats()
+        self._dirty_stats = set()  # (class_id, prop_id) à recalculer au flush
+        self._dirty_since = None
+        self._dirty_max = None
+        self._dirty_max_delay = None
         self._setup_db()
+        # Journal d'événements en arrière-plan (base fichier)
+        #   event_sink : True, dict d'options EventSink (overflow, batch_size...), ou False -> INSERT synchrone
+        self.events = None
+        if event_sink not in (False, None) and not self.pool.memory:
+            options = event_sink if isinstance(event_sink, dict) else {}
+            self.events = EventSink(self.pool.connect, **options)
+            atexit.register(self.events.close)  # thread daemon : flush à la sortie si close() n'est pas appelé
 
         self.forward_engine = ForwardEngine(self)
         self.backward_engine = BackwardEngine(self)
@@ -60,6 +95,7 @@ class KnowledgeBase:
                 inst_id INTEGER,
                 prop_id INTEGER,
                 value TEXT,
+                num_value REAL,   -- projection numérique typée (voir _numeric_shadow)
                 PRIMARY KEY (inst_id, prop_id)
             );
 
@@ -124,10 +160,13 @@ class KnowledgeBase:
 
         """)
         self.conn.commit()
+        self._migrate_schema()
 
         if not self.get_class_id("Animal"):
             self.cursor.execute("INSERT INTO seclass (name) VALUES ('Animal')")
+            closure_insert(self.conn, self.cursor.lastrowid)
             self.conn.commit()
+            self.catalog.invalidate_classes()
 
         # Admin par défaut
         self.cursor.execute("SELECT COUNT(*) FROM se_users WHERE username = 'admin'")
@@ -136,31 +175,154 @@ class KnowledgeBase:
             self.commit()
 
 
+    # _migrate_schema : colonnes ajoutées après coup sur une base existante
+    def _migrate_schema(self):
+        stats_cols = {r[1] for r in self.cursor.execute("PRAGMA table_info(seprop_stats)").fetchall()}
+        if "sum_value" not in stats_cols:
+            self.cursor.execute("ALTER TABLE seprop_stats ADD COLUMN sum_value REAL")
+        if "m2" not in stats_cols:
+            self.cursor.execute("ALTER TABLE seprop_stats ADD COLUMN m2 REAL")  # somme des carrés des écarts (Welford)
+
+        value_cols = {r[1] for r in self.cursor.execute("PRAGMA table_info(seinst_value)").fetchall()}
+        if "num_value" not in value_cols:
+            self.cursor.execute("ALTER TABLE seinst_value ADD COLUMN num_value REAL")
+            self._backfill_numeric_shadow()
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_seinst_value_num ON seinst_value (prop_id, num_value)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_seinst_class ON seinst (class_id)")
+        # se_events : l'index contient le rowid -> ordre (…, timestamp, id) sans tri (get_events_page)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_se_events_ts ON se_events (timestamp)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_se_events_entity_ts ON se_events (entity, timestamp)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_se_events_type_ts ON se_events (event_type, timestamp)")
+        self.conn.commit()
+        ensure_closure(self.conn)  # seclass_closure (core/hierarchy.py)
+        self.conn.commit()
+
+    # _backfill_numeric_shadow : remplit num_value depuis le texte (migration, changement de type)
+    def _backfill_numeric_shadow(self, prop_id=None):
+        query = "SELECT v.inst_id, v.prop_id, v.value, p.type FROM seinst_value v JOIN seprop p ON p.id = v.prop_id"
+        params = ()
+        if prop_id is not None:
+            query += " WHERE v.prop_id = ?"
+            params = (prop_id,)
+        updates = []
+        for inst_id, p_id, stored, ptype in self.conn.execute(query, params).fetchall():
+            updates.append((stored_number(ptype, stored), inst_id, p_id))
+        self.cursor.executemany("UPDATE seinst_value SET num_value = ? WHERE inst_id = ? AND prop_id = ?", updates)
+
+    # _numeric_shadow : valeur Python -> REAL indexable (None si type non ordonnable, voir core/codecs.py)
+    @staticmethod
+    def _numeric_shadow(ptype, value):
+        codec = get_codec(ptype)
+        return codec.to_number(value) if codec else None
+
     def commit(self):
+        # Dans une transaction() le commit est différé jusqu'à la sortie du bloc
+        if self._tx_depth:
+            return
         self.conn.commit()
 
+    # transaction : unit-of-work, un seul commit pour toutes les écritures du bloc
+    @contextmanager
+    def transaction(self):
+        """
+        with kb.transaction():
+            kb.add_instance(...)
+            kb.set_instance_value(...)
+
+        Commit unique à la sortie, rollback si exception.
+        Les blocs imbriqués rejoignent la transaction externe (SAVEPOINT).
+        """
+        depth = self._tx_depth
+        savepoint = f"kb_tx_{depth}"
+        if depth:
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+        elif not self.conn.in_transaction:
+            # BEGIN explicite : sinon un SAVEPOINT imbriqué ouvrirait sa propre transaction
+            # et son RELEASE commiterait avant la fin du bloc externe
+            self.conn.execute("BEGIN")
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            if depth:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+            else:
+                self.conn.rollback()
+            self._after_rollback()
+            raise
+        else:
+            self._tx_depth -= 1
+            if depth:
+                self.conn.execute(f"RELEASE {savepoint}")
+            else:
+                self.conn.commit()
+
+    def in_transaction(self):
+        return self._tx_depth > 0
+
+    def _after_rollback(self):
+        # Les caches mémoire peuvent contenir des lignes annulées
+        self.catalog.invalidate()
+        self.thresholds.invalidate()
+        self._running_stats.clear()
+
+    # conn / cursor : writer partagé, réservé au thread propriétaire
+    #   un autre thread lit par _reading() (lecteurs du pool) ; y écrire lève RuntimeError au lieu d'une course sur le cursor
+    @property
+    def conn(self):
+        self._require_owner()
+        return self._conn
+
+    @property
+    def cursor(self):
+        self._require_owner()
+        return self._cursor
+
+    def _require_owner(self):
+        if threading.get_ident() != self._owner_thread:
+            raise RuntimeError("KnowledgeBase : écriture hors du thread propriétaire (lectures seulement depuis ce thread)")
+
+    # _reading : connexion pour une lecture "rapport"
+    #   thread propriétaire dans une transaction (ou écriture non commitée) : le writer, pour voir ses écritures
+    #   sinon (autre thread, rapports) : un lecteur du pool, qui ne bloque ni n'attend le writer
+    @contextmanager
+    def _reading(self):
+        if threading.get_ident() == self._owner_thread and (self._tx_depth or self._conn.in_transaction):
+            yield self._conn
+        else:
+            with self.pool.reader() as conn:
+                yield conn
+
+    # use_profile : PRAGMA d'un autre preset le temps d'une opération lourde
+    def use_profile(self, profile):
+        """
+        with kb.use_profile("bulk_load"):
+            kb.bulk_load(records)
+        """
+        return self.pool.use_profile(profile)
+
     def close(self):
         self.commit()
-        self.conn.close()
+        if self.events:
+            self.events.close()  # flush garanti des événements en file
+            atexit.unregister(self.events.close)
+        self.pool.close()
 
     # --- Utilitaires ---
+    # Servis par le catalogue en mémoire (voir core/catalog.py)
     def get_class_id(self, name):
-        self.cursor.execute("SELECT id FROM seclass WHERE LOWER(name) = LOWER(?)", (name,))
-        row = self.cursor.fetchone()
-        return row[0] if row else None
+        return self.catalog.class_id(name)
 
     def get_property_id(self, name):
-        self.cursor.execute("SELECT id FROM seprop WHERE LOWER(name) = LOWER(?)", (name,))
-        row = self.cursor.fetchone()
-        return row[0] if row else None
+        return self.catalog.property_id(name)
 
     def get_all_class_names(self):
-        self.cursor.execute("SELECT name FROM seclass ORDER BY name")
-        return [r[0] for r in self.cursor.fetchall()]
+        return self.catalog.class_names()
 
     def get_all_property_names(self):
-        self.cursor.execute("SELECT name FROM seprop ORDER BY name")
-        return [r[0] for r in self.cursor.fetchall()]
+        return self.catalog.property_names()
 
     # Ajout DEV 25-12-27
     # def get_all_classesOLD(self):
@@ -171,13 +333,8 @@ class KnowledgeBase:
     #     return rows        
 
     def get_all_classes(self):
-        self.cursor.execute("""
-            SELECT c.id, c.name, p.name AS parent_name 
-            FROM seclass c LEFT JOIN seclass p ON c.parent_id = p.id 
-            ORDER BY c.name
-        """)
+        rows = list(self.iter_all_classes())
 
-        rows = self.cursor.fetchall()
         if DEBUG:  # Assume DEBUG global ou passe via self.debug = True
             print(f"get_all_classes: fetched {len(rows)} rows: {rows}")
         return rows        
@@ -212,6 +369,9 @@ class KnowledgeBase:
             # Supprimer la propriété elle-même
             self.cursor.execute("DELETE FROM seprop WHERE id = ?", (p_id,))
             self.commit()
+            self.catalog.invalidate_properties()
+            self.thresholds.invalidate_property(p_id)
+            self._drop_running_stats(p_id)
             return True
         except sqlite3.Error:
             return False
@@ -246,8 +406,7 @@ class KnowledgeBase:
                 return False
 
         if new_type:
-            valid_types = {"string", "bool", "int", "float"}
-            if new_type not in valid_types:
+            if new_type not in codec_names():
                 return False
 
             try:
@@ -258,6 +417,10 @@ class KnowledgeBase:
                 return False
 
         if updated:
+            self.catalog.invalidate_properties()
+            if new_type:
+                self._backfill_numeric_shadow(p_id)
+                self._refresh_property_stats(p_id)  # numérique <-> non numérique
             self.commit()
             return True
 
@@ -265,21 +428,51 @@ class KnowledgeBase:
 
     # Ajout DEV 25-12-27
     def get_all_properties(self):
-        self.cursor.execute("SELECT id, name, type FROM seprop ORDER BY name")
-        return self.cursor.fetchall()
+        with self._reading() as conn:
+            return conn.execute("SELECT id, name, type FROM seprop ORDER BY name").fetchall()
     # Ajout DEV 25-12-27
     def get_all_instances_global(self):
-        self.cursor.execute("""
-            SELECT i.id, i.name, c.name AS class_name 
-            FROM seinst i JOIN seclass c ON i.class_id = c.id 
-            ORDER BY c.name, i.name
-        """)
-        return self.cursor.fetchall()
+        return list(self.iter_all_instances_global())
 
     def get_all_events(self, limit=100):
         # Alias pour get_events sans entity
         return self.get_events(entity=None, limit=limit)
 
+    # table_source : tables du dashboard en pagination keyset (voir core/paging.py, ui/table_model.py)
+    #   class_name : pour "Props", seulement les propriétés (héritées comprises) de la classe
+    def table_source(self, table_name, class_name=None):
+        if table_name == "Classes":
+            return KeysetQuery(self._reading, """
+                SELECT c.id AS "ID", c.name AS "Name", p.name AS "Parent Name"
+                FROM seclass c LEFT JOIN seclass p ON c.parent_id = p.id
+            """, ["ID", "Name", "Parent Name"], key="ID", sort="Name", not_null=["Name"])
+        if table_name == "Instances":
+            return KeysetQuery(self._reading, """
+                SELECT i.id AS "ID", i.name AS "Name", c.name AS "Class Name"
+                FROM seinst i JOIN seclass c ON i.class_id = c.id
+            """, ["ID", "Name", "Class Name"], key="ID", sort="Class Name", not_null=["Name", "Class Name"])
+        if table_name == "Props" and class_name:
+            return KeysetQuery(self._reading, """
+                SELECT DISTINCT p.name AS "Name", p.type AS "Type"
+                FROM seclass_closure cc
+                JOIN seclass_prop cp ON cp.class_id = cc.ancestor_id
+                JOIN seprop p ON p.id = cp.prop_id
+                WHERE cc.descendant_id = ?
+            """, ["Name", "Type"], key="Name", params=(self.get_class_id(class_name),), not_null=["Type"])
+        if table_name == "Props":
+            return KeysetQuery(self._reading, """
+                SELECT id AS "ID", name AS "Name", type AS "Type" FROM seprop
+            """, ["ID", "Name", "Type"], key="ID", sort="Name", not_null=["Name", "Type"])
+        if table_name == "Events":
+            self.flush_events()
+            return KeysetQuery(self._reading, """
+                SELECT id AS "ID", event_type AS "Type", source AS "Source", entity AS "Entity",
+                       payload AS "Payload", severity AS "Severity", timestamp AS "Timestamp"
+                FROM se_events
+            """, ["ID", "Type", "Source", "Entity", "Payload", "Severity", "Timestamp"], key="ID", descending=True,
+                not_null=["Type", "Source"])
+        return None
+
 
     # --- Classes ---
     def add_class(self, name, parent=None):
@@ -295,13 +488,31 @@ class KnowledgeBase:
             return False
         parent_id = self.get_class_id(parent) if parent else None
         self.cursor.execute("INSERT INTO seclass (name, parent_id) VALUES (?, ?)", (name, parent_id))
+        closure_insert(self.conn, self.cursor.lastrowid, parent_id)
         self.commit()
+        self.catalog.invalidate_classes()
         console.print(Panel(f"Classe [green]'{name}'[/] créée", style="green"))
 
         event = Event("class_added", "database", entity=name)
         self.store_event(event)
         return True, event  # return True, Event("class_added", "database", entity=name)  # Return tuple (success, event)
 
+    # move_class : change le parent d'une classe (new_parent=None -> racine), sous-arbre compris
+    def move_class(self, name, new_parent=None):
+        c_id = self.get_class_id(name)
+        if not c_id:
+            return False
+        parent_id = None
+        if new_parent:
+            parent_id = self.get_class_id(new_parent)
+            if not parent_id or is_descendant(self.conn, parent_id, c_id):
+                return False  # parent inconnu, ou cycle (parent dans le sous-arbre)
+        with self.transaction():
+            closure_move(self.conn, c_id, parent_id)
+            self.store_event(Event("class_moved", "database", entity=name, payload={"parent": new_parent}))
+        self.catalog.invalidate_classes()
+        return True
+
 
     # --- Propriétés ---
     # database.py - Add 'uuid' to valid_types in add_property
@@ -313,14 +524,14 @@ class KnowledgeBase:
         name = name.strip().lower()
         if not name:
             return False
-        valid_types = {"string", "bool", "int", "float", "date", "datetime", "time", "json", "timedelta", "uuid", "url"}
-        if ptype not in valid_types:
+        if ptype not in codec_names():  # types du registre core/codecs.py
             return False
         if self.get_property_id(name):
             return False
         try:
             self.cursor.execute("INSERT INTO seprop (name, type) VALUES (?, ?)", (name, ptype))
             self.commit()
+            self.catalog.invalidate_properties()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -333,6 +544,7 @@ class KnowledgeBase:
             return False
         try:
             self.cursor.execute("INSERT INTO seclass_prop (class_id, prop_id) VALUES (?, ?)", (c_id, p_id))
+            self.catalog.invalidate_links()
             self.commit()
             console.print(Panel(f"Propriété [cyan]'{prop_name}'[/] liée à [green]'{class_name}'[/]", style="cyan"))
             return True
@@ -358,6 +570,7 @@ class KnowledgeBase:
             return False
         try:
             self.cursor.execute("INSERT OR IGNORE INTO seclass_prop (class_id, prop_id) VALUES (?, ?)", (c_id, p_id))
+            self.catalog.invalidate_links()
             self.commit()
             return True
         except sqlite3.Error:
@@ -400,12 +613,9 @@ class KnowledgeBase:
             return False
 
     # get_all_instances
-    def get_all_instances(self, class_name):
-        c_id = self.get_class_id(class_name)
-        if not c_id:
-            return []
-        self.cursor.execute("SELECT name FROM seinst WHERE class_id=? ORDER BY name", (c_id,))
-        return [r[0] for r in self.cursor.fetchall()]
+    #   include_subclasses=True : instances de toute la descendance (jointure seclass_closure)
+    def get_all_instances(self, class_name, include_subclasses=False):
+        return list(self.iter_all_instances(class_name, include_subclasses))
 
     # get_instance_value
     def get_instance_value(self, inst_name, class_name, prop_name):
@@ -427,18 +637,17 @@ class KnowledgeBase:
         if not class_id:
             return None
 
-        self.cursor.execute("SELECT id FROM seinst WHERE LOWER(name) = LOWER(?) AND class_id = ?", (inst_name, class_id))
-        row = self.cursor.fetchone()
-        if not row:
-            return None
-        inst_id = row[0]
-
         prop_id = self.get_property_id(prop_name)
         if not prop_id:
             return None
 
-        self.cursor.execute("SELECT value FROM seinst_value WHERE inst_id = ? AND prop_id = ?", (inst_id, prop_id))
-        row = self.cursor.fetchone()
+        with self._reading() as conn:
+            row = conn.execute("SELECT id FROM seinst WHERE LOWER(name) = LOWER(?) AND class_id = ?",
+                               (inst_name, class_id)).fetchone()
+            if not row:
+                return None
+            row = conn.execute("SELECT value FROM seinst_value WHERE inst_id = ? AND prop_id = ?",
+                               (row[0], prop_id)).fetchone()
         if not row:
             return None
 
@@ -446,34 +655,120 @@ class KnowledgeBase:
         if stored is None:
             return None
 
-        ptype = self.get_property_type(prop_name)
-        try:
-            if ptype == "bool":
-                return stored.lower() in ("true", "1", "yes")
-            elif ptype == "int":
-                return int(stored)
-            elif ptype == "float":
-                return float(stored)
-            elif ptype == "string":
-                return stored                
-            elif ptype == "date":
-                return datetime.date.fromisoformat(stored)
-            elif ptype == "datetime":
-                return datetime.datetime.fromisoformat(stored)
-            elif ptype == "time":
-                return datetime.time.fromisoformat(stored)
-            elif ptype == "json":
-                return json.loads(stored)
-            elif ptype == "timedelta":
-                return datetime.timedelta(seconds=float(stored))
-            elif ptype == "uuid":
-                return uuid.UUID(stored)
-            elif ptype == "url":
-                return stored  # Return as string (validated on set)                
-            else:  # string or default
-                return stored
-        except ValueError:
-            return None  # Invalid stored value for type
+        codec = self.catalog.property_codec(prop_name)
+        return codec.decode(stored) if codec else stored
+
+    # _decode_value : texte stocké -> valeur Python selon le type (None si invalide)
+    def _decode_value(self, ptype, stored):
+        codec = get_codec(ptype)
+        if codec is None:
+            return stored  # type inconnu : texte brut
+        return codec.decode(stored)
+
+    # get_instance_values : toutes les propriétés d'une instance en une requête -> {prop: valeur ou None}
+    def get_instance_values(self, inst_name, class_name):
+        if not inst_name or not isinstance(inst_name, str):
+            return {}
+        values = self.get_instances_values(class_name, [inst_name])
+        return next(iter(values.values()), {})
+
+    # get_instances_values : variante multi-instances -> {instance: {prop: valeur}}
+    #   inst_names=None : toutes les instances de la classe
+    def get_instances_values(self, class_name, inst_names=None):
+        if not class_name or not isinstance(class_name, str):
+            return {}
+        c_id = self.get_class_id(class_name)
+        if not c_id:
+            return {}
+
+        query = """
+            SELECT DISTINCT i.name, p.name, p.type, v.value
+            FROM seinst i
+            LEFT JOIN seclass_closure cc ON cc.descendant_id = i.class_id
+            LEFT JOIN seclass_prop cp ON cp.class_id = cc.ancestor_id
+            LEFT JOIN seprop p ON p.id = cp.prop_id
+            LEFT JOIN seinst_value v ON v.inst_id = i.id AND v.prop_id = p.id
+            WHERE i.class_id = ?
+        """
+        if inst_names is None:
+            batches = [None]
+        else:
+            # LOWER SQLite des deux côtés (ASCII seulement) : même correspondance que get_instance_value
+            names = [n.strip() for n in inst_names if isinstance(n, str) and n.strip()]
+            if not names:
+                return {}
+            batches = [names[k:k + 500] for k in range(0, len(names), 500)]  # limite de paramètres SQLite
+
+        rows = []
+        with self._reading() as conn:
+            for batch in batches:
+                if batch is None:
+                    rows.extend(conn.execute(query + " ORDER BY i.name, p.name", (c_id,)).fetchall())
+                else:
+                    marks = ", ".join(["LOWER(?)"] * len(batch))
+                    rows.extend(conn.execute(query + f" AND LOWER(i.name) IN ({marks}) ORDER BY i.name, p.name",
+                                             (c_id, *batch)).fetchall())
+
+        # Décodage groupé par type (un appel decode_many par type)
+        by_type = {}
+        for idx, (_, prop, ptype, stored) in enumerate(rows):
+            if prop is not None and stored is not None:
+                by_type.setdefault(ptype, []).append(idx)
+        decoded = {}
+        for ptype, indexes in by_type.items():
+            decoded.update(zip(indexes, decode_many(ptype, [rows[i][3] for i in indexes])))
+
+        result = {}
+        for idx, (inst, prop, _, _) in enumerate(rows):
+            values = result.setdefault(inst, {})
+            if prop is not None:
+                values[prop] = decoded.get(idx)
+        return result
+
+    # set_instances_values : écriture groupée {instance: {prop: valeur}} d'une classe
+    #   executemany + un seul recalcul des stats par (classe, propriété) touchée
+    #   retourne {instance: [propriétés écrites]} ; instances / propriétés inconnues et valeurs invalides ignorées
+    #   ids : {instance: id} déjà connus (évite la relecture des instances de la classe)
+    def set_instances_values(self, class_name, values, ids=None):
+        c_id = self.get_class_id(class_name)
+        if not c_id or not values:
+            return {}
+
+        inst_ids = self._bulk_instance_ids(c_id) if ids is None else {}
+        rows, written, numeric_pairs = [], {}, set()
+        for inst_name, props in values.items():
+            if ids is not None:
+                inst_id = ids.get(inst_name)
+            else:
+                inst_id = inst_ids.get(inst_name.strip().lower()) if isinstance(inst_name, str) else None
+            if not inst_id:
+                continue
+            for prop_name, value in props.items():
+                prop = self.catalog.property(prop_name)
+                if not prop:
+                    continue
+                p_id, ptype = prop
+                try:
+                    value, stored = self._encode_value(ptype, value)
+                except (ValueError, TypeError):
+                    continue
+                rows.append((inst_id, p_id, stored, self._numeric_shadow(ptype, value)))
+                written.setdefault(inst_name, []).append(prop_name)
+                if ptype in ("int", "float"):
+                    numeric_pairs.add((c_id, p_id))
+
+        if rows:
+            with self.transaction():
+                self.cursor.executemany("""
+                    INSERT INTO seinst_value (inst_id, prop_id, value, num_value)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value, num_value = excluded.num_value
+                """, rows)
+                for pair in numeric_pairs:
+                    self._mark_stats_dirty(*pair)
+                if not self._stats_deferred:
+                    self.flush_stats()
+        return written
 
     # instance_exists with validation rules
     def instance_exists(self, name, class_name):
@@ -488,8 +783,8 @@ class KnowledgeBase:
         c_id = self.get_class_id(class_name)
         if not c_id:
             return False
-        self.cursor.execute("SELECT 1 FROM seinst WHERE LOWER(name)=LOWER(?) AND class_id=?", (name, c_id))
-        return bool(self.cursor.fetchone())
+        with self._reading() as conn:
+            return bool(conn.execute("SELECT 1 FROM seinst WHERE LOWER(name)=LOWER(?) AND class_id=?", (name, c_id)).fetchone())
 
     # set_instance_value
     def set_instance_value(self, inst_name, class_name, prop_name, value):
@@ -521,93 +816,45 @@ class KnowledgeBase:
         if not prop_id:
             return False
 
-        ptype = self.get_property_type(prop_name)
-        if value is not None:
-            try:
-                if ptype == "bool":
-                    if not isinstance(value, bool):
-                        return False
-                elif ptype == "int":
-                    value = int(value)
-                elif ptype == "float":
-                    value = float(value)
-                elif ptype == "string":
-                    if not isinstance(value, str):
-                        return False
-                elif ptype == "date":
-                    if isinstance(value, str):
-                        value = datetime.date.fromisoformat(value)
-                    elif isinstance(value, datetime.date):
-                        pass
-                    else:
-                        return False
-                    stored = value.isoformat()
-                elif ptype == "datetime":
-                    if isinstance(value, str):
-                        value = datetime.datetime.fromisoformat(value)
-                    elif isinstance(value, datetime.datetime):
-                        pass
-                    else:
-                        return False
-                    stored = value.isoformat()
-                elif ptype == "time":
-                    if isinstance(value, str):
-                        value = datetime.time.fromisoformat(value)
-                    elif isinstance(value, datetime.time):
-                        pass
-                    else:
-                        return False
-                    stored = value.isoformat()
-                elif ptype == "json":
-                    stored = json.dumps(value)
-                elif ptype == "timedelta":
-                    if isinstance(value, str):
-                        value = datetime.timedelta(seconds=float(value))
-                    elif isinstance(value, datetime.timedelta):
-                        pass
-                    else:
-                        return False
-                    stored = str(value.total_seconds())
-                elif ptype == "uuid":
-                    if isinstance(value, str):
-                        value = uuid.UUID(value)
-                    elif isinstance(value, uuid.UUID):
-                        pass
-                    else:
-                        return False
-                    stored = str(value)
-
-                elif ptype == "url":
-                    if not isinstance(value, str):
-                        return False
-                    parsed = urllib.parse.urlparse(value)
-                    if not parsed.scheme or not parsed.netloc:  # Basic validation: scheme (http/https) and netloc required
-                        return False
-                    stored = value  # Store as string
-
-                else:
-                    return False  # Type inconnu
-            except (ValueError, TypeError):
-                return False  # Conversion/serialize échouée
-
-        stored = None if value is None else ("true" if value is True else "false" if value is False else str(value))
+        codec = self.catalog.property_codec(prop_name)
+        if codec is None and value is not None:
+            return False  # Type inconnu
+        ptype = codec.name if codec else None
+        try:
+            value, stored = codec.encode(value) if codec else (None, None)
+        except (ValueError, TypeError):
+            return False  # Conversion/serialize échouée
 
+        numeric = ptype in ("int", "float")
         try:
-            self.cursor.execute("""
-                INSERT INTO seinst_value (inst_id, prop_id, value)
-                VALUES (?, ?, ?)
-                ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value
-            """, (inst_id, prop_id, stored))
-            self.commit()
+            if numeric:
+                # Ancienne valeur + état des stats AVANT l'écriture (delta replace)
+                stats = self._stats_for(class_id, prop_id)  # None en mode différé
+                old = self._stored_number(inst_id, prop_id) if stats is not None else None
 
-            if isinstance(value, (int, float)):
-                if ptype in ("int", "float"):
-                    self._update_stats(class_id, prop_id, value)
+            self.cursor.execute("""
+                INSERT INTO seinst_value (inst_id, prop_id, value, num_value)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value, num_value = excluded.num_value
+            """, (inst_id, prop_id, stored, codec.to_number(value) if codec else None))
 
+            if numeric:
+                self._apply_stats_delta(class_id, prop_id, stats, old, None if value is None else float(value))
+            self.commit()
             return True
         except sqlite3.Error:
             return False
 
+    # _encode_value : conversion/validation d'une valeur selon le type de propriété
+    #   retourne (valeur convertie, texte stocké) ; ValueError/TypeError si invalide
+    def _encode_value(self, ptype, value):
+        codec = get_codec(ptype)
+        if codec is None:
+            if value is None:
+                return None, None
+            raise ValueError(ptype)  # Type inconnu
+        return codec.encode(value)
+
     # delete_instance_value
     def delete_instance_value(self, inst_name, class_name, prop_name):
         if not inst_name or not isinstance(inst_name, str):
@@ -638,10 +885,15 @@ class KnowledgeBase:
         if not p_id:
             return False
 
+        numeric = self.get_property_type(prop_name) in ("int", "float")
         try:
+            if numeric:
+                stats = self._stats_for(c_id, p_id)
+                old = self._stored_number(inst_id, p_id) if stats is not None else None
             self.cursor.execute("DELETE FROM seinst_value WHERE inst_id = ? AND prop_id = ?", (inst_id, p_id))
+            if numeric:
+                self._apply_stats_delta(c_id, p_id, stats, old, None)
             self.commit()
-            # Optional: update stats if numerical
             return True
         except sqlite3.Error:
             return False
@@ -723,21 +975,278 @@ class KnowledgeBase:
         inst_id = row[0]
 
         try:
+            # Valeurs numériques de l'instance : à retirer des stats
+            self.cursor.execute("""
+                SELECT v.prop_id, v.num_value FROM seinst_value v
+                JOIN seprop p ON p.id = v.prop_id
+                WHERE v.inst_id = ? AND p.type IN ('int', 'float') AND v.num_value IS NOT NULL
+            """, (inst_id,))
+            numeric = [(p_id, self._stats_for(c_id, p_id), old) for p_id, old in self.cursor.fetchall()]
+
             # Supprimer les valeurs associées
             self.cursor.execute("DELETE FROM seinst_value WHERE inst_id = ?", (inst_id,))
             # Supprimer l'instance
             self.cursor.execute("DELETE FROM seinst WHERE id = ?", (inst_id,))
+            for p_id, stats, old in numeric:
+                self._apply_stats_delta(c_id, p_id, stats, old, None)
             self.commit()
             return True
         except sqlite3.Error:
             return False
 
+    # ================================================================================================================================================
+    #                           --- Requêtes numériques (num_value indexée) ---
+    #   get_numeric_summary
+    #   find_instances_by_range
+    #
+    # ================================================================================================================================================
+
+    # get_numeric_summary : count/min/max/avg calculés par SQLite
+    def get_numeric_summary(self, class_name, prop_name):
+        c_id = self.get_class_id(class_name)
+        prop = self.catalog.property(prop_name)
+        if not c_id or not prop:
+            return None
+        with self._reading() as conn:
+            count, min_v, max_v, avg = conn.execute("""
+                SELECT COUNT(v.num_value), MIN(v.num_value), MAX(v.num_value), AVG(v.num_value)
+                FROM seinst_value v JOIN seinst i ON i.id = v.inst_id
+                WHERE v.prop_id = ? AND i.class_id = ? AND v.num_value IS NOT NULL
+            """, (prop[0], c_id)).fetchone()
+        return {"count": count, "min": min_v, "max": max_v, "avg": avg}
+
+    # find_instances_by_range : instances dont la valeur est dans [low, high] (bornes optionnelles, incluses)
+    def find_instances_by_range(self, class_name, prop_name, low=None, high=None):
+        c_id = self.get_class_id(class_name)
+        prop = self.catalog.property(prop_name)
+        if not c_id or not prop:
+            return []
+        p_id, ptype = prop
+
+        query = """
+            SELECT i.name, v.value FROM seinst_value v JOIN seinst i ON i.id = v.inst_id
+            WHERE v.prop_id = ? AND i.class_id = ? AND v.num_value IS NOT NULL
+        """
+        params = [p_id, c_id]
+        for bound, op in ((low, ">="), (high, "<=")):
+            if bound is None:
+                continue
+            try:
+                bound, _ = self._encode_value(ptype, bound)
+            except (ValueError, TypeError):
+                return []
+            query += f" AND v.num_value {op} ?"
+            params.append(self._numeric_shadow(ptype, bound))
+        query += " ORDER BY v.num_value, i.name"
+        with self._reading() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [(name, self._decode_value(ptype, stored)) for name, stored in rows]
+
+    # ================================================================================================================================================
+    #                           --- Lectures en flux ---
+    #   iter_all_classes / iter_all_instances_global / iter_all_instances / iter_events / iter_numeric_values
+    #
+    #   Générateurs : lignes lues par fetchmany(chunk_size) sur un cursor dédié (jamais self.cursor),
+    #   mémoire constante. Hors transaction la lecture se fait sur un lecteur du pool, réservé
+    #   jusqu'à épuisement ou fermeture du générateur (for ... break, .close(), ou ramasse-miettes).
+    # ================================================================================================================================================
+
+    # _iter_query : exécute et produit les lignes par paquets
+    def _iter_query(self, query, params=(), chunk_size=1000):
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def iter_all_classes(self, chunk_size=1000):
+        return self._iter_query("""
+            SELECT c.id, c.name, p.name AS parent_name 
+            FROM seclass c LEFT JOIN seclass p ON c.parent_id = p.id 
+            ORDER BY c.name
+        """, chunk_size=chunk_size)
+
+    def iter_all_instances_global(self, chunk_size=1000):
+        return self._iter_query("""
+            SELECT i.id, i.name, c.name AS class_name 
+            FROM seinst i JOIN seclass c ON i.class_id = c.id 
+            ORDER BY c.name, i.name
+        """, chunk_size=chunk_size)
+
+    # iter_all_instances : noms (include_subclasses=True : toute la descendance)
+    def iter_all_instances(self, class_name, include_subclasses=False, chunk_size=1000):
+        c_id = self.get_class_id(class_name)
+        if not c_id:
+            return iter(())
+        if include_subclasses:
+            rows = self._iter_query("""
+                SELECT i.name FROM seclass_closure cc JOIN seinst i ON i.class_id = cc.descendant_id
+                WHERE cc.ancestor_id = ? ORDER BY i.name
+            """, (c_id,), chunk_size)
+        else:
+            rows = self._iter_query("SELECT name FROM seinst WHERE class_id=? ORDER BY name", (c_id,), chunk_size)
+        return (row[0] for row in rows)
+
+    # iter_events : plus récents d'abord, mêmes filtres que get_events_page
+    def iter_events(self, entity=None, event_type=None, severity=None, since=None, until=None, chunk_size=1000):
+        self.flush_events()
+        clauses, params = self._event_filters(entity, event_type, severity, since, until)
+        query = "SELECT * FROM se_events"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, id DESC"
+        return self._iter_query(query, params, chunk_size)
+
+    # iter_numeric_values : projection num_value d'une (classe, propriété) — jobs de stats / exports
+    def iter_numeric_values(self, class_name, prop_name, chunk_size=5000):
+        c_id = self.get_class_id(class_name)
+        p_id = self.get_property_id(prop_name)
+        if not c_id or not p_id:
+            return iter(())
+        rows = self._iter_query("""
+            SELECT v.num_value FROM seinst_value v JOIN seinst i ON i.id = v.inst_id
+            WHERE i.class_id = ? AND v.prop_id = ? AND v.num_value IS NOT NULL
+        """, (c_id, p_id), chunk_size)
+        return (row[0] for row in rows)
+
+    # ================================================================================================================================================
+    #                           --- Import en masse ---
+    #   bulk_load
+    #   _bulk_instance_ids
+    #
+    # ================================================================================================================================================
+
+    # bulk_load : import streamé de classes / instances / valeurs
+    def bulk_load(self, records, chunk_size=1000):
+        """
+        records : itérable (consommé en flux) de dicts
+            {"class": "Moteur", "parent": "Equipement", "instance": "M1", "tension": "230", ...}
+        ou avec les valeurs regroupées : {"class": ..., "instance": ..., "values": {"tension": 230}}
+
+        - classes créées si absentes (parent optionnel, doit déjà exister)
+        - instances et valeurs insérées par executemany, dans une seule transaction
+        - seprop_stats recalculées une seule fois à la fin
+        Retourne un rapport : rows, instances, values, skipped, errors, elapsed, rows_per_s
+        """
+        report = {"rows": 0, "classes": 0, "instances": 0, "values": 0, "skipped": 0, "errors": []}
+        start = time.perf_counter()
+        inst_ids = {}        # class_id -> {nom_lower: inst_id}
+        linked = set()       # (class_id, prop_id) déjà liés dans seclass_prop
+        numeric_pairs = set()
+
+        records = iter(records)
+        with self.transaction():
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+
+                # 1. Classes + instances à créer
+                resolved = []
+                new_instances = []
+                for rec in chunk:
+                    report["rows"] += 1
+                    class_name = (rec.get("class") or "").strip()
+                    inst_name = (rec.get("instance") or "").strip()
+                    if not class_name or not inst_name:
+                        report["errors"].append((report["rows"], "classe ou instance manquante"))
+                        continue
+
+                    c_id = self.get_class_id(class_name)
+                    if not c_id:
+                        parent = (rec.get("parent") or "").strip()
+                        parent_id = self.get_class_id(parent) if parent else None
+                        self.cursor.execute("INSERT INTO seclass (name, parent_id) VALUES (?, ?)", (class_name.capitalize(), parent_id))
+                        self.catalog.invalidate_classes()
+                        c_id = self.cursor.lastrowid
+                        closure_insert(self.conn, c_id, parent_id)
+                        report["classes"] += 1
+
+                    known = inst_ids.get(c_id)
+                    if known is None:
+                        known = inst_ids[c_id] = self._bulk_instance_ids(c_id)
+                    key = inst_name.lower()
+                    if key not in known:
+                        known[key] = None  # réservé, id résolu après l'insert
+                        new_instances.append((inst_name, c_id))
+                    resolved.append((report["rows"], rec, c_id, key))  # n° de ligne propre au record
+
+                if new_instances:
+                    last_id = self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM seinst").fetchone()[0]
+                    self.cursor.executemany("INSERT INTO seinst (name, class_id) VALUES (?, ?)", new_instances)
+                    for i_id, i_name, c_id in self.cursor.execute(
+                            "SELECT id, name, class_id FROM seinst WHERE id > ?", (last_id,)).fetchall():
+                        inst_ids[c_id][i_name.lower()] = i_id
+                    report["instances"] += len(new_instances)
+
+                # 2. Valeurs
+                rows = []
+                links = []
+                for row_num, rec, c_id, key in resolved:
+                    inst_id = inst_ids[c_id][key]
+                    values = rec.get("values")
+                    if values is None:
+                        values = {k: v for k, v in rec.items() if k not in ("class", "instance", "parent")}
+                    for prop_name, raw in values.items():
+                        if raw is None or (isinstance(raw, str) and not raw.strip()):
+                            continue  # cellule vide = valeur inconnue
+                        prop = self.catalog.property(prop_name)
+                        if not prop:
+                            report["skipped"] += 1
+                            continue
+                        p_id, ptype = prop
+                        if ptype == "bool" and isinstance(raw, str):
+                            raw = raw.strip().lower() in ("true", "vrai", "oui", "yes", "1")
+                        try:
+                            value, stored = self._encode_value(ptype, raw)
+                        except (ValueError, TypeError):
+                            report["errors"].append((row_num, f"{prop_name}: valeur invalide {raw!r}"))
+                            continue
+                        rows.append((inst_id, p_id, stored, self._numeric_shadow(ptype, value)))
+                        if (c_id, p_id) not in linked:
+                            linked.add((c_id, p_id))
+                            links.append((c_id, p_id))
+                        if ptype in ("int", "float"):
+                            numeric_pairs.add((c_id, p_id))
+
+                if links:
+                    self.cursor.executemany("INSERT OR IGNORE INTO seclass_prop (class_id, prop_id) VALUES (?, ?)", links)
+                    self.catalog.invalidate_links()
+                if rows:
+                    self.cursor.executemany("""
+                        INSERT INTO seinst_value (inst_id, prop_id, value, num_value)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value, num_value = excluded.num_value
+                    """, rows)
+                    report["values"] += len(rows)
+
+            # 3. Statistiques : un seul recalcul par (classe, propriété) touchée
+            self._dirty_stats.update(numeric_pairs)
+            self.flush_stats()
+
+        report["elapsed"] = time.perf_counter() - start
+        report["rows_per_s"] = report["rows"] / report["elapsed"] if report["elapsed"] > 0 else float(report["rows"])
+        return report
+
+    # _bulk_instance_ids : {nom_lower: id} des instances d'une classe (une requête par classe)
+    def _bulk_instance_ids(self, class_id):
+        rows = self.conn.execute("SELECT id, name FROM seinst WHERE class_id = ? ORDER BY id", (class_id,)).fetchall()
+        ids = {}
+        for i_id, name in rows:
+            ids.setdefault(name.lower(), i_id)
+        return ids
+
     # ================================================================================================================================================
     #                           --- Property ---
     #   get_property_type
     #   get_all_props_for_class 
     #   get_hierarchy 
-    #   _update_stats
     #    
     # #
     #
@@ -752,90 +1261,269 @@ class KnowledgeBase:
         if not prop_name:
             return None
 
-        self.cursor.execute("SELECT type FROM seprop WHERE LOWER(name) = ?", (prop_name,))
-        row = self.cursor.fetchone()
-        return row[0] if row else None
+        return self.catalog.property_type(prop_name)
 
-    # get_all_props_for_class
-    def get_all_props_for_class(self, class_name):
+    # get_all_props_for_class : propriétés propres + héritées des ancêtres
+    #   inherited=False : seulement celles liées directement à la classe
+    def get_all_props_for_class(self, class_name, inherited=True):
         c_id = self.get_class_id(class_name)
         if not c_id:
             return []
-        self.cursor.execute("""
-            SELECT p.name FROM seprop p
-            JOIN seclass_prop cp ON p.id = cp.prop_id
-            WHERE cp.class_id = ?
-            ORDER BY p.name
-        """, (c_id,))
-        return [r[0] for r in self.cursor.fetchall()]
+        if inherited:
+            query = """
+                SELECT DISTINCT p.name FROM seclass_closure cc
+                JOIN seclass_prop cp ON cp.class_id = cc.ancestor_id
+                JOIN seprop p ON p.id = cp.prop_id
+                WHERE cc.descendant_id = ?
+                ORDER BY p.name
+            """
+        else:
+            query = """
+                SELECT p.name FROM seprop p
+                JOIN seclass_prop cp ON p.id = cp.prop_id
+                WHERE cp.class_id = ?
+                ORDER BY p.name
+            """
+        with self._reading() as conn:
+            return [r[0] for r in conn.execute(query, (c_id,)).fetchall()]
 
 
 # classes
-    # get_hierarchy
+    # get_hierarchy : (id, name, parent_id, level), servi par le catalogue (invalidé avec les classes)
     def get_hierarchy(self):
-        self.cursor.execute("""
-            WITH RECURSIVE hierarchy(id, name, parent_id, level) AS (
-                SELECT id, name, parent_id, 0 FROM seclass WHERE parent_id IS NULL
-                UNION ALL
-                SELECT c.id, c.name, c.parent_id, h.level + 1
-                FROM seclass c JOIN hierarchy h ON c.parent_id = h.id
-            )
-            SELECT id, name, parent_id, level FROM hierarchy ORDER BY level, name
-        """)
-        rows = self.cursor.fetchall()
+        rows = self.catalog.hierarchy()
         if DEBUG:
             print(f"get_hierarchy: fetched {len(rows)} rows: {rows}")
         return rows
 
-    # _update_stats améliorée
-    def _update_stats(self, class_id, prop_id, value):
-        if value is None or not isinstance(value, (int, float)):
-            return False
+    # get_hierarchy_summary : arbre + compteurs en une requête (vues arbre console / PyQt)
+    #   -> [(id, name, parent_id, level, prop_count, instance_count)]
+    #   prop_count : propriétés propres + héritées ; instance_count : instances directes
+    def get_hierarchy_summary(self):
+        with self._reading() as conn:
+            return conn.execute("""
+                SELECT c.id, c.name, c.parent_id, lv.level,
+                       COALESCE(pc.n, 0), COALESCE(ic.n, 0)
+                FROM seclass c
+                JOIN (SELECT descendant_id AS id, MAX(depth) AS level
+                      FROM seclass_closure GROUP BY descendant_id) lv ON lv.id = c.id
+                LEFT JOIN (SELECT cc.descendant_id AS id, COUNT(DISTINCT cp.prop_id) AS n
+                           FROM seclass_closure cc JOIN seclass_prop cp ON cp.class_id = cc.ancestor_id
+                           GROUP BY cc.descendant_id) pc ON pc.id = c.id
+                LEFT JOIN (SELECT class_id AS id, COUNT(*) AS n
+                           FROM seinst GROUP BY class_id) ic ON ic.id = c.id
+                ORDER BY lv.level, c.name
+            """).fetchall()
+
+    # get_class_descendants / get_class_ancestors : noms, du plus proche au plus lointain
+    def get_class_descendants(self, class_name, include_self=False):
+        return self._closure_names(class_name, "ancestor_id", "descendant_id", include_self)
+
+    def get_class_ancestors(self, class_name, include_self=False):
+        return self._closure_names(class_name, "descendant_id", "ancestor_id", include_self)
+
+    def _closure_names(self, class_name, key, other, include_self):
+        c_id = self.get_class_id(class_name)
+        if not c_id:
+            return []
+        min_depth = 0 if include_self else 1
+        with self._reading() as conn:
+            return [r[0] for r in conn.execute(f"""
+                SELECT c.name FROM seclass_closure cc JOIN seclass c ON c.id = cc.{other}
+                WHERE cc.{key} = ? AND cc.depth >= ?
+                ORDER BY cc.depth, c.name
+            """, (c_id, min_depth)).fetchall()]
+
+    # get_instance_counts : {classe: nb d'instances}, descendance incluse (rollup) ou non
+    def get_instance_counts(self, include_subclasses=True):
+        with self._reading() as conn:
+            if include_subclasses:
+                rows = conn.execute("""
+                    SELECT a.name, COUNT(i.id) FROM seclass a
+                    JOIN seclass_closure cc ON cc.ancestor_id = a.id
+                    LEFT JOIN seinst i ON i.class_id = cc.descendant_id
+                    GROUP BY a.id
+                """).fetchall()
+            else:
+                rows = conn.execute("""
+                    SELECT c.name, COUNT(i.id) FROM seclass c LEFT JOIN seinst i ON i.class_id = c.id
+                    GROUP BY c.id
+                """).fetchall()
+        return dict(rows)
 
+    # ================================================================================================================================================
+    #                           --- Statistiques incrémentales ---
+    #   _stats_for              RunningStats d'une paire, chargé une fois depuis la base
+    #   _apply_stats_delta      add / replace / remove en O(1) (+ insertion triée pour la médiane)
+    #   _persist_stats          écrit la ligne seprop_stats
+    #   _recalculate_full_stats recalcul complet (changement de type)
+    #
+    #   deferred_stats          mode différé : les écritures marquent (classe, propriété) "dirty"
+    #   flush_stats             recalcul groupé de toutes les paires dirty en une passe SQL
+    # ================================================================================================================================================
+
+    # deferred_stats : pour les éditions en masse et l'inférence
+    @contextmanager
+    def deferred_stats(self, max_dirty=None, max_delay=None):
+        """
+        with kb.deferred_stats(max_dirty=500, max_delay=2.0):
+            ... écritures ...
+
+        Flush automatique à la sortie, ou dès que max_dirty paires sont en attente
+        ou que la plus ancienne attend depuis max_delay secondes.
+        """
+        outer = not self._stats_deferred
+        if outer:
+            self._dirty_max = max_dirty
+            self._dirty_max_delay = max_delay
+        self._stats_deferred += 1
         try:
-            # Récupérer stats actuelles
-            self.cursor.execute("""
-                SELECT instance_count, min_value, max_value, mean_value 
-                FROM seprop_stats WHERE class_id=? AND prop_id=?
-            """, (class_id, prop_id))
-            row = self.cursor.fetchone()
-
-            if row:
-                count, min_v, max_v, mean = row
-                if count is None:  # Sécurité si données corrompues
-                    count = 0
-                count += 1
-                # Formule incrémentale stable pour la moyenne
-                new_mean = mean + (value - mean) / count if mean is not None else value
-                new_min = min(min_v, value) if min_v is not None else value
-                new_max = max(max_v, value) if max_v is not None else value
-
-                self.cursor.execute("""
-                    UPDATE seprop_stats SET 
-                        instance_count=?, min_value=?, max_value=?, mean_value=?, updated_at=CURRENT_TIMESTAMP
-                    WHERE class_id=? AND prop_id=?
-                """, (count, new_min, new_max, new_mean, class_id, prop_id))
-            else:
-                self.cursor.execute("""
-                    INSERT INTO seprop_stats 
-                    (class_id, prop_id, instance_count, min_value, max_value, mean_value)
-                    VALUES (?, ?, 1, ?, ?, ?)
-                """, (class_id, prop_id, value, value, value))
+            yield self
+        finally:
+            self._stats_deferred -= 1
+            if outer:
+                self._dirty_max = self._dirty_max_delay = None
+                self.flush_stats()
+
+    def _mark_stats_dirty(self, class_id, prop_id):
+        if not self._dirty_stats:
+            self._dirty_since = time.monotonic()
+        self._dirty_stats.add((class_id, prop_id))
+        if self._dirty_max is not None and len(self._dirty_stats) >= self._dirty_max:
+            self.flush_stats()
+        elif self._dirty_max_delay is not None and time.monotonic() - self._dirty_since >= self._dirty_max_delay:
+            self.flush_stats()
+
+    # flush_stats : N paires dirty -> une seule requête groupée (médiane par fenêtre)
+    def flush_stats(self):
+        if not self._dirty_stats:
+            return 0
+        pairs = list(self._dirty_stats)
+        self._dirty_stats.clear()
+        self._dirty_since = None
+
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _dirty_stats (class_id INTEGER, prop_id INTEGER, PRIMARY KEY (class_id, prop_id))")
+        self.cursor.execute("DELETE FROM _dirty_stats")
+        self.cursor.executemany("INSERT OR IGNORE INTO _dirty_stats (class_id, prop_id) VALUES (?, ?)", pairs)
+        self.cursor.execute("""
+            WITH vals AS (
+                SELECT d.class_id, d.prop_id, v.num_value AS x
+                FROM _dirty_stats d
+                JOIN seprop p ON p.id = d.prop_id AND p.type IN ('int', 'float')
+                JOIN seinst i ON i.class_id = d.class_id
+                JOIN seinst_value v ON v.inst_id = i.id AND v.prop_id = d.prop_id
+                WHERE v.num_value IS NOT NULL
+            ),
+            ranked AS (
+                SELECT class_id, prop_id, x,
+                       ROW_NUMBER() OVER (PARTITION BY class_id, prop_id ORDER BY x) AS rn,
+                       COUNT(*) OVER (PARTITION BY class_id, prop_id) AS n
+                FROM vals
+            )
+            SELECT class_id, prop_id, COUNT(*), MIN(x), MAX(x), AVG(x), SUM(x), SUM(x * x),
+                   AVG(CASE WHEN rn IN ((n + 1) / 2, (n + 2) / 2) THEN x END)
+            FROM ranked
+            GROUP BY class_id, prop_id
+        """)
+        rows = []
+        for class_id, prop_id, count, min_v, max_v, mean, total, total_sq, median in self.cursor.fetchall():
+            m2 = max(total_sq - total * total / count, 0.0)
+            std_dev = (m2 / (count - 1)) ** 0.5 if count > 1 else 0.0
+            rows.append((class_id, prop_id, count, min_v, max_v, mean, median, std_dev, total, m2))
+
+        # Paires sans plus aucune valeur -> plus de stats
+        found = {(r[0], r[1]) for r in rows}
+        self.cursor.executemany("DELETE FROM seprop_stats WHERE class_id=? AND prop_id=?",
+                                [pair for pair in pairs if pair not in found])
+        self.cursor.executemany("""
+            INSERT INTO seprop_stats
+                (class_id, prop_id, instance_count, min_value, max_value, mean_value, median_value, std_dev, sum_value, m2)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(class_id, prop_id) DO UPDATE SET
+                instance_count=excluded.instance_count, min_value=excluded.min_value,
+                max_value=excluded.max_value, mean_value=excluded.mean_value,
+                median_value=excluded.median_value, std_dev=excluded.std_dev,
+                sum_value=excluded.sum_value, m2=excluded.m2,
+                updated_at=CURRENT_TIMESTAMP
+        """, rows)
+
+        # Les RunningStats de ces paires seront rechargés au prochain delta
+        for pair in pairs:
+            self._running_stats.pop(pair, None)
+            self.thresholds.invalidate_pair(*pair)
+        self.commit()
+        return len(pairs)
 
-            self.conn.commit()
-            self._recalculate_full_stats(class_id, prop_id)
-            return True
-        except sqlite3.Error:
-            return False
+    def _stored_number(self, inst_id, prop_id):
+        row = self.conn.execute("SELECT num_value FROM seinst_value WHERE inst_id = ? AND prop_id = ?", (inst_id, prop_id)).fetchone()
+        return row[0] if row else None
 
+    def _load_running_stats(self, class_id, prop_id):
+        rows = self.conn.execute("""
+            SELECT v.num_value FROM seinst_value v
+            JOIN seinst i ON v.inst_id = i.id
+            WHERE i.class_id = ? AND v.prop_id = ? AND v.num_value IS NOT NULL
+        """, (class_id, prop_id)).fetchall()
+        return RunningStats(r[0] for r in rows)
+
+    def _stats_for(self, class_id, prop_id):
+        if self._stats_deferred:
+            return None  # pas de delta : la paire sera marquée dirty
+        key = (class_id, prop_id)
+        stats = self._running_stats.get(key)
+        if stats is None:
+            stats = self._running_stats[key] = self._load_running_stats(class_id, prop_id)
+        return stats
+
+    def _apply_stats_delta(self, class_id, prop_id, stats, old, new):
+        if stats is None:
+            return self._mark_stats_dirty(class_id, prop_id)
+        if old == new:
+            return
+        if not stats.replace(old, new):
+            # Cache désynchronisé (écriture hors KnowledgeBase) : on repart de la base
+            return self._recalculate_full_stats(class_id, prop_id)
+        self._persist_stats(class_id, prop_id, stats)
+
+    def _persist_stats(self, class_id, prop_id, stats):
+        self.thresholds.invalidate_pair(class_id, prop_id)
+        if not stats.count:
+            self.cursor.execute("DELETE FROM seprop_stats WHERE class_id=? AND prop_id=?", (class_id, prop_id))
+            return
+        self.cursor.execute("""
+            INSERT INTO seprop_stats
+                (class_id, prop_id, instance_count, min_value, max_value, mean_value, median_value, std_dev, sum_value, m2)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(class_id, prop_id) DO UPDATE SET
+                instance_count=excluded.instance_count, min_value=excluded.min_value,
+                max_value=excluded.max_value, mean_value=excluded.mean_value,
+                median_value=excluded.median_value, std_dev=excluded.std_dev,
+                sum_value=excluded.sum_value, m2=excluded.m2,
+                updated_at=CURRENT_TIMESTAMP
+        """, (class_id, prop_id, stats.count, stats.min, stats.max, stats.mean,
+              stats.median, stats.std_dev, stats.total, stats.m2))
+
+    def _drop_running_stats(self, prop_id):
+        for key in [k for k in self._running_stats if k[1] == prop_id]:
+            del self._running_stats[key]
+
+    # _refresh_property_stats : après changement de type d'une propriété
+    def _refresh_property_stats(self, prop_id):
+        self._drop_running_stats(prop_id)
+        if self.catalog.property_type_by_id(prop_id) not in ("int", "float"):
+            self.cursor.execute("DELETE FROM seprop_stats WHERE prop_id = ?", (prop_id,))
+            self.thresholds.invalidate_property(prop_id)
+            return
+        class_ids = [r[0] for r in self.conn.execute("""
+            SELECT DISTINCT i.class_id FROM seinst_value v JOIN seinst i ON v.inst_id = i.id
+            WHERE v.prop_id = ?
+        """, (prop_id,)).fetchall()]
+        for class_id in class_ids:
+            self._recalculate_full_stats(class_id, prop_id)
 
     def _register_default_rules(self):
-        # Règles circuit électrique
-        self.forward_engine.add_rule(['tension', 'intensite'], 'puissance', lambda u, i: u * i, "W")
-        self.forward_engine.add_rule(['tension', 'intensite'], 'resistance', lambda u, i: u / i if i != 0 else None, "Ω")
-        self.forward_engine.add_rule(['resistance', 'intensite'], 'tension', lambda r, i: r * i, "V")
-        self.forward_engine.add_rule(['puissance', 'tension'], 'intensite', lambda p, u: p / u if u != 0 else None, "A")
-        self.forward_engine.add_rule(['resistance', 'intensite'], 'puissance', lambda r, i: r * i**2, "W")
+        # Règles circuit électrique (core/inference.py : aussi chargées par les workers de core/parallel_inference.py)
+        register_default_rules(self.forward_engine)
 
         # Même règles pour backward (inversées)
         self.backward_engine.add_rule('puissance', ['tension', 'intensite'], lambda u, i: u * i, "W")
@@ -844,40 +1532,24 @@ class KnowledgeBase:
         self.backward_engine.add_rule('intensite', ['puissance', 'tension'], lambda p, u: p / u if u != 0 else None, "A")
         # Ajoute ici tes règles débit/dP quand prêt (ex. log)
 
-    # database.py - _recalculate_full_stats optimisée
+    # run_parallel_inference : recalcul de l'inférence avant sur toute la base (core/parallel_inference.py)
+    #   workers processus en lecture seule, ce writer écrit les tranches reçues ; événement de fin journalisé
+    def run_parallel_inference(self, class_names=None, workers=None, shard_size=5000, engine_factory=default_forward_engine,
+                               on_progress=None):
+        if self._tx_depth:
+            raise RuntimeError("run_parallel_inference hors transaction uniquement")
+        if self.pool.memory:
+            raise ValueError("Base :memory: : inaccessible aux workers")
+        self.conn.commit()  # les workers lisent l'état validé
+        report = run_parallel_inference(self, class_names, workers, shard_size, engine_factory, on_progress)
+        self.store_event(Event("parallel_inference_done", "inference", payload=report))
+        return report
+
+    # _recalculate_full_stats : une relecture complète de la paire, puis deltas O(1)
     def _recalculate_full_stats(self, class_id, prop_id):
-        try:
-            self.cursor.execute("""
-                SELECT v.value FROM seinst_value v
-                JOIN seinst i ON v.inst_id = i.id
-                WHERE i.class_id = ? AND v.prop_id = ? AND v.value IS NOT NULL
-            """, (class_id, prop_id))
-            
-            values = []
-            for row in self.cursor.fetchall():
-                try:
-                    values.append(float(row[0]))
-                except (ValueError, TypeError):
-                    continue  # Ignorer les valeurs non convertibles
-
-            if not values:
-                # Plus aucune valeur numérique → supprimer les stats
-                self.cursor.execute("DELETE FROM seprop_stats WHERE class_id=? AND prop_id=?", (class_id, prop_id))
-                self.conn.commit()
-                return
-
-            median = statistics.median(values)
-            stdev = statistics.stdev(values) if len(values) > 1 else 0.0
-
-            self.cursor.execute("""
-                UPDATE seprop_stats SET 
-                    median_value=?, std_dev=?, updated_at=CURRENT_TIMESTAMP
-                WHERE class_id=? AND prop_id=?
-            """, (median, stdev, class_id, prop_id))
-            self.conn.commit()
-        except sqlite3.Error:
-            pass  # Silencieux : si erreur, on laisse les anciennes stats
-
+        stats = self._running_stats[(class_id, prop_id)] = self._load_running_stats(class_id, prop_id)
+        self._persist_stats(class_id, prop_id, stats)
+        self.commit()
 
     def _recalculate_full_statsOLD(self, class_id, prop_id):
         self.cursor.execute("""
@@ -894,7 +1566,7 @@ class KnowledgeBase:
 
         if not values:
             self.cursor.execute("DELETE FROM seprop_stats WHERE class_id=? AND prop_id=?", (class_id, prop_id))
-            self.conn.commit()
+            self.commit()
             return
 
         median = statistics.median(values)
@@ -905,48 +1577,58 @@ class KnowledgeBase:
                 median_value=?, std_dev=?, updated_at=CURRENT_TIMESTAMP
             WHERE class_id=? AND prop_id=?
         """, (median, stdev, class_id, prop_id))
-        self.conn.commit()
+        self.commit()
 
 
 
+    # get_thresholds : LL / L / M / H / HH (manuels prioritaires, sinon stats) — cache core/thresholds.py
     def get_thresholds(self, class_name, prop_name):
         c_id = self.get_class_id(class_name)
         p_id = self.get_property_id(prop_name)
         if not c_id or not p_id:
             return None
+        return self.thresholds.get(c_id, p_id)
 
-        thresholds = {"LL": None, "L": None, "M": None, "H": None, "HH": None}
+    # get_thresholds_bulk : {propriété: seuils} pour toutes les propriétés (héritées comprises) d'une classe
+    #   propriétés depuis le catalogue, seuils depuis le cache : aucune requête une fois les deux chargés
+    def get_thresholds_bulk(self, class_name):
+        c_id = self.get_class_id(class_name)
+        if not c_id:
+            return {}
+        return {prop: self.thresholds.get(c_id, self.get_property_id(prop))
+                for prop in self.catalog.class_property_names(c_id)}
 
-        # 1. Seuils manuels (priorité)
-        self.cursor.execute("""
-            SELECT ll, l, h, hh FROM seprop_manual_thresholds
-            WHERE class_id=? AND prop_id=?
-        """, (c_id, p_id))
-        row = self.cursor.fetchone()
-        if row:
-            thresholds["LL"], thresholds["L"], thresholds["H"], thresholds["HH"] = row
+    # classify_class : bandes LL..HH de toutes les instances x propriétés numériques (core/classification.py)
+    #   une requête pour les valeurs, seuils depuis le cache, comparaison NumPy en une passe
+    def classify_class(self, class_name):
+        from core.classification import ClassReport, threshold_matrix  # NumPy chargé à la demande
+        import numpy as np
 
-        # 2. Stats auto-apprises
-        self.cursor.execute("""
-            SELECT mean_value, median_value, std_dev FROM seprop_stats
-            WHERE class_id=? AND prop_id=?
-        """, (c_id, p_id))
-        row = self.cursor.fetchone()
-        if row:
-            mean, median, stdev = row
-            thresholds["M"] = median or mean
-
-            if stdev > 0:
-                if thresholds["L"] is None:
-                    thresholds["L"] = mean - stdev
-                if thresholds["H"] is None:
-                    thresholds["H"] = mean + stdev
-                if thresholds["LL"] is None:
-                    thresholds["LL"] = mean - 2 * stdev
-                if thresholds["HH"] is None:
-                    thresholds["HH"] = mean + 2 * stdev
-
-        return thresholds
+        c_id = self.get_class_id(class_name)
+        if not c_id:
+            return None
+        props = [p for p in self.get_all_props_for_class(class_name) if self.get_property_type(p) in ("int", "float")]
+        instances = self.get_all_instances(class_name)
+        row_of = {name: i for i, name in enumerate(instances)}
+        col_of = {self.get_property_id(p): j for j, p in enumerate(props)}
+
+        values = np.full((len(instances), len(props)), np.nan)
+        if props and instances:
+            rows, cols, nums = [], [], []
+            for name, p_id, num in self._iter_query("""
+                SELECT i.name, v.prop_id, v.num_value FROM seinst i
+                JOIN seinst_value v ON v.inst_id = i.id
+                WHERE i.class_id = ? AND v.num_value IS NOT NULL
+            """, (c_id,), chunk_size=10000):
+                j = col_of.get(p_id)
+                if j is not None:
+                    rows.append(row_of[name])
+                    cols.append(j)
+                    nums.append(num)
+            values[rows, cols] = nums
+
+        limits = threshold_matrix([self.thresholds.get(c_id, self.get_property_id(p)) for p in props])
+        return ClassReport(class_name, instances, props, values, limits)
 
     def set_manual_thresholds(self, class_name, prop_name, ll=None, l=None, h=None, hh=None):
         c_id = self.get_class_id(class_name)
@@ -959,19 +1641,19 @@ class KnowledgeBase:
             ON CONFLICT(class_id, prop_id) DO UPDATE SET
                 ll=excluded.ll, l=excluded.l, h=excluded.h, hh=excluded.hh
         """, (c_id, p_id, ll, l, h, hh))
-        self.conn.commit()
+        self.commit()
+        self.thresholds.invalidate_pair(c_id, p_id)
         return True
 
     def ask_and_set_properties(self, inst_name, class_name):
-        props = self.get_all_props_for_class(class_name)
-        if not props:
+        values = self.get_instance_values(inst_name, class_name)
+        if not values:
             console.print("[yellow]Aucune propriété disponible[/]")
             return
 
         console.print(Panel(f"[bold]Saisie des propriétés pour [green]{inst_name}[/] ({class_name})[/bold]"))
 
-        for prop in props:
-            current = self.get_instance_value(inst_name, class_name, prop)
+        for prop, current in values.items():
             if current is not None:
                 console.print(f"  [dim]{prop} : {current} (déjà défini)[/]")
                 if not Confirm.ask("Modifier ?", default=False):
@@ -1010,13 +1692,13 @@ class KnowledgeBase:
             self.set_instance_value(inst_name, class_name, prop, val)
 
     def get_user_id(self, username):
-        self.cursor.execute("SELECT id FROM se_users WHERE LOWER(username)=LOWER(?)", (username,))
-        row = self.cursor.fetchone()
+        with self._reading() as conn:
+            row = conn.execute("SELECT id FROM se_users WHERE LOWER(username)=LOWER(?)", (username,)).fetchone()
         return row[0] if row else None
 
     def get_user_role(self, username):
-        self.cursor.execute("SELECT role FROM se_users WHERE LOWER(username) = LOWER(?)", (username,))
-        row = self.cursor.fetchone()
+        with self._reading() as conn:
+            row = conn.execute("SELECT role FROM se_users WHERE LOWER(username) = LOWER(?)", (username,)).fetchone()
         return row[0] if row else None
 
     def create_user(self, username, role='user'):
@@ -1028,30 +1710,36 @@ class KnowledgeBase:
             return False
 
     def get_pending_submissions(self):
-        self.cursor.execute("SELECT id, user_id, description, status, created_at FROM se_submissions WHERE status = 'pending'")
-        return self.cursor.fetchall()
+        with self._reading() as conn:
+            return conn.execute("SELECT id, user_id, description, status, created_at FROM se_submissions WHERE status = 'pending'").fetchall()
 
-    def merge_submission(self, submission_id, validator_id):
+    # merge_submission : validation ensembliste + application groupée (core/workflow/merge.py)
+    #   retourne un MergeReport (vrai si tout est appliqué), None si la soumission n'existe pas
+    #   strict=True : tout ou rien ; strict=False : applique les changements valides
+    def merge_submission(self, submission_id, validator_id, strict=True):
         self.cursor.execute("SELECT changes_json FROM se_submissions WHERE id = ?", (submission_id,))
         row = self.cursor.fetchone()
         if not row:
-            return False
+            return None
 
-        changes = json.loads(row[0])
-        success = True
-        for change in changes:
-            action = change['action']
-            data = change['data']
-            if action == 'add_class':
-                success &= self.add_class(data['name'], data.get('parent'))
-            elif action == 'add_instance':
-                success &= self.add_instance(data['name'], data['class_name'])
-            # Ajoute pour autres actions (add_prop, etc.)
-
-        if success:
-            self.cursor.execute("UPDATE se_submissions SET status = 'validated', validated_by = ?, validated_at = CURRENT_TIMESTAMP WHERE id = ?", (validator_id, submission_id))
-            self.commit()
-        return success
+        try:
+            changes = json.loads(row[0] or "[]")
+        except ValueError:
+            changes = None
+        if not isinstance(changes, list):
+            changes = [{"action": None}]  # rapporté comme une erreur
+
+        with self.transaction():  # fusion + statut dans la même transaction
+            report = SubmissionMerger(self).merge(changes, strict=strict)
+            if report.success:
+                self.cursor.execute("UPDATE se_submissions SET status = 'validated', validated_by = ?, validated_at = CURRENT_TIMESTAMP WHERE id = ?", (validator_id, submission_id))
+
+        self.store_event(Event("submission_merged" if report.success else "submission_merge_failed", "workflow",
+                               entity=str(submission_id),
+                               payload={"validator": validator_id, "counts": report.counts(),
+                                        "elapsed": round(report.elapsed, 3)},
+                               severity=Severity.INFO if report.success else Severity.WARNING))
+        return report
 
     def reject_submission(self, submission_id, validator_id):
         self.cursor.execute("UPDATE se_submissions SET status = 'rejected', validated_by = ?, validated_at = CURRENT_TIMESTAMP WHERE id = ?", (validator_id, submission_id))
@@ -1059,23 +1747,86 @@ class KnowledgeBase:
         return True
 
     # ========== EVENTS ==========
+    # store_event : mis en file, écrit en lot par le thread de core/event_sink.py
+    #   (hors transaction : un rollback n'annule pas un événement déjà journalisé)
     def store_event(self, event):
-        payload_json = json.dumps(event.payload) if event.payload else None
+        if self.events:
+            self.events.put(event)
+            return
         self.cursor.execute("""
-            INSERT INTO se_events (event_type, source, entity, payload, severity)
-            VALUES (?, ?, ?, ?, ?)
-        """, (event.event_type, event.source, event.entity, payload_json, event.severity))
+            INSERT INTO se_events (event_type, source, entity, payload, severity, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, event_row(event))
         self.commit()
 
+    # flush_events : les lectures de se_events voient les événements encore en file
+    #   pas dans une transaction : le thread d'écriture attendrait le verrou du writer
+    def flush_events(self, timeout=None):
+        if self.events and not self._tx_depth:
+            self.events.flush(timeout)
+
+    # archive_events : rétention (core/event_archive.py) -> archives gzip par jour + vacuum incrémental
+    #   policies=None : DEFAULT_POLICIES ; retourne {"archived", "files", "vacuumed"}
+    def archive_events(self, archive_dir=ARCHIVE_DIR, policies=None, now=None, vacuum=True):
+        if self._tx_depth:
+            raise RuntimeError("archive_events hors transaction uniquement")
+        self.flush_events()
+        self.conn.commit()
+        with self.pool.write() as conn:
+            report = archive_expired_events(conn, archive_dir, policies, now)
+            report["vacuumed"] = False
+            if vacuum and report["archived"]:
+                ensure_incremental_vacuum(conn)  # VACUUM complet une seule fois sur une ancienne base
+                incremental_vacuum(conn)
+                report["vacuumed"] = True
+        return report
+
+    def _event_filters(self, entity=None, event_type=None, severity=None, since=None, until=None):
+        clauses, params = [], []
+        for column, value in (("entity", entity), ("event_type", event_type), ("severity", severity)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        for op, bound in ((">=", since), ("<=", until)):
+            if bound is not None:
+                if isinstance(bound, datetime.datetime):
+                    bound = bound.strftime("%Y-%m-%d %H:%M:%S")
+                clauses.append(f"timestamp {op} ?")
+                params.append(bound)
+        return clauses, params
+
     def get_events(self, entity=None, limit=50):
+        return self.get_events_page(entity=entity, limit=limit)  # Return list tuples, map to Event if needed
+
+    # get_events_page : plus récents d'abord, pagination keyset sur (timestamp, id)
+    #   page suivante : after_id, after_ts = id et timestamp de la dernière ligne reçue
+    #   after_ts absent : relu depuis la ligne after_id ; ligne archivée / supprimée entre deux pages -> id < after_id
+    #   filtres : entity, event_type, severity, since / until (datetime ou texte 'YYYY-MM-DD HH:MM:SS', inclus)
+    def get_events_page(self, after_id=None, entity=None, event_type=None, severity=None,
+                        since=None, until=None, limit=100, after_ts=None):
+        self.flush_events()
+        clauses, params = self._event_filters(entity, event_type, severity, since, until)
+        if after_id is not None:
+            if after_ts is None:
+                with self._reading() as conn:
+                    row = conn.execute("SELECT timestamp FROM se_events WHERE id = ?", (after_id,)).fetchone()
+                after_ts = row[0] if row else None
+            elif isinstance(after_ts, datetime.datetime):
+                after_ts = after_ts.strftime("%Y-%m-%d %H:%M:%S")
+            if after_ts is None:
+                clauses.append("id < ?")
+                params.append(after_id)
+            else:
+                clauses.append("(timestamp, id) < (?, ?)")
+                params.extend((after_ts, after_id))
+
         query = "SELECT * FROM se_events"
-        params = ()
-        if entity:
-            query += " WHERE entity = ?"
-            params = (entity,)
-        query += " ORDER BY timestamp DESC LIMIT ?"
-        params += (limit,)
-        return self.cursor.execute(query, params).fetchall()  # Return list tuples, map to Event if needed
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._reading() as conn:
+            return conn.execute(query, params).fetchall()
 
     # core/database.py (repo, no UI/logic; pure data access)
     # ... (existing, remove any print/Prompt; return data or success)
@@ -0,0 +1,238 @@
+# core/event_archive.py
+"""
+Rétention du journal se_events : les événements expirés partent dans des archives
+compressées en append-only, un fichier gzip JSON-lines par jour :
+
+    data/archive/events/events-2026-01-31.jsonl.gz
+
+Politique : liste ordonnée de RetentionPolicy, la première qui correspond à un
+événement (type et/ou sévérité) fixe sa durée de conservation ; sans politique
+correspondante un événement est conservé indéfiniment.
+
+Ordre des opérations : écriture + fsync des archives, PUIS suppression en base,
+PUIS PRAGMA incremental_vacuum. Un arrêt entre les deux premières étapes ne perd
+rien : l'archivage suivant réécrit les mêmes lignes (dédoublonnables par "id").
+
+Usage :
+    python -m core.event_archive --db data/XXpert.db --dir data/archive/events
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import sys
+from typing import Iterator, List
+
+from rich.console import Console
+
+console = Console()
+
+ARCHIVE_DIR = "data/archive/events"
+_COLUMNS = ("id", "event_type", "source", "entity", "payload", "severity", "timestamp")
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class RetentionPolicy:
+    """Conservation de `max_age_days` jours pour les événements d'un type et/ou d'une sévérité"""
+
+    def __init__(self, max_age_days, event_type=None, severity=None):
+        self.max_age_days = max_age_days
+        self.event_type = event_type
+        self.severity = severity
+
+    def __repr__(self):
+        return f"RetentionPolicy({self.max_age_days}, event_type={self.event_type!r}, severity={self.severity!r})"
+
+    def condition(self):
+        """(SQL, params) ; "1" si la politique s'applique à tout"""
+        clauses, params = [], []
+        if self.event_type:
+            clauses.append("event_type = ?")
+            params.append(self.event_type)
+        if self.severity:
+            clauses.append("severity = ?")
+            params.append(self.severity)
+        return (" AND ".join(clauses) or "1"), params
+
+
+# Du plus spécifique au plus général
+DEFAULT_POLICIES = [
+    RetentionPolicy(7, event_type="instance_values_viewed"),
+    RetentionPolicy(30, severity="info"),
+    RetentionPolicy(180, severity="warning"),
+    RetentionPolicy(730, severity="error"),
+]
+
+
+# ========== ARCHIVAGE ==========
+
+def _cutoff_case(policies, now):
+    # CASE ... : date limite de la première politique correspondante, NULL sinon (conservé)
+    whens, params = [], []
+    for policy in policies:
+        sql, cond_params = policy.condition()
+        whens.append(f"WHEN {sql} THEN ?")
+        params.extend(cond_params)
+        params.append((now - datetime.timedelta(days=policy.max_age_days)).strftime(_TS_FORMAT))
+    return "CASE " + " ".join(whens) + " END", params
+
+
+def _record(row):
+    record = dict(zip(_COLUMNS, row))
+    if record["payload"] is not None:
+        try:
+            record["payload"] = json.loads(record["payload"])
+        except ValueError:
+            pass  # texte brut conservé tel quel
+    return record
+
+
+def archive_path(archive_dir, day):
+    return os.path.join(archive_dir, f"events-{day}.jsonl.gz")
+
+
+def archive_expired_events(conn, archive_dir=ARCHIVE_DIR, policies=None, now=None, batch_size=5000):
+    """
+    Déplace les événements expirés de `conn` vers les archives journalières.
+    Retourne {"archived": n, "files": [chemins]} ; ne commit pas la suppression
+    si l'écriture d'une archive échoue.
+    """
+    policies = DEFAULT_POLICIES if policies is None else policies
+    now = now or datetime.datetime.utcnow()
+    report = {"archived": 0, "files": []}
+    if not policies:
+        return report
+    os.makedirs(archive_dir, exist_ok=True)
+
+    case, params = _cutoff_case(policies, now)
+    cursor = conn.execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM se_events WHERE timestamp < {case} ORDER BY timestamp, id", params)
+
+    expired_ids = []
+    handles = {}
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                day = (row[6] or "0000-00-00")[:10]
+                handle = handles.get(day)
+                if handle is None:
+                    path = archive_path(archive_dir, day)
+                    # "ab" : nouveau membre gzip en fin de fichier, relu d'un bloc par gzip.open
+                    handle = handles[day] = gzip.open(path, "ab")
+                    report["files"].append(path)
+                handle.write((json.dumps(_record(row), ensure_ascii=False) + "\n").encode("utf-8"))
+                expired_ids.append(row[0])
+        for handle in handles.values():
+            handle.flush()
+            os.fsync(handle.fileobj.fileno())
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    for k in range(0, len(expired_ids), batch_size):
+        conn.executemany("DELETE FROM se_events WHERE id = ?", [(i,) for i in expired_ids[k:k + batch_size]])
+    conn.commit()
+    report["archived"] = len(expired_ids)
+    return report
+
+
+# ========== VACUUM INCRÉMENTAL ==========
+
+def ensure_incremental_vacuum(conn):
+    """auto_vacuum=INCREMENTAL ; sur une base existante, nécessite un VACUUM complet (une seule fois)"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(conn, pages=None):
+    """Rend au système les pages libres (toutes si pages=None) ; retourne le nombre de pages libres restantes"""
+    conn.commit()
+    if pages is None:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    else:
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+# ========== LECTURE ==========
+
+def _day_bound(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        value = value.strftime(_TS_FORMAT)
+    return str(value)
+
+
+def archive_files(archive_dir=ARCHIVE_DIR, since=None, until=None) -> List[str]:
+    """Fichiers d'archive triés par jour, restreints à [since, until] d'après leur nom"""
+    since, until = _day_bound(since), _day_bound(until)
+    if not os.path.isdir(archive_dir):
+        return []
+    files = []
+    for name in sorted(os.listdir(archive_dir)):
+        if not (name.startswith("events-") and name.endswith(".jsonl.gz")):
+            continue
+        day = name[len("events-"):-len(".jsonl.gz")]
+        if since and day < since[:10]:
+            continue
+        if until and day > until[:10]:
+            continue
+        files.append(os.path.join(archive_dir, name))
+    return files
+
+
+def iter_archived_events(archive_dir=ARCHIVE_DIR, since=None, until=None, event_type=None,
+                         entity=None, severity=None) -> Iterator[dict]:
+    """Lecture en flux (un événement en mémoire à la fois), ordre chronologique"""
+    since, until = _day_bound(since), _day_bound(until)
+    for path in archive_files(archive_dir, since, until):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if event_type and record["event_type"] != event_type:
+                    continue
+                if entity and record["entity"] != entity:
+                    continue
+                if severity and record["severity"] != severity:
+                    continue
+                timestamp = record["timestamp"] or ""
+                if since and timestamp < since:
+                    continue
+                if until and timestamp > until:
+                    continue
+                yield record
+
+
+# ========== CLI ==========
+
+def main(argv=None):
+    from core.database import KnowledgeBase, DB_FILE
+
+    parser = argparse.ArgumentParser(description="Archivage des événements expirés (se_events)")
+    parser.add_argument("--db", default=DB_FILE, help="Base SQLite")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="Répertoire des archives")
+    parser.add_argument("--no-vacuum", action="store_true", help="Ne pas rendre l'espace libéré")
+    args = parser.parse_args(argv)
+
+    kb = KnowledgeBase(args.db)
+    try:
+        report = kb.archive_events(args.dir, vacuum=not args.no_vacuum)
+    finally:
+        kb.close()
+    console.print(f"[green]{report['archived']} événements archivés[/] dans {len(report['files'])} fichier(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# core/event_sink.py
+"""
+Journal d'événements asynchrone : file mémoire bornée + écriture groupée en arrière-plan
+
+    sink = EventSink(pool.connect)
+    sink.put(event)      # ne touche jamais le disque dans le thread appelant
+    sink.flush()         # attend que tout ce qui précède soit écrit
+    sink.close()         # flush garanti puis arrêt du thread
+
+Le thread d'écriture possède sa propre connexion (WAL : n'interfère pas avec les
+transactions du writer principal) et insère par executemany dès que `batch_size`
+événements sont en attente ou que le plus ancien attend depuis `max_latency` secondes.
+
+Débordement de la file (`max_queue`) :
+    "block"      : l'appelant attend qu'il y ait de la place (aucune perte)
+    "drop_info"  : les événements de sévérité info sont abandonnés (compteur `dropped`),
+                   warning / error attendent comme en "block"
+
+Base verrouillée (busy / locked) au-delà du busy timeout : le lot est réessayé avec
+un délai croissant (plafonné à `max_backoff`) tant qu'il le faut ; en "drop_info",
+les événements info du lot sont abandonnés après `retries` échecs. Toute autre
+erreur SQLite abandonne le lot après `retries` essais (compteur `failed`).
+Chaque abandon est signalé sur la console.
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from rich.console import Console
+
+from core.models.event import Severity
+
+console = Console()
+
+OVERFLOW_POLICIES = ("block", "drop_info")
+
+_STOP = object()
+
+_INSERT = """
+    INSERT INTO se_events (event_type, source, entity, payload, severity, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def event_row(event):
+    """Event -> ligne se_events (timestamp de l'événement, format CURRENT_TIMESTAMP)"""
+    payload_json = json.dumps(event.payload) if event.payload else None
+    timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    return (event.event_type, event.source, event.entity, payload_json, event.severity, timestamp)
+
+
+class EventSink:
+    def __init__(self, connect, max_queue=10000, batch_size=256, max_latency=0.25,
+                 overflow="block", retries=3, max_backoff=2.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue : {overflow!r} {OVERFLOW_POLICIES}")
+        self._connect = connect
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.overflow = overflow
+        self.retries = retries
+        self.max_backoff = max_backoff
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0            # événements perdus à l'écriture (voir _write)
+        self.last_error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+        self._thread.start()
+
+    # ========== CÔTÉ APPELANT ==========
+
+    def put(self, event) -> bool:
+        """Met l'événement en file ; False s'il a été abandonné (drop_info)"""
+        if self._closed:
+            raise RuntimeError("EventSink fermé")
+        row = event_row(event)  # sérialisation dans l'appelant : l'Event peut être modifié ensuite
+        if self.overflow == "drop_info" and event.severity == Severity.INFO:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            return True
+        self._queue.put(row)
+        return True
+
+    def flush(self, timeout=None) -> bool:
+        """Attend l'écriture de tout ce qui a été mis en file avant l'appel"""
+        if self._closed:
+            return not self._thread.is_alive()
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ========== THREAD D'ÉCRITURE ==========
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            stop = False
+            while not stop:
+                batch, markers, stop = self._collect(self._queue.get())
+                if batch:
+                    self._write(conn, batch)
+                for marker in markers:
+                    marker.set()
+        finally:
+            conn.close()
+
+    def _collect(self, item):
+        # Regroupe jusqu'à batch_size, max_latency, un flush() ou l'arrêt
+        batch, markers, stop = [], [], False
+        deadline = time.monotonic() + self.max_latency
+        while True:
+            if item is _STOP:
+                stop = True
+            elif isinstance(item, threading.Event):
+                markers.append(item)
+            else:
+                batch.append(item)
+            if stop or markers or len(batch) >= self.batch_size:
+                return batch, markers, stop
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, markers, stop
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, markers, stop
+
+    def _write(self, conn, batch):
+        attempt = 0
+        while batch:
+            try:
+                conn.executemany(_INSERT, batch)
+                conn.commit()
+                self.written += len(batch)
+                return
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.last_error = e
+            attempt += 1
+            if attempt >= self.retries:
+                if not _is_busy(self.last_error):
+                    self._lose(batch, "abandonnés")  # erreur durable (schéma, disque...) : réessayer ne sert à rien
+                    return
+                if self.overflow == "drop_info":
+                    self._lose([row for row in batch if row[4] == Severity.INFO], "info abandonnés")
+                    batch = [row for row in batch if row[4] != Severity.INFO]
+                elif attempt == self.retries:
+                    console.print(f"[yellow]Journal d'événements : base verrouillée ({self.last_error}), "
+                                  f"{len(batch)} événements en attente, nouvel essai...[/]")
+            if batch:
+                time.sleep(min(0.05 * 2 ** attempt, self.max_backoff))
+
+    def _lose(self, rows, what):
+        if not rows:
+            return
+        self.failed += len(rows)
+        console.print(f"[red]Journal d'événements : {len(rows)} événements {what} "
+                      f"après {self.retries} échecs d'écriture ({self.last_error})[/]")
+
+
+def _is_busy(error):
+    # SQLITE_BUSY / SQLITE_LOCKED : transitoire, un writer finira par libérer la base
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
@@ -0,0 +1,88 @@
+# core/hierarchy.py
+"""
+Table de fermeture (closure table) de la hiérarchie des classes
+
+    seclass_closure(ancestor_id, descendant_id, depth)
+
+Une ligne par couple (ancêtre, descendant), y compris (c, c, 0).
+Propriétés héritées, instances des sous-classes et agrégats par sous-arbre
+deviennent une simple jointure indexée, sans CTE récursive.
+
+Maintenue par add_class / move_class (KnowledgeBase et Repository) ;
+reconstruite depuis seclass.parent_id si elle est absente ou désynchronisée.
+"""
+
+CLOSURE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS seclass_closure (
+        ancestor_id INTEGER NOT NULL,
+        descendant_id INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor_id, descendant_id),
+        FOREIGN KEY (ancestor_id) REFERENCES seclass(id),
+        FOREIGN KEY (descendant_id) REFERENCES seclass(id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_seclass_closure_desc ON seclass_closure (descendant_id, depth);
+"""
+
+
+def ensure_closure(conn):
+    """Crée la table si besoin et la reconstruit si elle ne couvre pas toutes les classes"""
+    conn.executescript(CLOSURE_SCHEMA)
+    classes = conn.execute("SELECT COUNT(*) FROM seclass").fetchone()[0]
+    selves = conn.execute("SELECT COUNT(*) FROM seclass_closure WHERE depth = 0").fetchone()[0]
+    if classes != selves:
+        rebuild_closure(conn)
+
+
+def rebuild_closure(conn):
+    conn.execute("DELETE FROM seclass_closure")
+    # Profondeur bornée par le nombre de classes : protège d'un cycle parent_id déjà en base
+    conn.execute("""
+        WITH RECURSIVE walk(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM seclass
+            UNION ALL
+            SELECT w.ancestor_id, c.id, w.depth + 1
+            FROM walk w JOIN seclass c ON c.parent_id = w.descendant_id
+            WHERE w.depth < (SELECT COUNT(*) FROM seclass)
+        )
+        INSERT OR IGNORE INTO seclass_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM walk
+    """)
+
+
+def closure_insert(conn, class_id, parent_id=None):
+    """Nouvelle classe (feuille) : elle-même + tous les ancêtres du parent"""
+    conn.execute("INSERT OR IGNORE INTO seclass_closure VALUES (?, ?, 0)", (class_id, class_id))
+    if parent_id:
+        conn.execute("""
+            INSERT OR IGNORE INTO seclass_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, ?, depth + 1 FROM seclass_closure WHERE descendant_id = ?
+        """, (class_id, parent_id))
+
+
+def is_descendant(conn, class_id, ancestor_id):
+    row = conn.execute("SELECT 1 FROM seclass_closure WHERE ancestor_id = ? AND descendant_id = ?",
+                       (ancestor_id, class_id)).fetchone()
+    return row is not None
+
+
+def closure_move(conn, class_id, new_parent_id=None):
+    """
+    Déplace le sous-arbre de class_id sous new_parent_id (None = racine).
+    L'appelant vérifie l'absence de cycle (is_descendant) avant l'appel.
+    """
+    # Détache le sous-arbre de ses anciens ancêtres (hors sous-arbre)
+    conn.execute("""
+        DELETE FROM seclass_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM seclass_closure WHERE ancestor_id = ?)
+          AND ancestor_id NOT IN (SELECT descendant_id FROM seclass_closure WHERE ancestor_id = ?)
+    """, (class_id, class_id))
+    if new_parent_id:
+        # Produit cartésien : ancêtres du nouveau parent x descendants de la classe
+        conn.execute("""
+            INSERT INTO seclass_closure (ancestor_id, descendant_id, depth)
+            SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+            FROM seclass_closure a JOIN seclass_closure d
+            WHERE a.descendant_id = ? AND d.ancestor_id = ?
+        """, (new_parent_id, class_id))
+    conn.execute("UPDATE seclass SET parent_id = ? WHERE id = ?", (new_parent_id, class_id))
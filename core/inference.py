@@ -1,57 +1,191 @@
 # core/inference.py
+import heapq
+
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
+from core.models.event import Event
 
 console = Console()
 
 class Rule:
-    def __init__(self, conditions, conclusion, calculation, unit=None):
+    def __init__(self, conditions, conclusion, calculation, unit=None, vectorized=None):
         self.conditions = conditions          # liste de propriétés
         self.conclusion = conclusion          # propriété déduite
         self.calculation = calculation        # lambda ou fonction
         self.unit = unit
+        self.vectorized = vectorized          # True / forme NumPy (voir core/vector_agenda.py), None : scalaire
+
+
+def safe_divide(a, b):
+    """Forme vectorisée de `a / b if b != 0 else None` : NaN là où b == 0"""
+    import numpy as np
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b != 0, a / b, np.nan)
+
+
+class Agenda:
+    """
+    Chaînage avant indexé pour un jeu de faits (une instance) :
+      - correspondances partielles : nombre de conditions encore inconnues par règle
+      - un fait nouveau ne décrémente que les règles qui l'ont en condition (index du moteur)
+      - une règle complète entre dans l'agenda (tas : ordre d'enregistrement = priorité)
+    Les faits ne sont qu'ajoutés, chaque règle se déclenche donc au plus une fois :
+    point fixe atteint quand l'agenda est vide, sans limite d'itérations.
+    """
+
+    def __init__(self, engine, facts=None):
+        self.engine = engine
+        self.facts = {}
+        self.derived = {}                     # conclusion -> valeur calculée (à écrire)
+        self.fired = 0
+        self._missing = [len(set(rule.conditions)) for rule in engine.rules]
+        self._ready = [i for i, n in enumerate(self._missing) if n == 0]
+        heapq.heapify(self._ready)
+        for prop, value in (facts or {}).items():
+            self.add_fact(prop, value)
+
+    def add_fact(self, prop, value) -> bool:
+        if value is None or prop in self.facts:
+            return False
+        self.facts[prop] = value
+        for i in self.engine._by_condition.get(prop, ()):
+            self._missing[i] -= 1
+            if self._missing[i] == 0:
+                heapq.heappush(self._ready, i)
+        return True
+
+    def run(self):
+        rules = self.engine.rules
+        while self._ready:
+            rule = rules[heapq.heappop(self._ready)]
+            if rule.conclusion in self.facts:
+                continue
+            try:
+                new_val = rule.calculation(*[self.facts[c] for c in rule.conditions])
+            except Exception:
+                continue  # Handle error : règle ignorée, ses entrées ne changeront plus
+            self.fired += 1
+            if new_val is not None:
+                self.derived[rule.conclusion] = self.engine.cast(rule.conclusion, new_val)
+                self.add_fact(rule.conclusion, round(new_val, 6) if isinstance(new_val, float) else new_val)
+        return self.derived
+
 
 # core/database.py (corrected execute method in ForwardEngine)
 
 class ForwardEngine:
-    def __init__(self, kb):
+    def __init__(self, kb, catalog=None):
         self.kb = kb
+        self.catalog = catalog if catalog is not None else getattr(kb, "catalog", None)  # types des conclusions
         self.rules = []
+        self._by_condition = {}               # propriété -> indices des règles qui l'utilisent
+        self._conclusions = set()
 
-    def add_rule(self, conditions, conclusion, calculation, unit=None):
-        self.rules.append(Rule(conditions, conclusion, calculation, unit))
+    def add_rule(self, conditions, conclusion, calculation, unit=None, vectorized=None):
+        self.rules.append(Rule(conditions, conclusion, calculation, unit, vectorized))
+        self._conclusions.add(conclusion)
+        for cond in set(conditions):
+            self._by_condition.setdefault(cond, []).append(len(self.rules) - 1)
+
+    def cast(self, prop, value):
+        """Déduction -> valeur du type de la propriété (codec), comme à l'écriture ; inchangée si type inconnu"""
+        codec = self.catalog.property_codec(prop) if self.catalog is not None else None
+        if codec is None:
+            return value
+        try:
+            return codec.coerce(value)
+        except (ValueError, TypeError, OverflowError):
+            return value  # refusée à l'écriture, comme avant
+
+    def infer(self, facts):
+        """Faits {prop: valeur} -> Agenda exécuté jusqu'au point fixe (aucune écriture)"""
+        agenda = Agenda(self, facts)
+        agenda.run()
+        return agenda
+
+    def infer_many(self, facts_by_key):
+        """
+        {clé: faits} -> {clé: (règles déclenchées, déductions)}
+        Colonnes NumPy si des règles sont vectorisées (NumPy installé), Agenda scalaire sinon
+        et pour les instances dont une entrée n'est pas numérique.
+        """
+        results = {}
+        if any(rule.vectorized for rule in self.rules):
+            try:
+                from core.vector_agenda import infer_vectorized
+            except ImportError:
+                pass  # NumPy absent : chemin scalaire
+            else:
+                results = infer_vectorized(self, facts_by_key)
+        for key, facts in facts_by_key.items():
+            if key not in results:
+                agenda = self.infer(facts)
+                results[key] = (agenda.fired, agenda.derived)
+        return {key: results[key] for key in facts_by_key}
 
     def execute(self, inst_name, class_name):
-        # ... (rest of the method body as before)
-        facts = {}
-        props = self.kb.get_all_props_for_class(class_name)
-        for prop in props:
-            val = self.kb.get_instance_value(inst_name, class_name, prop)
-            if val is not None:
-                facts[prop] = val
-
-        changed = True
-        iterations = 0
-        while changed and iterations < 20:
-            changed = False
-            iterations += 1
-            for rule in self.rules:
-                if all(cond in facts for cond in rule.conditions):
-                    if rule.conclusion not in facts or facts[rule.conclusion] is None:
-                        try:
-                            vals = [facts[c] for c in rule.conditions]
-                            new_val = rule.calculation(*vals)
-                            if new_val is not None:
-                                facts[rule.conclusion] = round(new_val, 6) if isinstance(new_val, float) else new_val
-                                self.kb.set_instance_value(inst_name, class_name, rule.conclusion, new_val)
-                                # Replace console.print with return Event or handle via service
-                                # For now, keep as is or comment
-                        except Exception as e:
-                            pass  # Handle error
+        values = self.kb.get_instance_values(inst_name, class_name)  # une seule requête
+        agenda = self.infer(values)
+
+        # toutes les déductions écrites en un seul commit, stats recalculées une fois
+        if agenda.derived:
+            with self.kb.transaction(), self.kb.deferred_stats():
+                for prop, new_val in agenda.derived.items():
+                    self.kb.set_instance_value(inst_name, class_name, prop, new_val)
 
         # Return events instead of print
-        return Event("forward_done", "inference", payload={"iterations": iterations})
+        return Event("forward_done", "inference", entity=inst_name,
+                     payload={"fired": agenda.fired, "derived": list(agenda.derived)})
+
+    # ========== EXÉCUTION PAR LOT ==========
+    # Valeurs lues en une requête par classe, déductions en mémoire,
+    # écriture groupée en une transaction et un seul recalcul des stats.
+
+    def execute_class(self, class_name):
+        """Toutes les instances de la classe -> {instance: résumé}"""
+        with self.kb.transaction(), self.kb.deferred_stats():
+            return self._execute_batch(class_name, None)
+
+    def execute_many(self, instances):
+        """[(instance, classe), ...] -> {(instance, classe): résumé}"""
+        by_class = {}
+        for inst_name, class_name in instances:
+            by_class.setdefault(class_name, []).append(inst_name)
+        summaries = {}
+        with self.kb.transaction(), self.kb.deferred_stats():
+            for class_name, inst_names in by_class.items():
+                for inst_name, summary in self._execute_batch(class_name, inst_names).items():
+                    summaries[(inst_name, class_name)] = summary
+        return summaries
+
+    def _execute_batch(self, class_name, inst_names):
+        summaries, derived = {}, {}
+        for inst_name, (fired, values) in self.infer_many(self.kb.get_instances_values(class_name, inst_names)).items():
+            if values:
+                derived[inst_name] = values
+            summaries[inst_name] = {"fired": fired, "derived": dict(values), "written": []}
+        for inst_name, props in self.kb.set_instances_values(class_name, derived).items():
+            summaries[inst_name]["written"] = props
+        return summaries
+
+
+# Règles circuit électrique
+#   vectorized : forme NumPy pour execute_class / execute_many (True : même lambda sur tableaux)
+#   Fonctions de module : un worker (core/parallel_inference.py) reconstruit le moteur par import
+def register_default_rules(engine):
+    engine.add_rule(['tension', 'intensite'], 'puissance', lambda u, i: u * i, "W", vectorized=True)
+    engine.add_rule(['tension', 'intensite'], 'resistance', lambda u, i: u / i if i != 0 else None, "Ω", vectorized=safe_divide)
+    engine.add_rule(['resistance', 'intensite'], 'tension', lambda r, i: r * i, "V", vectorized=True)
+    engine.add_rule(['puissance', 'tension'], 'intensite', lambda p, u: p / u if u != 0 else None, "A", vectorized=safe_divide)
+    engine.add_rule(['resistance', 'intensite'], 'puissance', lambda r, i: r * i**2, "W", vectorized=True)
+
+
+def default_forward_engine(kb=None):
+    engine = ForwardEngine(kb)
+    register_default_rules(engine)
+    return engine
+
 
 class BackwardEngine:
     def __init__(self, kb):
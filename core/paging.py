@@ -0,0 +1,115 @@
+# core/paging.py
+"""
+Pagination par clé (keyset) sur une requête SQL, sans OFFSET
+
+    source = kb.table_source("Instances")
+    rows, cursor = source.page(limit=200)                    # première page
+    rows, cursor = source.page(after=cursor, limit=200)      # page suivante (cursor None = fin)
+
+Tri et filtre sont poussés dans le SQL : seule la fenêtre demandée est matérialisée.
+Le curseur est (valeur de tri, clé) de la dernière ligne ; la clé unique départage
+les ex-aequo, donc aucune ligne n'est sautée ni répétée entre deux pages.
+
+Colonnes `not_null` (et la clé) : triées telles quelles, SQLite parcourt l'index ou
+le rowid par plage. Les autres passent par COALESCE(col, '') (NULL comparable),
+au prix d'un tri temporaire.
+"""
+from typing import Callable, List, Optional, Sequence, Tuple
+
+
+class KeysetQuery:
+    """Vue paginée d'un SELECT : colonnes affichées + colonne clé unique"""
+
+    def __init__(self, reading: Callable, base_sql: str, columns: Sequence[str], key: str,
+                 params: Sequence = (), sort: Optional[str] = None, descending: bool = False,
+                 not_null: Sequence[str] = ()):
+        """
+        reading  : fabrique de context manager -> connexion (ex. kb._reading)
+        base_sql : SELECT dont les colonnes portent les noms de `columns`
+        key      : colonne unique (non NULL) servant de départage (ex. "id")
+        not_null : colonnes jamais NULL (NOT NULL en base, jointure interne)
+        """
+        self._reading = reading
+        self.base_sql = base_sql
+        self.columns = list(columns)
+        self.key = key
+        self.params = tuple(params)
+        self.sort = sort or key
+        self.descending = descending
+        self.not_null = set(not_null) | {key}
+        self.search = None
+
+    # ========== PARAMÈTRES ==========
+
+    def set_sort(self, column: str, descending: bool = False):
+        if column not in self.columns:
+            raise ValueError(f"Colonne inconnue : {column}")
+        self.sort = column
+        self.descending = descending
+
+    def set_search(self, text: Optional[str]):
+        """Filtre texte (LIKE, insensible à la casse ASCII) sur toutes les colonnes ; None/"" = aucun"""
+        self.search = text.strip() if text and text.strip() else None
+
+    # ========== SQL ==========
+
+    def _sort_expr(self):
+        # NULL -> '' : même expression pour ORDER BY et pour la comparaison du curseur
+        if self.sort in self.not_null:
+            return f'"{self.sort}"'
+        return f'COALESCE("{self.sort}", \'\')'
+
+    def _where(self):
+        clauses, params = [], []
+        if self.search:
+            clauses.append("(" + " OR ".join(f'"{col}" LIKE ?' for col in self.columns) + ")")
+            params.extend(f"%{self.search}%" for _ in self.columns)
+        return clauses, params
+
+    def _page_query(self, after, limit):
+        clauses, params = self._where()
+        op = "<" if self.descending else ">"
+        order = "DESC" if self.descending else "ASC"
+        sort_expr = self._sort_expr()
+        by_key = self.sort == self.key
+        if after is not None:
+            if by_key:
+                clauses.append(f'"{self.key}" {op} ?')
+                params.append(after[1])
+            else:
+                clauses.append(f'({sort_expr}, "{self.key}") {op} (?, ?)')
+                params.extend(after)
+        select = ", ".join(f'"{col}"' for col in self.columns)
+        query = f'SELECT {select}, {sort_expr}, "{self.key}" FROM ({self.base_sql})'
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        if by_key:
+            query += f' ORDER BY "{self.key}" {order} LIMIT ?'
+        else:
+            query += f' ORDER BY {sort_expr} {order}, "{self.key}" {order} LIMIT ?'
+        return query, (*self.params, *params, limit)
+
+    def page(self, after: Optional[Tuple] = None, limit: int = 200) -> Tuple[List[tuple], Optional[Tuple]]:
+        """Retourne (lignes, curseur suivant) ; curseur None quand il n'y a plus rien"""
+        query, params = self._page_query(after, limit + 1)
+        with self._reading() as conn:
+            fetched = conn.execute(query, params).fetchall()
+        more = len(fetched) > limit
+        fetched = fetched[:limit]
+        rows = [row[:-2] for row in fetched]
+        cursor = tuple(fetched[-1][-2:]) if more else None
+        return rows, cursor
+
+    def explain(self, after: Optional[Tuple] = None) -> List[str]:
+        """Plan SQLite de page(after) : vérifie qu'une page reste un parcours d'index"""
+        query, params = self._page_query(after, 1)
+        with self._reading() as conn:
+            return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+    def count(self) -> int:
+        clauses, params = self._where()
+        query = f"SELECT COUNT(*) FROM ({self.base_sql})"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._reading() as conn:
+            return conn.execute(query, (*self.params, *params)).fetchone()[0]
@@ -0,0 +1,209 @@
+# core/parallel_inference.py
+"""
+Recalcul de l'inférence avant sur toute la base, en parallèle par processus
+
+    report = kb.run_parallel_inference(workers=8, shard_size=5000, on_progress=print)
+
+Découpage : par classe, puis en tranches d'ids d'instances (shard_size instances).
+Chaque worker (ProcessPoolExecutor) ouvre sa propre connexion `mode=ro`, reconstruit
+le moteur par `engine_factory` (fonction de module : les lambdas des règles ne
+passent pas entre processus), lit les valeurs de la tranche et renvoie les déductions.
+Le processus principal reste l'unique writer : une transaction par tranche reçue,
+stats recalculées une seule fois à la fin.
+
+Déterminisme : tranches disjointes et moteur identique dans chaque worker, l'état
+final ne dépend ni du nombre de workers ni de l'ordre d'arrivée des tranches.
+workers <= 1 : même chemin, exécuté dans le processus courant.
+
+Usage :
+    python -m core.parallel_inference --db data/XXpert.db --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from rich.console import Console
+
+from core.catalog import CatalogCache
+from core.codecs import decode_many
+from core.connection import open_readonly
+from core.inference import default_forward_engine
+from core.models.event import Event
+
+console = Console()
+
+
+class Shard(NamedTuple):
+    index: int
+    class_name: str
+    class_id: int
+    first_id: int
+    last_id: int
+
+
+# ========== DÉCOUPAGE ==========
+
+def plan_shards(conn, class_names=None, shard_size=5000) -> List[Shard]:
+    """Tranches d'au plus shard_size instances, dans l'ordre (classe, id) : même plan à chaque appel"""
+    classes = conn.execute("SELECT id, name FROM seclass ORDER BY id").fetchall()
+    if class_names is not None:
+        wanted = {name.strip().lower() for name in class_names}
+        classes = [(c_id, name) for c_id, name in classes if name.lower() in wanted]
+
+    shards = []
+    for c_id, name in classes:
+        ids = [row[0] for row in conn.execute("SELECT id FROM seinst WHERE class_id = ? ORDER BY id", (c_id,))]
+        for k in range(0, len(ids), shard_size):
+            chunk = ids[k:k + shard_size]
+            shards.append(Shard(len(shards), name, c_id, chunk[0], chunk[-1]))
+    return shards
+
+
+# ========== WORKER ==========
+
+_worker = {}  # connexion + moteur du processus worker
+
+
+def _init_worker(db_file, engine_factory, profile):
+    _worker["conn"] = open_readonly(db_file, profile=profile)
+    _worker["engine"] = engine = engine_factory()
+    engine.catalog = CatalogCache(_worker["conn"])  # types des conclusions (ForwardEngine.cast)
+    _worker["props"] = sorted(set(engine._by_condition) | engine._conclusions)
+
+
+def _close_worker():
+    conn = _worker.pop("conn", None)
+    if conn is not None:
+        conn.close()
+    _worker.clear()
+
+
+def _read_shard(conn, shard, props):
+    # Même lecture que KnowledgeBase.get_instances_values, restreinte à la tranche et aux propriétés des règles
+    ids = {name: i_id for i_id, name in conn.execute(
+        "SELECT id, name FROM seinst WHERE class_id = ? AND id BETWEEN ? AND ? ORDER BY id",
+        (shard.class_id, shard.first_id, shard.last_id))}
+    facts = {name: {} for name in ids}
+    if not props:
+        return ids, facts
+
+    rows = conn.execute(f"""
+        SELECT DISTINCT i.name, p.name, p.type, v.value
+        FROM seinst i
+        JOIN seclass_closure cc ON cc.descendant_id = i.class_id
+        JOIN seclass_prop cp ON cp.class_id = cc.ancestor_id
+        JOIN seprop p ON p.id = cp.prop_id
+        JOIN seinst_value v ON v.inst_id = i.id AND v.prop_id = p.id
+        WHERE i.class_id = ? AND i.id BETWEEN ? AND ? AND p.name IN ({", ".join("?" * len(props))})
+    """, (shard.class_id, shard.first_id, shard.last_id, *props)).fetchall()
+
+    by_type = {}
+    for row in rows:
+        if row[3] is not None:
+            by_type.setdefault(row[2], []).append(row)
+    for ptype, typed in by_type.items():
+        for (inst, prop, _, _), value in zip(typed, decode_many(ptype, [row[3] for row in typed])):
+            if value is not None:
+                facts[inst][prop] = value
+    return ids, facts
+
+
+def _run_shard(shard):
+    ids, facts = _read_shard(_worker["conn"], shard, _worker["props"])
+    results = _worker["engine"].infer_many(facts)
+    derived = {inst: values for inst, (_, values) in results.items() if values}
+    fired = sum(fired for fired, _ in results.values())
+    return shard, {inst: ids[inst] for inst in derived}, derived, fired, len(facts)
+
+
+# ========== EXÉCUTION ==========
+
+def _shard_results(db_file, shards, workers, engine_factory, profile):
+    if workers <= 1:
+        _init_worker(db_file, engine_factory, profile)
+        try:
+            for shard in shards:
+                yield _run_shard(shard)
+        finally:
+            _close_worker()
+        return
+
+    # Au plus 2 tranches en attente par worker : la mémoire ne dépend pas de la taille de la base
+    pending_limit = workers * 2
+    queue = iter(shards)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(db_file, engine_factory, profile)) as pool:
+        running = set()
+        for shard in queue:
+            running.add(pool.submit(_run_shard, shard))
+            if len(running) >= pending_limit:
+                break
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: f.result()[0].index):
+                yield future.result()
+                next_shard = next(queue, None)
+                if next_shard is not None:
+                    running.add(pool.submit(_run_shard, next_shard))
+
+
+def run_parallel_inference(kb, class_names=None, workers=None, shard_size=5000,
+                           engine_factory: Callable = default_forward_engine,
+                           on_progress: Optional[Callable[[Event], None]] = None,
+                           profile="reporting") -> Dict:
+    """
+    Recalcule les déductions de `engine_factory()` pour les instances de `class_names`
+    (toutes les classes si None). Retourne un rapport : shards, instances, fired,
+    derived, written, workers, elapsed.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    start = time.perf_counter()
+    shards = plan_shards(kb.conn, class_names, shard_size)
+    report = {"shards": len(shards), "instances": 0, "fired": 0, "derived": 0, "written": 0, "workers": workers}
+
+    with kb.deferred_stats():  # un seul recalcul des stats, après la dernière tranche
+        for done, (shard, ids, derived, fired, count) in enumerate(
+                _shard_results(kb.pool.db_file, shards, workers, engine_factory, profile), 1):
+            written = kb.set_instances_values(shard.class_name, derived, ids=ids)  # commit par tranche
+            report["instances"] += count
+            report["fired"] += fired
+            report["derived"] += sum(len(values) for values in derived.values())
+            report["written"] += sum(len(props) for props in written.values())
+            if on_progress:
+                on_progress(Event("inference_progress", "parallel_inference", entity=shard.class_name,
+                                  payload={"done": done, "total": len(shards), "instances": report["instances"],
+                                           "written": report["written"]}))
+
+    report["elapsed"] = time.perf_counter() - start
+    return report
+
+
+# ========== CLI ==========
+
+def main(argv=None):
+    from core.database import KnowledgeBase, DB_FILE
+
+    parser = argparse.ArgumentParser(description="Recalcul parallèle de l'inférence avant")
+    parser.add_argument("--db", default=DB_FILE, help="Base SQLite")
+    parser.add_argument("--workers", type=int, default=None, help="Processus (défaut : nombre de CPU)")
+    parser.add_argument("--shard-size", type=int, default=5000, help="Instances par tranche")
+    parser.add_argument("--class", dest="classes", action="append", help="Classe à traiter (répétable)")
+    args = parser.parse_args(argv)
+
+    kb = KnowledgeBase(args.db)
+    try:
+        report = kb.run_parallel_inference(args.classes, workers=args.workers, shard_size=args.shard_size,
+                                           on_progress=lambda e: console.print(
+                                               f"[cyan]{e.payload['done']}/{e.payload['total']}[/] {e.entity}"))
+    finally:
+        kb.close()
+    console.print(f"[green]{report['written']} valeurs écrites[/] ({report['instances']} instances, "
+                  f"{report['workers']} workers, {report['elapsed']:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,16 +4,33 @@ Repository Layer - Accès base de données SQLite
 Responsabilité : UNIQUEMENT les requêtes SQL, aucune logique métier
 """
 import sqlite3
-from typing import Optional, List, Tuple, Dict, Any
+from contextlib import contextmanager
+from typing import Optional, List, Tuple, Dict, Any, Union, Iterator
 from datetime import datetime
 
+from core.catalog import CatalogCache
+from core.codecs import stored_number
+from core.connection import ConnectionManager, PerformanceProfile
+from core.hierarchy import ensure_closure, closure_insert, closure_move, is_descendant
+
 
 class Repository:
     """Couche d'accès aux données - Pure SQL, zéro logique métier"""
     
-    def __init__(self, db_file: str = "data/XXpert.db"):
-        self.conn = sqlite3.connect(db_file)
+    def __init__(self, db_file: str = "data/XXpert.db", pool: Optional[ConnectionManager] = None,
+                 profile: Optional[Union[str, PerformanceProfile]] = None,
+                 catalog: Optional[CatalogCache] = None):
+        """
+        pool    : ConnectionManager partagé (ex. kb.pool) ; sinon un pool propre au Repository
+        profile : preset de PRAGMA (ignoré si pool est fourni)
+        catalog : catalogue du propriétaire du pool (ex. kb.catalog) : les écritures de l'un
+                  invalident le cache de l'autre ; sinon un catalogue propre au Repository
+        """
+        self._owns_pool = pool is None
+        self.pool = pool or ConnectionManager(db_file, profile=profile)
+        self.conn = self.pool.writer
         self.cursor = self.conn.cursor()
+        self.catalog = catalog or CatalogCache(self.conn)
         self._setup_db()
     
     def _setup_db(self):
@@ -52,6 +69,7 @@ class Repository:
                 inst_id INTEGER,
                 prop_id INTEGER,
                 value TEXT,
+                num_value REAL,
                 PRIMARY KEY (inst_id, prop_id),
                 FOREIGN KEY (inst_id) REFERENCES seinst(id),
                 FOREIGN KEY (prop_id) REFERENCES seprop(id)
@@ -109,23 +127,48 @@ class Repository:
                 event_type TEXT NOT NULL,
                 source TEXT NOT NULL,
                 entity TEXT,
-                payload TEXT,  # JSON
+                payload TEXT,  -- JSON
                 severity TEXT DEFAULT 'info',
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             );
 
         """)
         self.conn.commit()
+        self._migrate_schema()
         
         # Données initiales (classe Animal + admin)
         self._init_default_data()
     
+    def _migrate_schema(self):
+        """Colonne num_value (valeurs numériques typées) + seclass_closure sur une base existante"""
+        cols = {r[1] for r in self.cursor.execute("PRAGMA table_info(seinst_value)").fetchall()}
+        if "num_value" not in cols:
+            self.cursor.execute("ALTER TABLE seinst_value ADD COLUMN num_value REAL")
+            # Même projection que KnowledgeBase (core/codecs.py) : bool, dates, durées comprises
+            rows = self.cursor.execute("""
+                SELECT v.inst_id, v.prop_id, v.value, p.type FROM seinst_value v JOIN seprop p ON p.id = v.prop_id
+                WHERE v.value IS NOT NULL
+            """).fetchall()
+            self.cursor.executemany(
+                "UPDATE seinst_value SET num_value = ? WHERE inst_id = ? AND prop_id = ?",
+                [(stored_number(ptype, stored), inst_id, prop_id) for inst_id, prop_id, stored, ptype in rows])
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_seinst_value_num ON seinst_value (prop_id, num_value)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_seinst_class ON seinst (class_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_se_events_ts ON se_events (timestamp)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_se_events_entity_ts ON se_events (entity, timestamp)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_se_events_type_ts ON se_events (event_type, timestamp)")
+        self.conn.commit()
+        ensure_closure(self.conn)
+        self.conn.commit()
+    
     def _init_default_data(self):
         """Initialise les données par défaut si besoin"""
         # Classe Animal si absente
         self.cursor.execute("SELECT COUNT(*) FROM seclass WHERE name = 'Animal'")
         if self.cursor.fetchone()[0] == 0:
             self.cursor.execute("INSERT INTO seclass (name) VALUES ('Animal')")
+            closure_insert(self.conn, self.cursor.lastrowid)
+            self.catalog.invalidate_classes()
         
         # Admin par défaut
         self.cursor.execute("SELECT COUNT(*) FROM se_users WHERE username = 'admin'")
@@ -137,15 +180,12 @@ class Repository:
     # ========== CLASSES ==========
     
     def get_class_id(self, name: str) -> Optional[int]:
-        """Récupère l'ID d'une classe par son nom (insensible à la casse)"""
-        self.cursor.execute("SELECT id FROM seclass WHERE LOWER(name) = LOWER(?)", (name,))
-        row = self.cursor.fetchone()
-        return row[0] if row else None
+        """Récupère l'ID d'une classe par son nom (insensible à la casse, via le catalogue)"""
+        return self.catalog.class_id(name)
     
     def get_all_class_names(self) -> List[str]:
-        """Liste tous les noms de classes"""
-        self.cursor.execute("SELECT name FROM seclass ORDER BY name")
-        return [row[0] for row in self.cursor.fetchall()]
+        """Liste tous les noms de classes (via le catalogue)"""
+        return self.catalog.class_names()
 
 #----------------------------------------------------------------------------------
     """Insère une nouvelle classe, retourne son ID on  a repris e code grok dans database"""
@@ -176,7 +216,9 @@ class Repository:
             return False
         parent_id = self.get_class_id(parent) if parent else None
         self.cursor.execute("INSERT INTO seclass (name, parent_id) VALUES (?, ?)", (name, parent_id))
+        closure_insert(self.conn, self.cursor.lastrowid, parent_id)
         self.commit()
+        self.catalog.invalidate_classes()
         console.print(Panel(f"Classe [green]'{name}'[/] créée", style="green"))
 
         event = Event("class_added", "database", entity=name)
@@ -185,36 +227,39 @@ class Repository:
 #--------------------------------------------------------------------------------
 
     def get_class_hierarchy(self) -> List[Tuple[int, str, Optional[int], int]]:
-        """Retourne la hiérarchie complète (id, name, parent_id, level)"""
-        self.cursor.execute("""
-            WITH RECURSIVE tree(id, name, parent_id, level) AS (
-                SELECT id, name, parent_id, 0 FROM seclass WHERE parent_id IS NULL
-                UNION ALL
-                SELECT c.id, c.name, c.parent_id, t.level+1 
-                FROM seclass c JOIN tree t ON c.parent_id = t.id
-            )
-            SELECT id, name, parent_id, level FROM tree ORDER BY level, name
-        """)
-        return self.cursor.fetchall()
+        """Retourne la hiérarchie complète (id, name, parent_id, level), mise en cache par le catalogue"""
+        return self.catalog.hierarchy()
+    
+    def move_class(self, class_id: int, new_parent_id: Optional[int] = None) -> bool:
+        """Change le parent d'une classe (sous-arbre compris) ; False si cycle"""
+        if new_parent_id and is_descendant(self.conn, new_parent_id, class_id):
+            return False
+        closure_move(self.conn, class_id, new_parent_id)
+        self.conn.commit()
+        self.catalog.invalidate_classes()
+        return True
+    
+    def get_descendant_ids(self, class_id: int, include_self: bool = True) -> List[int]:
+        """IDs de la descendance (closure table, une requête indexée)"""
+        self.cursor.execute(
+            "SELECT descendant_id FROM seclass_closure WHERE ancestor_id = ? AND depth >= ? ORDER BY depth",
+            (class_id, 0 if include_self else 1)
+        )
+        return [row[0] for row in self.cursor.fetchall()]
     
     # ========== PROPRIÉTÉS ==========
     
     def get_property_id(self, name: str) -> Optional[int]:
-        """Récupère l'ID d'une propriété par son nom"""
-        self.cursor.execute("SELECT id FROM seprop WHERE LOWER(name) = LOWER(?)", (name,))
-        row = self.cursor.fetchone()
-        return row[0] if row else None
+        """Récupère l'ID d'une propriété par son nom (via le catalogue)"""
+        return self.catalog.property_id(name)
     
     def get_all_property_names(self) -> List[str]:
-        """Liste toutes les propriétés"""
-        self.cursor.execute("SELECT name FROM seprop ORDER BY name")
-        return [row[0] for row in self.cursor.fetchall()]
+        """Liste toutes les propriétés (via le catalogue)"""
+        return self.catalog.property_names()
     
     def get_property_type(self, prop_id: int) -> Optional[str]:
-        """Récupère le type d'une propriété"""
-        self.cursor.execute("SELECT type FROM seprop WHERE id = ?", (prop_id,))
-        row = self.cursor.fetchone()
-        return row[0] if row else None
+        """Récupère le type d'une propriété (via le catalogue)"""
+        return self.catalog.property_type_by_id(prop_id)
     
     def insert_property(self, name: str, ptype: str = "string") -> int:
         """Insère une nouvelle propriété"""
@@ -223,6 +268,7 @@ class Repository:
             (name, ptype)
         )
         self.conn.commit()
+        self.catalog.invalidate_properties()
         return self.cursor.lastrowid
     
     def link_property_to_class(self, class_id: int, prop_id: int) -> bool:
@@ -232,36 +278,24 @@ class Repository:
                 "INSERT INTO seclass_prop (class_id, prop_id) VALUES (?, ?)",
                 (class_id, prop_id)
             )
+            self.catalog.invalidate_links()
             self.conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False  # Déjà lié
     
     def get_properties_for_class(self, class_id: int) -> List[Tuple[int, str, str]]:
-        """Retourne les propriétés héritées (id, name, type) - avec héritage"""
-        props = []
-        visited = set()
-        current = class_id
-        
-        while current:
-            self.cursor.execute("""
-                SELECT p.id, p.name, p.type 
-                FROM seprop p 
-                JOIN seclass_prop cp ON p.id = cp.prop_id 
-                WHERE cp.class_id = ?
-            """, (current,))
-            
-            for row in self.cursor.fetchall():
-                if row[0] not in visited:
-                    props.append(row)
-                    visited.add(row[0])
-            
-            # Parent
-            self.cursor.execute("SELECT parent_id FROM seclass WHERE id = ?", (current,))
-            row = self.cursor.fetchone()
-            current = row[0] if row else None
-        
-        return props
+        """Retourne les propriétés héritées (id, name, type) - classe d'abord, puis ancêtres du plus proche au plus lointain"""
+        self.cursor.execute("""
+            SELECT p.id, p.name, p.type
+            FROM seclass_closure cc
+            JOIN seclass_prop cp ON cp.class_id = cc.ancestor_id
+            JOIN seprop p ON p.id = cp.prop_id
+            WHERE cc.descendant_id = ?
+            GROUP BY p.id
+            ORDER BY MIN(cc.depth)
+        """, (class_id,))
+        return self.cursor.fetchall()
     
     # ========== INSTANCES ==========
     
@@ -303,12 +337,15 @@ class Repository:
         return row[0] if row else None
     
     def upsert_instance_value(self, inst_id: int, prop_id: int, value: Optional[str]):
-        """Insert ou update une valeur"""
+        """Insert ou update une valeur (num_value : projection du codec du type, voir core/codecs.py)"""
+        num_value = None
+        if value is not None:
+            num_value = stored_number(self.get_property_type(prop_id), value)
         self.cursor.execute("""
-            INSERT INTO seinst_value (inst_id, prop_id, value)
-            VALUES (?, ?, ?)
-            ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value
-        """, (inst_id, prop_id, value))
+            INSERT INTO seinst_value (inst_id, prop_id, value, num_value)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value, num_value = excluded.num_value
+        """, (inst_id, prop_id, value, num_value))
         self.conn.commit()
     
     # ========== STATISTIQUES ==========
@@ -358,21 +395,45 @@ class Repository:
         self.conn.commit()
     
     def get_all_numeric_values(self, class_id: int, prop_id: int) -> List[float]:
-        """Récupère toutes les valeurs numériques pour calcul stats"""
+        """Récupère toutes les valeurs numériques pour calcul stats (colonne num_value)"""
+        with self._reading() as conn:
+            rows = conn.execute("""
+                SELECT v.num_value 
+                FROM seinst_value v
+                JOIN seinst i ON v.inst_id = i.id
+                WHERE i.class_id = ? AND v.prop_id = ? AND v.num_value IS NOT NULL
+            """, (class_id, prop_id)).fetchall()
+        return [row[0] for row in rows]
+    
+    def iter_all_numeric_values(self, class_id: int, prop_id: int, chunk_size: int = 5000) -> Iterator[float]:
+        """Variante en flux de get_all_numeric_values (fetchmany sur un cursor dédié, mémoire constante)"""
+        with self._reading() as conn:
+            cursor = conn.execute("""
+                SELECT v.num_value 
+                FROM seinst_value v
+                JOIN seinst i ON v.inst_id = i.id
+                WHERE i.class_id = ? AND v.prop_id = ? AND v.num_value IS NOT NULL
+            """, (class_id, prop_id))
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    for row in rows:
+                        yield row[0]
+            finally:
+                cursor.close()
+    
+    def get_numeric_summary(self, class_id: int, prop_id: int) -> Dict[str, Any]:
+        """count/min/max/avg calculés en SQL sur num_value"""
         self.cursor.execute("""
-            SELECT v.value 
+            SELECT COUNT(v.num_value), MIN(v.num_value), MAX(v.num_value), AVG(v.num_value)
             FROM seinst_value v
             JOIN seinst i ON v.inst_id = i.id
-            WHERE i.class_id = ? AND v.prop_id = ? AND v.value IS NOT NULL
+            WHERE i.class_id = ? AND v.prop_id = ? AND v.num_value IS NOT NULL
         """, (class_id, prop_id))
-        
-        values = []
-        for row in self.cursor.fetchall():
-            try:
-                values.append(float(row[0]))
-            except (ValueError, TypeError):
-                pass
-        return values
+        count, min_v, max_v, avg = self.cursor.fetchone()
+        return {"count": count, "min": min_v, "max": max_v, "avg": avg}
     
     # ========== SEUILS MANUELS ==========
     
@@ -475,21 +536,36 @@ class Repository:
         if entity:
             query += " WHERE entity = ?"
             params = (entity,)
-        query += " ORDER BY timestamp DESC LIMIT ?"
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
         params += (limit,)
-        return self.cursor.execute(query, params).fetchall()  # Return list tuples, map to Event if needed
+        with self._reading() as conn:
+            return conn.execute(query, params).fetchall()  # Return list tuples, map to Event if needed
 
 
     # ========== UTILITAIRES ==========
     
+    @contextmanager
+    def _reading(self):
+        """Lecteur du pool, ou le writer s'il a des écritures non commitées"""
+        if self.conn.in_transaction:
+            yield self.conn
+        else:
+            with self.pool.reader() as conn:
+                yield conn
+    
+    def use_profile(self, profile: Union[str, PerformanceProfile]):
+        """Bascule temporaire de profil : with repo.use_profile("reporting"): ..."""
+        return self.pool.use_profile(profile)
+    
     def commit(self):
         """Commit explicite si besoin"""
         self.conn.commit()
     
     def close(self):
-        """Ferme la connexion"""
+        """Ferme la connexion (le pool partagé reste à son propriétaire)"""
         self.conn.commit()
-        self.conn.close()
+        if self._owns_pool:
+            self.pool.close()
 
 
 #--------------------------------------
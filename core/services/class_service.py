@@ -1,5 +1,5 @@
 # core/services/class_service.py (handle Commands, use repo/WM, emit Events, apply rules)
-from core.models.event import Event
+from core.models.event import Event, Severity
 
 class ClassService:
     def __init__(self, repo, wm):
@@ -0,0 +1,186 @@
+# core/stats.py
+"""
+Statistiques incrémentales pour seprop_stats (une instance par (classe, propriété))
+
+- count / sum / moyenne + M2 de Welford : mises à jour O(1) pour add / remove / replace
+- multiset trié par blocs (SortedMultiset) : min, max et médiane exacts sans relire la table
+
+SortedMultiset : blocs triés d'au plus 2 * LOAD valeurs + arbre de Fenwick des tailles de blocs
+    add / remove : O(log n) pour localiser, plus le décalage d'au plus 2 * LOAD valeurs dans le bloc
+    k-ième valeur (médiane) : O(log n) ; min / max : O(1)
+    (une liste unique + insort décale O(n) valeurs à chaque écriture)
+"""
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, List, Optional
+
+
+class SortedMultiset:
+    """Multiset de flottants trié, indexable par rang"""
+
+    LOAD = 512
+
+    def __init__(self, values: Iterable[float] = ()):
+        values = sorted(values)
+        self._blocks: List[List[float]] = [values[k:k + self.LOAD] for k in range(0, len(values), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(values)
+        self._tree = None  # Fenwick des tailles de blocs, reconstruit après split / suppression de bloc
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value: float):
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([value])
+            self._maxes.append(value)
+            self._tree = None
+            return
+        b = min(bisect_right(self._maxes, value), len(self._blocks) - 1)
+        block = self._blocks[b]
+        insort(block, value)
+        self._maxes[b] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self._blocks[b:b + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._maxes[b:b + 1] = [block[self.LOAD - 1], block[-1]]
+            self._tree = None
+        else:
+            self._tree_update(b, 1)
+
+    def remove(self, value: float) -> bool:
+        """Retire une occurrence ; False si absente"""
+        b = bisect_left(self._maxes, value)
+        if b == len(self._blocks):
+            return False
+        block = self._blocks[b]
+        pos = bisect_left(block, value)
+        if block[pos] != value:
+            return False
+        del block[pos]
+        self._len -= 1
+        if block:
+            self._maxes[b] = block[-1]
+            self._tree_update(b, -1)
+        else:
+            del self._blocks[b], self._maxes[b]
+            self._tree = None
+        return True
+
+    def __getitem__(self, k: int) -> float:
+        """k-ième plus petite valeur (0 <= k < len)"""
+        if self._tree is None:
+            self._build_tree()
+        # Descente dans le Fenwick : dernier bloc dont la taille cumulée est <= k
+        b, step = 0, 1 << len(self._blocks).bit_length()
+        while step:
+            nxt = b + step
+            if nxt <= len(self._blocks) and self._tree[nxt] <= k:
+                b = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return self._blocks[b][k]
+
+    def first(self) -> Optional[float]:
+        return self._blocks[0][0] if self._blocks else None
+
+    def last(self) -> Optional[float]:
+        return self._maxes[-1] if self._blocks else None
+
+    def _build_tree(self):
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_update(self, b, delta):
+        if self._tree is None:
+            return
+        i = b + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+
+class RunningStats:
+    """Statistiques suffisantes d'un multiset de valeurs numériques"""
+
+    def __init__(self, values: Iterable[float] = ()):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0           # somme des carrés des écarts (Welford)
+        values = [float(value) for value in values]
+        for value in values:
+            self._welford_add(value)
+        self._sorted = SortedMultiset(values)  # ordre statistique, trié une seule fois au chargement
+
+    # ========== DELTAS ==========
+
+    def add(self, value: float):
+        value = float(value)
+        self._welford_add(value)
+        self._sorted.add(value)
+
+    def _welford_add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float) -> bool:
+        """Retire une occurrence ; False si la valeur n'est pas dans le multiset"""
+        value = float(value)
+        if not self._sorted.remove(value):
+            return False
+
+        if self.count == 1:
+            self.count, self.total, self.mean, self.m2 = 0, 0.0, 0.0, 0.0
+            return True
+        old_mean = self.mean
+        self.count -= 1
+        self.total -= value
+        self.mean = old_mean - (value - old_mean) / self.count
+        self.m2 -= (value - old_mean) * (value - self.mean)
+        if self.m2 < 0:  # dérive numérique
+            self.m2 = 0.0
+        return True
+
+    def replace(self, old: Optional[float], new: Optional[float]) -> bool:
+        """Remplace old par new (None = absent) ; False si old introuvable"""
+        ok = True
+        if old is not None:
+            ok = self.remove(old)
+        if new is not None:
+            self.add(new)
+        return ok
+
+    # ========== LECTURES ==========
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._sorted.first()
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._sorted.last()
+
+    @property
+    def median(self) -> Optional[float]:
+        n = len(self._sorted)
+        if not n:
+            return None
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+    @property
+    def std_dev(self) -> float:
+        """Écart-type d'échantillon (comme statistics.stdev), 0.0 sous 2 valeurs"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
@@ -0,0 +1,102 @@
+# core/thresholds.py
+"""
+Résolution des seuils LL / L / M / H / HH par (classe, propriété)
+
+    seuils manuels (seprop_manual_thresholds)  : prioritaires
+    stats auto-apprises (seprop_stats)         : M = médiane (ou moyenne), L/H = moyenne ± σ, LL/HH = ± 2σ
+
+Toutes les paires sont chargées en une jointure au premier accès puis gardées
+en mémoire. Les écritures (set_manual_thresholds, stats) invalident la paire,
+rechargée seule à la lecture suivante.
+"""
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional, Tuple
+
+_EMPTY = {"LL": None, "L": None, "M": None, "H": None, "HH": None}
+
+_QUERY = """
+    SELECT k.class_id, k.prop_id, m.ll, m.l, m.h, m.hh, s.mean_value, s.median_value, s.std_dev
+    FROM (SELECT class_id, prop_id FROM seprop_manual_thresholds
+          UNION
+          SELECT class_id, prop_id FROM seprop_stats) k
+    LEFT JOIN seprop_manual_thresholds m ON m.class_id = k.class_id AND m.prop_id = k.prop_id
+    LEFT JOIN seprop_stats s ON s.class_id = k.class_id AND s.prop_id = k.prop_id
+"""
+
+
+def merge_thresholds(manual: Optional[Tuple], stats: Optional[Tuple]) -> Dict[str, Optional[float]]:
+    """manual = (ll, l, h, hh) ou None ; stats = (mean, median, std_dev) ou None"""
+    thresholds = dict(_EMPTY)
+
+    # 1. Seuils manuels (priorité)
+    if manual:
+        thresholds["LL"], thresholds["L"], thresholds["H"], thresholds["HH"] = manual
+
+    # 2. Stats auto-apprises
+    if stats and stats[0] is not None:
+        mean, median, stdev = stats
+        thresholds["M"] = median or mean
+
+        if stdev and stdev > 0:
+            if thresholds["L"] is None:
+                thresholds["L"] = mean - stdev
+            if thresholds["H"] is None:
+                thresholds["H"] = mean + stdev
+            if thresholds["LL"] is None:
+                thresholds["LL"] = mean - 2 * stdev
+            if thresholds["HH"] is None:
+                thresholds["HH"] = mean + 2 * stdev
+
+    return thresholds
+
+
+class ThresholdResolver:
+    """Cache (class_id, prop_id) -> seuils fusionnés"""
+
+    def __init__(self, conn, reading: Optional[Callable] = None):
+        """reading : fabrique de context manager -> connexion (ex. kb._reading), sinon conn"""
+        self.conn = conn
+        self._reading = reading or (lambda: nullcontext(conn))
+        self._thresholds: Optional[Dict[Tuple[int, int], Dict]] = None
+        self._stale = set()
+
+    def _merge_row(self, row):
+        manual = row[2:6] if any(v is not None for v in row[2:6]) else None
+        return merge_thresholds(manual, row[6:9])
+
+    def _load_all(self):
+        with self._reading() as conn:
+            rows = conn.execute(_QUERY).fetchall()
+        self._thresholds = {(row[0], row[1]): self._merge_row(row) for row in rows}
+        self._stale.clear()
+
+    def _reload(self, pair):
+        with self._reading() as conn:
+            row = conn.execute(f"SELECT * FROM ({_QUERY}) WHERE class_id = ? AND prop_id = ?", pair).fetchone()
+        if row:
+            self._thresholds[pair] = self._merge_row(row)
+        else:
+            self._thresholds.pop(pair, None)
+        self._stale.discard(pair)
+
+    def get(self, class_id, prop_id) -> Dict[str, Optional[float]]:
+        if self._thresholds is None:
+            self._load_all()
+        pair = (class_id, prop_id)
+        if pair in self._stale:
+            self._reload(pair)
+        return dict(self._thresholds.get(pair, _EMPTY))
+
+    # ========== INVALIDATION ==========
+
+    def invalidate_pair(self, class_id, prop_id):
+        if self._thresholds is not None:
+            self._stale.add((class_id, prop_id))
+
+    def invalidate_property(self, prop_id):
+        if self._thresholds is not None:
+            self._stale.update(pair for pair in self._thresholds if pair[1] == prop_id)
+
+    def invalidate(self):
+        self._thresholds = None
+        self._stale.clear()
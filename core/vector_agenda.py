@@ -0,0 +1,115 @@
+# core/vector_agenda.py
+"""
+Chaînage avant sur tout un lot d'instances en colonnes NumPy
+
+    results = infer_vectorized(engine, {"c1": {"tension": 230.0, ...}, ...})
+    results["c1"]             # (règles déclenchées, {conclusion: valeur})
+
+Une ligne par instance, une colonne par propriété (NaN = inconnue). Même sémantique
+que core.inference.Agenda : à chaque étape, chaque ligne déclenche la règle prête
+de plus petit indice (conditions connues, conclusion inconnue, pas encore évaluée) ;
+les lignes qui ont choisi la même règle sont calculées ensemble.
+
+    vectorized=True      : la calculation s'applique telle quelle aux tableaux (u * i)
+    vectorized=callable  : forme tableau ; NaN là où la forme scalaire renvoie None
+    sans vectorized      : calculation appelée ligne par ligne (repli scalaire)
+
+Comptage et types comme Agenda : une règle dont le calcul lève une exception n'est
+pas comptée dans `fired`, et chaque déduction passe par ForwardEngine.cast (codec
+du type de la conclusion : 460 pour un int, 460.0 pour un float).
+
+Seuls les faits numériques passent par ici : une instance dont une entrée de
+règle n'est pas un nombre, ou dont une règle scalaire déduit un non-nombre, est
+absente du résultat et reste au chemin scalaire (ForwardEngine.infer_many).
+"""
+from typing import Dict, Hashable, Tuple
+
+import numpy as np
+
+
+def _scalar(calculation, args, size):
+    # Repli ligne par ligne, erreurs (raised) et None -> NaN comme dans Agenda.run ; résultat non numérique -> escaped
+    out = np.full(size, np.nan)
+    escaped = np.zeros(size, dtype=bool)
+    raised = np.zeros(size, dtype=bool)
+    for j in range(size):
+        try:
+            value = calculation(*(float(column[j]) for column in args))
+        except Exception:
+            raised[j] = True
+            continue
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            escaped[j] = True
+        else:
+            out[j] = value
+    return out, escaped, raised
+
+
+def _evaluate(rule, args, size):
+    if rule.vectorized:
+        function = rule.calculation if rule.vectorized is True else rule.vectorized
+        try:
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                result = np.asarray(function(*args), dtype=np.float64)
+            no_rows = np.zeros(size, dtype=bool)
+            return np.broadcast_to(result, (size,)), no_rows, no_rows
+        except Exception:
+            pass  # forme tableau en échec : repli scalaire
+    return _scalar(rule.calculation, args, size)
+
+
+def infer_vectorized(engine, facts_by_key: Dict[Hashable, dict]) -> Dict[Hashable, Tuple[int, dict]]:
+    keys = list(facts_by_key)
+    rules = engine.rules
+    if not keys or not rules:
+        return {key: (0, {}) for key in keys}
+
+    props = sorted(set(engine._by_condition) | engine._conclusions)
+    col = {prop: i for i, prop in enumerate(props)}
+    n = len(keys)
+
+    values = np.full((len(props), n), np.nan)
+    active = np.ones(n, dtype=bool)          # False : ligne rendue au chemin scalaire
+    for j, key in enumerate(keys):
+        for prop, value in facts_by_key[key].items():
+            if value is None or prop not in col:
+                continue
+            if type(value) not in (int, float):  # bool, texte, date... : non numérique
+                active[j] = False
+                break
+            values[col[prop], j] = value
+    known = ~np.isnan(values)
+
+    conditions = [[col[c] for c in rule.conditions] for rule in rules]
+    conclusions = [col[rule.conclusion] for rule in rules]
+    done = np.zeros((len(rules), n), dtype=bool)
+    fired = np.zeros(n, dtype=np.int64)
+    derived = [{} for _ in keys]
+
+    while True:
+        ready = ~done & ~known[conclusions] & active
+        for r, conds in enumerate(conditions):
+            if conds:
+                ready[r] &= known[conds].all(axis=0)
+        candidates = ready.any(axis=0)
+        if not candidates.any():
+            break
+        choice = np.where(candidates, ready.argmax(axis=0), -1)  # règle prête de plus petit indice
+
+        for r in np.unique(choice[candidates]):
+            rule = rules[r]
+            rows = np.nonzero(choice == r)[0]
+            done[r, rows] = True
+            result, escaped, raised = _evaluate(rule, [values[c, rows] for c in conditions[r]], len(rows))
+            fired[rows[~raised]] += 1
+            active[rows[escaped]] = False
+            ok = ~np.isnan(result)
+            target = rows[ok]
+            values[conclusions[r], target] = np.round(result[ok], 6)
+            known[conclusions[r], target] = True
+            for j, value in zip(target.tolist(), result[ok].tolist()):
+                derived[j][rule.conclusion] = engine.cast(rule.conclusion, value)
+
+    return {key: (int(fired[j]), derived[j]) for j, key in enumerate(keys) if active[j]}
@@ -0,0 +1,388 @@
+# core/workflow/merge.py
+"""
+Fusion transactionnelle d'une soumission (se_submissions.changes_json)
+
+    report = SubmissionMerger(kb).merge(changes)
+    if report:                     # vrai si aucun conflit / erreur
+        ...
+    report.results                 # un ChangeResult par changement, dans l'ordre de la soumission
+
+Changements reconnus (champ "action", données dans "data") :
+    add_class        {name, parent?}
+    add_property     {name, type?}
+    modify_property  {name, new_name?, new_type?}
+    attach_property  {class_name, prop_name}
+    add_instance     {name, class_name}
+    set_value        {instance, class_name, prop, value}
+    delete_value     {instance, class_name, prop}
+    delete_instance  {name, class_name}
+    delete_property  {name}
+
+1. Validation de toute la soumission contre l'état courant : catalogue en mémoire,
+   une requête pour les liens classe/propriété, une pour les instances existantes.
+2. Ordre de dépendance : classes (parents d'abord) -> propriétés (ajouts, puis renommages)
+   -> liens -> instances -> valeurs -> suppressions.
+3. Application dans une seule transaction (executemany), stats recalculées une fois à la fin.
+   Les modifications / suppressions, rares, passent une à une par les méthodes de la KB.
+
+strict=True (défaut) : tout ou rien — un seul conflit/erreur et rien n'est appliqué.
+strict=False : les changements valides sont appliqués, les autres rapportés.
+"""
+import time
+from collections import Counter
+
+from core.codecs import codec_names, get_codec
+from core.hierarchy import closure_insert
+
+ORDER = {"add_class": 0, "add_property": 1, "modify_property": 2, "attach_property": 3, "add_instance": 4,
+         "set_value": 5, "delete_value": 6, "delete_instance": 7, "delete_property": 8}
+
+APPLIED = "applied"
+SKIPPED = "skipped"          # déjà dans l'état voulu (lien existant...)
+CONFLICT = "conflict"        # existe déjà / doublon dans la soumission
+ERROR = "error"              # données invalides, dépendance manquante
+NOT_APPLIED = "not_applied"  # valide, mais soumission rejetée (strict)
+_PENDING = "pending"
+
+_BATCH = 500  # limite de paramètres SQLite
+
+
+class _Abort(Exception):
+    """Échec à l'application en mode strict : annule la transaction"""
+
+
+class ChangeResult:
+    def __init__(self, index, action, data):
+        self.index = index
+        self.action = action
+        self.data = data
+        self.status = _PENDING
+        self.message = None
+
+    def __repr__(self):
+        return f"ChangeResult({self.index}, {self.action!r}, {self.status!r}, {self.message!r})"
+
+    def fail(self, status, message):
+        self.status = status
+        self.message = message
+        return False
+
+
+class MergeReport:
+    def __init__(self, results, elapsed=0.0):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def success(self):
+        return all(r.status in (APPLIED, SKIPPED) for r in self.results)
+
+    def __bool__(self):
+        return self.success
+
+    def counts(self):
+        return dict(Counter(r.status for r in self.results))
+
+    def failures(self):
+        return [r for r in self.results if r.status in (CONFLICT, ERROR)]
+
+
+class SubmissionMerger:
+    def __init__(self, kb):
+        self.kb = kb
+
+    def merge(self, changes, strict=True) -> MergeReport:
+        start = time.perf_counter()
+        results = []
+        for i, change in enumerate(changes):
+            change = change if isinstance(change, dict) else {}
+            result = ChangeResult(i, change.get("action"), change.get("data") or {})
+            if result.action not in ORDER:
+                result.fail(ERROR, f"action inconnue : {result.action!r}")
+            results.append(result)
+
+        plan = self._validate(results)
+        pending = [r for r in results if r.status == _PENDING]
+        if strict and any(r.status in (CONFLICT, ERROR) for r in results):
+            for r in pending:
+                r.status = NOT_APPLIED
+        elif pending:
+            try:
+                self._apply(plan, strict)
+            except _Abort:
+                for r in results:
+                    if r.status in (APPLIED, _PENDING):
+                        r.status = NOT_APPLIED
+        return MergeReport(results, time.perf_counter() - start)
+
+    # ========== VALIDATION ==========
+
+    def _validate(self, results):
+        kb = self.kb
+        catalog = kb.catalog
+        by_action = {action: [r for r in results if r.action == action and r.status == _PENDING] for action in ORDER}
+        plan = {"classes": [], "properties": [], "renames": [], "links": [], "instances": [], "values": [],
+                "deletes": []}
+
+        # --- classes : nom normalisé comme add_class, parent existant ou ajouté dans la soumission
+        new_classes = {}
+        for r in by_action["add_class"]:
+            name = (r.data.get("name") or "").strip().capitalize()
+            if not name:
+                r.fail(ERROR, "nom de classe vide")
+                continue
+            key = name.lower()
+            if catalog.class_id(key) or key in new_classes:
+                r.fail(CONFLICT, f"classe '{name}' existe déjà")
+                continue
+            parent = (r.data.get("parent") or "").strip().lower() or None
+            new_classes[key] = (r, name, parent)
+        plan["classes"] = self._order_classes(new_classes)
+
+        def class_known(name):
+            key = (name or "").strip().lower()
+            return bool(key) and (catalog.class_id(key) is not None or key in new_classes)
+
+        # --- propriétés
+        new_props = {}
+        for r in by_action["add_property"]:
+            name = (r.data.get("name") or "").strip().lower()
+            ptype = r.data.get("type") or "string"
+            if not name:
+                r.fail(ERROR, "nom de propriété vide")
+            elif ptype not in codec_names():
+                r.fail(ERROR, f"type inconnu : {ptype}")
+            elif catalog.property(name) or name in new_props:
+                r.fail(CONFLICT, f"propriété '{name}' existe déjà")
+            else:
+                new_props[name] = ptype
+                plan["properties"].append((r, name, ptype))
+
+        # --- modifications : propriété existante, nouveau nom libre ; l'ancien nom disparaît
+        renamed = set()
+        for r in by_action["modify_property"]:
+            name = (r.data.get("name") or "").strip().lower()
+            new_name = (r.data.get("new_name") or "").strip().lower() or None
+            new_type = r.data.get("new_type") or None
+            if not catalog.property(name) or name in renamed:
+                r.fail(ERROR, f"propriété inconnue : {r.data.get('name')}")
+            elif new_type and new_type not in codec_names():
+                r.fail(ERROR, f"type inconnu : {new_type}")
+            elif not new_name and not new_type:
+                r.fail(ERROR, "aucune modification")
+            elif new_name and new_name != name and (catalog.property(new_name) or new_name in new_props):
+                r.fail(CONFLICT, f"propriété '{new_name}' existe déjà")
+            else:
+                if new_name and new_name != name:
+                    renamed.add(name)
+                    new_props[new_name] = new_type or catalog.property_type(name)
+                elif new_type:
+                    new_props[name] = new_type
+                plan["renames"].append((r, name, new_name, new_type))
+
+        def prop_type(name):
+            key = (name or "").strip().lower()
+            if key in renamed:
+                return None
+            return new_props.get(key) or catalog.property_type(key)
+
+        # --- liens classe / propriété (une requête pour les liens déjà présents)
+        class_ids = {catalog.class_id(r.data.get("class_name")) for r in by_action["attach_property"]}
+        existing_links = set(self._select_in("SELECT class_id, prop_id FROM seclass_prop WHERE class_id IN ({})",
+                                             [c for c in class_ids if c]))
+        seen_links = set()
+        for r in by_action["attach_property"]:
+            class_key = (r.data.get("class_name") or "").strip().lower()
+            prop_key = (r.data.get("prop_name") or "").strip().lower()
+            if not class_known(class_key):
+                r.fail(ERROR, f"classe inconnue : {r.data.get('class_name')}")
+            elif not prop_type(prop_key):
+                r.fail(ERROR, f"propriété inconnue : {r.data.get('prop_name')}")
+            elif ((catalog.class_id(class_key), catalog.property_id(prop_key)) in existing_links
+                  or (class_key, prop_key) in seen_links):
+                r.status = SKIPPED
+                r.message = "déjà liée"
+            else:
+                seen_links.add((class_key, prop_key))
+                plan["links"].append((r, class_key, prop_key))
+
+        # --- instances existantes des classes concernées (une requête)
+        involved = {catalog.class_id(r.data.get("class_name"))
+                    for action in ("add_instance", "set_value", "delete_value", "delete_instance")
+                    for r in by_action[action]}
+        self.existing_instances = {
+            (c_id, name.lower()): i_id
+            for i_id, name, c_id in self._select_in("SELECT id, name, class_id FROM seinst WHERE class_id IN ({})",
+                                                    [c for c in involved if c])}
+
+        def instance_key(class_name, name):
+            class_key = (class_name or "").strip().lower()
+            return class_key, (name or "").strip().lower()
+
+        new_instances = set()
+        for r in by_action["add_instance"]:
+            name = (r.data.get("name") or "").strip()
+            class_key, inst_key = instance_key(r.data.get("class_name"), name)
+            if not name:
+                r.fail(ERROR, "nom d'instance vide")
+            elif not class_known(class_key):
+                r.fail(ERROR, f"classe inconnue : {r.data.get('class_name')}")
+            elif (catalog.class_id(class_key), inst_key) in self.existing_instances or (class_key, inst_key) in new_instances:
+                r.fail(CONFLICT, f"instance '{name}' existe déjà")
+            else:
+                new_instances.add((class_key, inst_key))
+                plan["instances"].append((r, name, class_key))
+
+        # --- valeurs : instance et propriété connues, valeur encodable dans le type
+        for r in by_action["set_value"]:
+            class_key, inst_key = instance_key(r.data.get("class_name"), r.data.get("instance"))
+            prop_key = (r.data.get("prop") or r.data.get("prop_name") or "").strip().lower()
+            ptype = prop_type(prop_key)
+            if (catalog.class_id(class_key), inst_key) not in self.existing_instances \
+                    and (class_key, inst_key) not in new_instances:
+                r.fail(ERROR, f"instance inconnue : {r.data.get('instance')}")
+                continue
+            if not ptype:
+                r.fail(ERROR, f"propriété inconnue : {prop_key}")
+                continue
+            codec = get_codec(ptype)
+            try:
+                value, stored = codec.encode(r.data.get("value"))
+            except (ValueError, TypeError, AttributeError):
+                r.fail(ERROR, f"valeur invalide pour le type {ptype}")
+                continue
+            plan["values"].append((r, class_key, inst_key, prop_key, stored, codec.to_number(value)))
+
+        # --- suppressions : uniquement sur des entités déjà en base
+        for r in by_action["delete_value"] + by_action["delete_instance"]:
+            name = r.data.get("instance") if r.action == "delete_value" else r.data.get("name")
+            class_key, inst_key = instance_key(r.data.get("class_name"), name)
+            if (catalog.class_id(class_key), inst_key) not in self.existing_instances:
+                r.fail(ERROR, f"instance inconnue : {name}")
+            elif r.action == "delete_value" and not prop_type(r.data.get("prop") or r.data.get("prop_name")):
+                r.fail(ERROR, f"propriété inconnue : {r.data.get('prop') or r.data.get('prop_name')}")
+            else:
+                plan["deletes"].append(r)
+        for r in by_action["delete_property"]:
+            if not catalog.property(r.data.get("name")):
+                r.fail(ERROR, f"propriété inconnue : {r.data.get('name')}")
+            else:
+                plan["deletes"].append(r)
+
+        return plan
+
+    def _order_classes(self, new_classes):
+        # Parents avant enfants ; parent inconnu, rejeté ou cycle -> erreur
+        ordered, state = [], {}
+
+        def visit(key):
+            if state.get(key) == "done":
+                return True
+            if state.get(key) == "visiting":
+                return False  # cycle
+            r, name, parent = new_classes[key]
+            if r.status != _PENDING:
+                return False
+            state[key] = "visiting"
+            ok = True
+            if parent and parent in new_classes:
+                if not visit(parent):
+                    ok = r.fail(ERROR, f"parent '{parent}' rejeté ou cycle")
+            elif parent and self.kb.catalog.class_id(parent) is None:
+                ok = r.fail(ERROR, f"parent inconnu : {parent}")
+            state[key] = "done" if ok else "failed"
+            if ok:
+                ordered.append((r, name, parent))
+            return ok
+
+        for key in new_classes:
+            visit(key)
+        return ordered
+
+    def _select_in(self, query, ids):
+        rows = []
+        ids = list(ids)
+        for k in range(0, len(ids), _BATCH):
+            batch = ids[k:k + _BATCH]
+            rows.extend(self.kb.conn.execute(query.format(", ".join("?" * len(batch))), batch).fetchall())
+        return rows
+
+    # ========== APPLICATION ==========
+
+    def _apply(self, plan, strict):
+        kb = self.kb
+        catalog = kb.catalog
+        cursor = kb.cursor
+        with kb.transaction():
+            # Classes une par une (id nécessaire pour les enfants et la closure), parents d'abord
+            new_ids = {}
+            for r, name, parent in plan["classes"]:
+                parent_id = (new_ids.get(parent) or catalog.class_id(parent)) if parent else None
+                cursor.execute("INSERT INTO seclass (name, parent_id) VALUES (?, ?)", (name, parent_id))
+                new_ids[name.lower()] = cursor.lastrowid
+                closure_insert(kb.conn, cursor.lastrowid, parent_id)
+                r.status = APPLIED
+            if new_ids:
+                catalog.invalidate_classes()
+
+            if plan["properties"]:
+                cursor.executemany("INSERT INTO seprop (name, type) VALUES (?, ?)",
+                                   [(name, ptype) for _, name, ptype in plan["properties"]])
+                catalog.invalidate_properties()
+
+            for r, name, new_name, new_type in plan["renames"]:
+                if kb.modify_property(name, new_name if new_name != name else None, new_type):
+                    r.status = APPLIED
+                else:
+                    r.fail(ERROR, "modification refusée")  # ne devrait pas arriver après validation
+                    if strict:
+                        raise _Abort()
+
+            if plan["links"]:
+                cursor.executemany("INSERT OR IGNORE INTO seclass_prop (class_id, prop_id) VALUES (?, ?)",
+                                   [(catalog.class_id(c), catalog.property_id(p)) for _, c, p in plan["links"]])
+                catalog.invalidate_links()
+
+            instance_ids = dict(self.existing_instances)
+            if plan["instances"]:
+                last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM seinst").fetchone()[0]
+                cursor.executemany("INSERT INTO seinst (name, class_id) VALUES (?, ?)",
+                                   [(name, catalog.class_id(c)) for _, name, c in plan["instances"]])
+                for i_id, name, c_id in cursor.execute("SELECT id, name, class_id FROM seinst WHERE id > ?",
+                                                       (last_id,)).fetchall():
+                    instance_ids[(c_id, name.lower())] = i_id
+
+            if plan["values"]:
+                rows, numeric_pairs = [], set()
+                for _, class_key, inst_key, prop_key, stored, num in plan["values"]:
+                    c_id = catalog.class_id(class_key)
+                    p_id = catalog.property_id(prop_key)
+                    rows.append((instance_ids[(c_id, inst_key)], p_id, stored, num))
+                    if catalog.property_type(prop_key) in ("int", "float"):
+                        numeric_pairs.add((c_id, p_id))
+                cursor.executemany("""
+                    INSERT INTO seinst_value (inst_id, prop_id, value, num_value) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(inst_id, prop_id) DO UPDATE SET value = excluded.value, num_value = excluded.num_value
+                """, rows)
+                kb._dirty_stats.update(numeric_pairs)
+                kb.flush_stats()  # recalcul groupé, une fois
+
+            for key in ("properties", "links", "instances", "values"):
+                for entry in plan[key]:
+                    entry[0].status = APPLIED
+
+            for r in plan["deletes"]:
+                data = r.data
+                if r.action == "delete_value":
+                    done = kb.delete_instance_value(data.get("instance"), data.get("class_name"),
+                                                    data.get("prop") or data.get("prop_name"))
+                elif r.action == "delete_instance":
+                    done = kb.delete_instance(data.get("name"), data.get("class_name"))
+                else:
+                    done = kb.delete_property(data.get("name"))
+                if done:
+                    r.status = APPLIED
+                else:
+                    r.fail(ERROR, "suppression impossible")
+                    if strict:
+                        raise _Abort()
@@ -1,37 +1,332 @@
 # core/workflow/working_memory.py (pure buffer, no UI/print/store; return Events via service)
+"""
+Zone de préparation d'une soumission : les changements sont mis en attente ici,
+puis envoyés en bloc dans se_submissions (fusion : core/workflow/merge.py).
+
+    wm = WorkingMemory(kb)
+    wm.add_class("Moteur", parent="Animal")
+    wm.overlay.class_exists("moteur")     # True : vue KB + changements en attente
+    wm.overlay.class_names()              # choix des Question, éléments en attente compris
+    wm.submit(user_id, "Ajout moteurs")
+
+Index par type d'entité ("class", "property", "link", "instance", "value") et par
+opération ("add", "modify", "delete") : clé normalisée -> n° dans le journal.
+Tester si un élément est en attente est un accès dict, quelle que soit la taille
+de la session ; le journal garde l'ordre de saisie pour la soumission.
+
+Le vocabulaire des actions est celui de la fusion (add_class, add_property,
+modify_property, attach_property, add_instance, set_value, delete_value,
+delete_instance, delete_property).
+"""
+import json
+from itertools import count
+
+from core.codecs import codec_names, get_codec
+
+KINDS = ("class", "property", "link", "instance", "value")
+OPS = ("add", "modify", "delete")
+
+
+def _key(name):
+    return name.strip().lower() if isinstance(name, str) else ""
+
+
+def _valid(name):
+    return isinstance(name, str) and bool(name.strip())
+
+
 class WorkingMemory:
     def __init__(self, repo):
         self.repo = repo
-        self.changes = []
+        self.clear()
+        self.overlay = OverlayView(self)
 
-    def add_change(self, action, data):
-        self.changes.append({"action": action, "data": data})
+    def clear(self):
+        self._journal = {}                 # n° -> {"action", "data"}, ordre d'insertion
+        self._seq = count()
+        self._index = {kind: {op: {} for op in OPS} for kind in KINDS}
+        self._renamed = {}                 # nom en base -> nom courant (modify_property)
 
-    def add_class(self, name, parent=None):
-        if self.repo.get_class_id(name):  # Rule: if exists, no add
+    @property
+    def changes(self):
+        return list(self._journal.values())
+
+    def __len__(self):
+        return len(self._journal)
+
+    # ========== JOURNAL / INDEX ==========
+
+    def _stage(self, kind, op, key, action, data):
+        self._unstage(kind, op, key)
+        seq = next(self._seq)
+        self._journal[seq] = {"action": action, "data": data}
+        self._index[kind][op][key] = seq
+        return True
+
+    def _unstage(self, kind, op, key):
+        seq = self._index[kind][op].pop(key, None)
+        if seq is None:
             return False
-        self.add_change('add_class', {'name': name, 'parent': parent})
+        del self._journal[seq]
         return True
 
-    def add_property(self, name, ptype):
-        if self.kb.get_property_id(name):
+    def staged(self, kind, op, key):
+        """Données du changement en attente (clé normalisée), None sinon"""
+        seq = self._index[kind][op].get(key)
+        return None if seq is None else self._journal[seq]["data"]
+
+    def _drop_where(self, kind, op, match):
+        # Retire les changements dépendants (propriété / instance supprimée)
+        for key in [k for k in self._index[kind][op] if match(k)]:
+            self._unstage(kind, op, key)
+
+    def _rekey(self, kind, op, match, rename):
+        # Réécrit les références en attente après un renommage de propriété
+        index = self._index[kind][op]
+        for key in [k for k in index if match(k)]:
+            seq = index.pop(key)
+            data = self._journal[seq]["data"]
+            data["prop_name" if kind == "link" else "prop"] = rename
+            index[key[:-1] + (_key(rename),)] = seq
+
+    # ========== CLASSES ==========
+
+    def add_class(self, name, parent=None):
+        if not _valid(name) or self.overlay.class_exists(name):  # Rule: if exists, no add
+            return False
+        if parent and not self.overlay.class_exists(parent):
+            return False
+        return self._stage("class", "add", _key(name), "add_class", {"name": name.strip(), "parent": parent or None})
+
+    # ========== PROPRIÉTÉS ==========
+
+    def add_property(self, name, ptype="string"):
+        key = _key(name)
+        if not key or ptype not in codec_names() or self.overlay.property_exists(name):
+            return False
+        if key in self._index["property"]["delete"]:
+            return False  # suppression en attente : l'annuler d'abord
+        return self._stage("property", "add", key, "add_property", {"name": key, "type": ptype})
+
+    def modify_property(self, name, new_name=None, new_type=None):
+        key, new_key = _key(name), _key(new_name)
+        if not self.overlay.property_exists(name) or not (new_key or new_type):
+            return False
+        if new_type and new_type not in codec_names():
             return False
-        # Stage the add in self.changes (e.g., self.changes['properties'].append((name, ptype)))
+        if new_key and new_key != key and self.overlay.property_exists(new_name):
+            return False
+        current = new_key or key
+
+        added = self.staged("property", "add", key)
+        if added is not None:
+            # Ajout en attente : modifié sur place
+            seq = self._index["property"]["add"].pop(key)
+            added["name"] = current
+            if new_type:
+                added["type"] = new_type
+            self._index["property"]["add"][current] = seq
+        else:
+            data = self.staged("property", "modify", key)
+            if data is None:
+                data = {"name": key, "new_name": None, "new_type": None}
+            else:
+                self._unstage("property", "modify", key)
+            if new_key:
+                data["new_name"] = None if new_key == data["name"] else new_key
+                self._renamed[data["name"]] = current
+            if new_type:
+                data["new_type"] = new_type
+            if not data["new_name"] and not data["new_type"]:
+                self._renamed.pop(data["name"], None)
+                return True  # revenu à l'état en base
+            seq = next(self._seq)
+            self._journal[seq] = {"action": "modify_property", "data": data}
+            self._index["property"]["modify"][current] = seq
+            if self._renamed.get(data["name"]) == data["name"]:
+                del self._renamed[data["name"]]
+
+        if current != key:
+            self._rekey("link", "add", lambda k: k[1] == key, current)
+            self._rekey("value", "add", lambda k: k[2] == key, current)
+            self._rekey("value", "delete", lambda k: k[2] == key, current)
         return True
 
+    def delete_property(self, name):
+        key = _key(name)
+        if not self.overlay.property_exists(name):
+            return False
+        self._drop_where("link", "add", lambda k: k[1] == key)
+        self._drop_where("value", "add", lambda k: k[2] == key)
+        self._drop_where("value", "delete", lambda k: k[2] == key)
+        if self._unstage("property", "add", key):
+            return True  # n'existait qu'en attente
+        modified = self.staged("property", "modify", key)
+        committed = modified["name"] if modified else key
+        self._unstage("property", "modify", key)
+        self._renamed.pop(committed, None)
+        return self._stage("property", "delete", committed, "delete_property", {"name": committed})
+
     def attach_property_to_class(self, class_name, prop_name):
-        # Stage the attachment in changes
-        return True
+        if not self.overlay.class_exists(class_name) or not self.overlay.property_exists(prop_name):
+            return False
+        key = (_key(class_name), _key(prop_name))
+        if key in self._index["link"]["add"]:
+            return True
+        # Lien déjà en base : rapporté "skipped" à la fusion
+        return self._stage("link", "add", key, "attach_property",
+                           {"class_name": class_name.strip(), "prop_name": _key(prop_name)})
+
+    # ========== INSTANCES ==========
 
     def add_instance(self, name, class_name):
-        if self.kb.instance_exists(name, class_name):
+        if not _valid(name) or not self.overlay.class_exists(class_name):
             return False
-        # Stage in changes
-        return True
+        key = (_key(class_name), _key(name))
+        if self.overlay.instance_exists(name, class_name) or key in self._index["instance"]["delete"]:
+            return False
+        return self._stage("instance", "add", key, "add_instance", {"name": name.strip(), "class_name": class_name.strip()})
+
+    def delete_instance(self, name, class_name):
+        if not self.overlay.instance_exists(name, class_name):
+            return False
+        key = (_key(class_name), _key(name))
+        self._drop_where("value", "add", lambda k: k[:2] == key)
+        self._drop_where("value", "delete", lambda k: k[:2] == key)
+        if self._unstage("instance", "add", key):
+            return True
+        return self._stage("instance", "delete", key, "delete_instance", {"name": name.strip(), "class_name": class_name.strip()})
+
+    # ========== VALEURS ==========
+
+    def set_value(self, inst_name, class_name, prop_name, value):
+        if not self.overlay.instance_exists(inst_name, class_name) or not self.overlay.property_exists(prop_name):
+            return False
+        codec = get_codec(self.overlay.property_type(prop_name))
+        try:
+            codec.encode(value)
+        except (ValueError, TypeError, AttributeError):
+            return False
+        key = (_key(class_name), _key(inst_name), _key(prop_name))
+        self._unstage("value", "delete", key)
+        return self._stage("value", "add", key, "set_value", {"instance": inst_name.strip(), "class_name": class_name.strip(),
+                                                              "prop": _key(prop_name), "value": value})
+
+    def delete_value(self, inst_name, class_name, prop_name):
+        key = (_key(class_name), _key(inst_name), _key(prop_name))
+        unstaged = self._unstage("value", "add", key)
+        if not self.overlay.committed_value_exists(inst_name, class_name, prop_name):
+            return unstaged
+        return self._stage("value", "delete", key, "delete_value", {"instance": inst_name.strip(), "class_name": class_name.strip(),
+                                                                    "prop": _key(prop_name)})
+
+    # ========== SOUMISSION ==========
 
     def submit(self, user_id, description):
+        """Enregistre les changements en attente dans se_submissions ; retourne l'id (None si rien à soumettre)"""
+        if not self._journal:
+            return None
         changes_json = json.dumps(self.changes)
         self.repo.cursor.execute("INSERT INTO se_submissions (user_id, description, changes_json) VALUES (?, ?, ?)", (user_id, description, changes_json))
+        submission_id = self.repo.cursor.lastrowid
         self.repo.commit()
-        self.changes = []
-        return True
\ No newline at end of file
+        self.clear()
+        return submission_id
+
+
+class OverlayView:
+    """Lecture KB + changements en attente : l'état qu'aurait la base après fusion"""
+
+    def __init__(self, wm):
+        self.wm = wm
+
+    @property
+    def repo(self):
+        return self.wm.repo
+
+    def _index(self, kind, op):
+        return self.wm._index[kind][op]
+
+    def _committed_prop(self, name):
+        # Nom courant -> nom en base (None si la propriété n'existe pas en base sous ce nom)
+        key = _key(name)
+        modified = self.wm.staged("property", "modify", key)
+        if modified is not None:
+            return modified["name"]
+        if key in self.wm._renamed or key in self._index("property", "delete"):
+            return None
+        return key if self.repo.get_property_id(key) else None
+
+    # --- classes
+    def class_exists(self, name):
+        key = _key(name)
+        return bool(key) and (key in self._index("class", "add") or self.repo.get_class_id(key) is not None)
+
+    def class_names(self):
+        staged = [self.wm._journal[seq]["data"]["name"] for seq in self._index("class", "add").values()]
+        return self.repo.get_all_class_names() + staged
+
+    # --- propriétés
+    def property_exists(self, name):
+        key = _key(name)
+        return bool(key) and (key in self._index("property", "add") or self._committed_prop(key) is not None)
+
+    def property_type(self, name):
+        key = _key(name)
+        added = self.wm.staged("property", "add", key)
+        if added is not None:
+            return added["type"]
+        modified = self.wm.staged("property", "modify", key)
+        if modified is not None and modified["new_type"]:
+            return modified["new_type"]
+        committed = self._committed_prop(key)
+        return self.repo.get_property_type(committed) if committed else None
+
+    def property_names(self):
+        names = [self.wm._renamed.get(n, n) for n in self.repo.get_all_property_names()
+                 if n not in self._index("property", "delete")]
+        return names + list(self._index("property", "add"))
+
+    def props_for_class(self, class_name):
+        class_key = _key(class_name)
+        props = []
+        if self.repo.get_class_id(class_key) is not None:
+            deleted = self._index("property", "delete")
+            props = [self.wm._renamed.get(p, p) for p in self.repo.get_all_props_for_class(class_name) if p not in deleted]
+        seen = set(props)
+        props += [p for c, p in self._index("link", "add") if c == class_key and p not in seen]
+        return props
+
+    # --- instances
+    def instance_exists(self, name, class_name):
+        key = (_key(class_name), _key(name))
+        if key in self._index("instance", "add"):
+            return True
+        if key in self._index("instance", "delete"):
+            return False
+        return self.repo.instance_exists(name, class_name)
+
+    def instances(self, class_name):
+        class_key = _key(class_name)
+        committed = self.repo.get_all_instances(class_name) if self.repo.get_class_id(class_key) is not None else []
+        deleted = self._index("instance", "delete")
+        staged = [self.wm._journal[seq]["data"]["name"]
+                  for (c, _), seq in self._index("instance", "add").items() if c == class_key]
+        return [i for i in committed if (class_key, _key(i)) not in deleted] + staged
+
+    # --- valeurs
+    def committed_value_exists(self, inst_name, class_name, prop_name):
+        if (_key(class_name), _key(inst_name)) in self._index("instance", "add"):
+            return False
+        committed = self._committed_prop(prop_name)
+        return committed is not None and self.repo.get_instance_value(inst_name, class_name, committed) is not None
+
+    def value(self, inst_name, class_name, prop_name):
+        key = (_key(class_name), _key(inst_name), _key(prop_name))
+        staged = self.wm.staged("value", "add", key)
+        if staged is not None:
+            value, _ = get_codec(self.property_type(prop_name)).encode(staged["value"])
+            return value
+        if key in self._index("value", "delete") or not self.committed_value_exists(inst_name, class_name, prop_name):
+            return None
+        return self.repo.get_instance_value(inst_name, class_name, self._committed_prop(prop_name))
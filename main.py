@@ -24,7 +24,10 @@ def main():
     ui.show_tree(controller.kb)  # Chargement initial treeview après login
     
     # ui.run()  # Lance la fenêtre et la boucle
-    ui.app.exec()  # Start event loop (replaces ui.run())
+    try:
+        ui.app.exec()  # Start event loop (replaces ui.run())
+    finally:
+        kb.close()  # commit + écriture des événements encore en file
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,1196 @@
+# tests/test_database.py - Unit tests for KnowledgeBase using unittest (standard lib, no pytest needed)
+
+import datetime
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from contextlib import redirect_stdout
+
+from core.database import KnowledgeBase
+from core.codecs import Codec, register_codec, decode_many, encode_many
+
+
+class KnowledgeBaseTestCase(unittest.TestCase):
+    """Base : KnowledgeBase sur un fichier temporaire (jamais data/XXpert.db)"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "test.db")
+        with redirect_stdout(StringIO()):
+            self.kb = KnowledgeBase(self.db_file)
+
+    def tearDown(self):
+        self.kb.close()
+        self.tmpdir.cleanup()
+
+    def quiet(self, func, *args, **kwargs):
+        with redirect_stdout(StringIO()):
+            return func(*args, **kwargs)
+
+
+class TestCatalogCache(KnowledgeBaseTestCase):
+    def test_lookups_are_case_insensitive(self):
+        self.assertIsNotNone(self.kb.get_class_id("animal"))
+        self.assertTrue(self.kb.add_property("Masse", "float"))
+        self.assertEqual(self.kb.get_property_id("MASSE"), self.kb.get_property_id("masse"))
+        self.assertEqual(self.kb.get_property_type("Masse"), "float")
+
+    def test_add_class_invalidates(self):
+        self.assertIn("Animal", self.kb.get_all_class_names())
+        self.quiet(self.kb.add_class, "chat", "Animal")
+        self.assertIn("Chat", self.kb.get_all_class_names())
+        self.assertIsNotNone(self.kb.get_class_id("chat"))
+
+    def test_property_changes_invalidate(self):
+        self.kb.add_property("masse", "int")
+        self.assertIn("masse", self.kb.get_all_property_names())
+
+        self.assertTrue(self.kb.modify_property("masse", new_name="poids", new_type="float"))
+        self.assertIsNone(self.kb.get_property_id("masse"))
+        self.assertEqual(self.kb.get_property_type("poids"), "float")
+
+        self.assertTrue(self.kb.delete_property("poids"))
+        self.assertIsNone(self.kb.get_property_id("poids"))
+        self.assertNotIn("poids", self.kb.get_all_property_names())
+
+
+class TestTransaction(KnowledgeBaseTestCase):
+    def count_instances(self):
+        # Connexion séparée : ne voit que ce qui est commité
+        other = sqlite3.connect(self.db_file)
+        try:
+            return other.execute("SELECT COUNT(*) FROM seinst").fetchone()[0]
+        finally:
+            other.close()
+
+    def test_single_commit_on_exit(self):
+        with self.kb.transaction():
+            self.assertTrue(self.kb.add_instance("Rex", "Animal"))
+            self.assertTrue(self.kb.add_instance("Felix", "Animal"))
+            self.assertEqual(self.count_instances(), 0)
+        self.assertEqual(self.count_instances(), 2)
+
+    def test_rollback_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.kb.transaction():
+                self.kb.add_property("masse", "float")
+                self.kb.add_instance("Rex", "Animal")
+                raise RuntimeError("boom")
+        self.assertEqual(self.count_instances(), 0)
+        self.assertIsNone(self.kb.get_property_id("masse"))
+
+    def test_nested_rollback_keeps_outer(self):
+        with self.kb.transaction():
+            self.kb.add_instance("Rex", "Animal")
+            try:
+                with self.kb.transaction():
+                    self.kb.add_instance("Felix", "Animal")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.kb.get_all_instances("Animal"), ["Rex"])
+
+    def test_nested_commit_waits_for_outer(self):
+        # Bloc externe sans écriture avant le bloc imbriqué : le RELEASE ne doit rien commiter
+        with self.assertRaises(RuntimeError):
+            with self.kb.transaction():
+                with self.kb.transaction():
+                    self.kb.add_instance("Rex", "Animal")
+                self.assertEqual(self.count_instances(), 0)
+                raise RuntimeError("boom")
+        self.assertEqual(self.count_instances(), 0)
+        self.assertEqual(self.kb.get_all_instances("Animal"), [])
+
+    def test_autocommit_outside_transaction(self):
+        self.kb.add_instance("Rex", "Animal")
+        self.assertEqual(self.count_instances(), 1)
+
+
+class TestBulkLoad(KnowledgeBaseTestCase):
+    def test_bulk_load_creates_classes_instances_and_stats(self):
+        self.kb.add_property("tension", "float")
+        self.kb.add_property("actif", "bool")
+        records = [
+            {"class": "moteur", "instance": "M1", "tension": "230", "actif": "oui"},
+            {"class": "Moteur", "instance": "M2", "tension": "400", "inconnue": "x"},
+            {"class": "Moteur", "instance": "M3", "values": {"tension": 12.5}},
+            {"class": "Moteur", "instance": "m1", "tension": "240"},  # même instance (casse)
+            {"class": "", "instance": "X"},
+        ]
+        report = self.kb.bulk_load(records, chunk_size=2)
+
+        self.assertEqual(report["rows"], 5)
+        self.assertEqual(report["classes"], 1)
+        self.assertEqual(report["instances"], 3)
+        self.assertEqual(report["skipped"], 1)
+        self.assertEqual(len(report["errors"]), 1)
+        self.assertGreater(report["rows_per_s"], 0)
+
+        self.assertEqual(self.kb.get_all_instances("Moteur"), ["M1", "M2", "M3"])
+        self.assertEqual(self.kb.get_instance_value("M1", "Moteur", "tension"), 240.0)
+        self.assertIs(self.kb.get_instance_value("M1", "Moteur", "actif"), True)
+        self.assertIn("tension", self.kb.get_all_props_for_class("Moteur"))
+
+        thresholds = self.kb.get_thresholds("Moteur", "tension")
+        self.assertEqual(thresholds["M"], 240.0)
+
+    def test_value_errors_report_their_own_row(self):
+        self.kb.add_property("tension", "float")
+        records = [{"class": "Moteur", "instance": f"M{k}", "tension": "abc" if k == 2 else str(k)} for k in range(1, 6)]
+        report = self.kb.bulk_load(records, chunk_size=5)  # erreur au milieu du lot
+        self.assertEqual([row for row, _ in report["errors"]], [2])
+        self.assertEqual(report["values"], 4)
+
+
+class TestIncrementalStats(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kb.add_property("masse", "float")
+        self.kb.attach_property_to_class("Animal", "masse")
+        for name, masse in [("A", 4.0), ("B", 10.0), ("C", 1.0), ("D", 10.0)]:
+            self.kb.add_instance(name, "Animal")
+            self.kb.set_instance_value(name, "Animal", "masse", masse)
+
+    def stats_row(self):
+        self.kb.cursor.execute("""
+            SELECT instance_count, min_value, max_value, mean_value, median_value, std_dev
+            FROM seprop_stats WHERE class_id = ? AND prop_id = ?
+        """, (self.kb.get_class_id("Animal"), self.kb.get_property_id("masse")))
+        return self.kb.cursor.fetchone()
+
+    def assertStatsMatch(self, values):
+        count, min_v, max_v, mean, median, std = self.stats_row()
+        self.assertEqual(count, len(values))
+        self.assertEqual((min_v, max_v), (min(values), max(values)))
+        self.assertAlmostEqual(mean, statistics.fmean(values))
+        self.assertEqual(median, statistics.median(values))
+        self.assertAlmostEqual(std, statistics.stdev(values))
+
+    def test_add(self):
+        self.assertStatsMatch([4.0, 10.0, 1.0, 10.0])
+
+    def test_replace_keeps_count(self):
+        self.kb.set_instance_value("B", "Animal", "masse", 2.0)
+        self.assertStatsMatch([4.0, 2.0, 1.0, 10.0])
+
+    def test_remove_value_and_instance(self):
+        self.kb.delete_instance_value("C", "Animal", "masse")
+        self.assertStatsMatch([4.0, 10.0, 10.0])  # min suit le multiset
+        self.kb.delete_instance("D", "Animal")
+        self.assertStatsMatch([4.0, 10.0])
+
+    def test_deferred_flush_matches_incremental(self):
+        with self.kb.deferred_stats():
+            self.kb.set_instance_value("A", "Animal", "masse", 7.0)
+            self.kb.add_instance("E", "Animal")
+            self.kb.set_instance_value("E", "Animal", "masse", 3.0)
+            self.assertEqual(self.stats_row()[0], 4)  # pas encore recalculé
+        self.assertStatsMatch([7.0, 10.0, 1.0, 10.0, 3.0])
+
+        # Deltas incrémentaux repartent de l'état recalculé
+        self.kb.delete_instance_value("B", "Animal", "masse")
+        self.assertStatsMatch([7.0, 1.0, 10.0, 3.0])
+
+    def test_deferred_size_threshold(self):
+        self.kb.add_property("taille", "int")
+        with self.kb.deferred_stats(max_dirty=2):
+            self.kb.set_instance_value("A", "Animal", "masse", 5.0)
+            self.assertEqual(self.stats_row()[3], statistics.fmean([4.0, 10.0, 1.0, 10.0]))
+            self.kb.set_instance_value("A", "Animal", "taille", 30)  # 2 paires -> flush
+            self.assertStatsMatch([5.0, 10.0, 1.0, 10.0])
+
+    def test_survives_reload(self):
+        self.kb.close()
+        self.kb = KnowledgeBase(self.db_file)
+        self.kb.set_instance_value("A", "Animal", "masse", None)
+        self.assertStatsMatch([10.0, 1.0, 10.0])
+
+    def test_sorted_multiset_across_blocks(self):
+        from core.stats import RunningStats, SortedMultiset
+        values = [float((k * 37) % 101) for k in range(3 * SortedMultiset.LOAD)]  # doublons, plusieurs blocs
+        stats = RunningStats(values[:10])
+        for value in values[10:]:
+            stats.add(value)
+        for value in values[::3]:
+            self.assertTrue(stats.remove(value))
+            values.remove(value)
+        self.assertFalse(stats.remove(1000.0))
+        self.assertEqual((stats.min, stats.max, stats.count), (min(values), max(values), len(values)))
+        self.assertEqual(stats.median, statistics.median(values))
+        self.assertEqual([stats._sorted[k] for k in range(len(values))], sorted(values))
+
+
+class TestTypedValues(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kb.add_property("masse", "int")
+        self.kb.add_property("naissance", "date")
+        for name, masse, born in [("A", 4, "2020-01-05"), ("B", 12, "2018-06-01"), ("C", 7, "2021-03-15")]:
+            self.kb.add_instance(name, "Animal")
+            self.kb.set_instance_value(name, "Animal", "masse", masse)
+            self.kb.set_instance_value(name, "Animal", "naissance", born)
+
+    def test_numeric_summary(self):
+        summary = self.kb.get_numeric_summary("Animal", "masse")
+        self.assertEqual(summary, {"count": 3, "min": 4.0, "max": 12.0, "avg": 23 / 3})
+
+    def test_range_filters(self):
+        self.assertEqual(self.kb.find_instances_by_range("Animal", "masse", low=5),
+                         [("C", 7), ("B", 12)])
+        self.assertEqual([n for n, _ in self.kb.find_instances_by_range(
+            "Animal", "naissance", low=datetime.date(2019, 1, 1), high="2020-12-31")], ["A"])
+
+    def _drop_num_value(self):
+        self.kb.close()
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("UPDATE seinst_value SET num_value = NULL")
+        conn.commit()
+        # Simule une base d'avant la colonne num_value
+        conn.executescript("""
+            CREATE TABLE old_values AS SELECT inst_id, prop_id, value FROM seinst_value;
+            DROP TABLE seinst_value;
+            ALTER TABLE old_values RENAME TO seinst_value;
+        """)
+        conn.close()
+
+    def test_migration_backfills_existing_rows(self):
+        self._drop_num_value()
+        self.kb = KnowledgeBase(self.db_file)
+        self.assertEqual(self.kb.get_numeric_summary("Animal", "masse")["count"], 3)
+        self.assertEqual(len(self.kb.find_instances_by_range("Animal", "naissance", low="2000-01-01")), 3)
+
+    def test_repository_uses_codec_projection(self):
+        from core.repository import Repository
+        repo = Repository(self.db_file)
+        inst_id = repo.cursor.execute("SELECT id FROM seinst WHERE name = 'A'").fetchone()[0]
+        repo.upsert_instance_value(inst_id, repo.get_property_id("naissance"), "2022-02-02")
+        repo.close()
+        self.assertEqual([n for n, _ in self.kb.find_instances_by_range(
+            "Animal", "naissance", low=datetime.date(2022, 1, 1))], ["A"])
+
+        # Migration par le Repository en premier : mêmes num_value que par la KB
+        self._drop_num_value()
+        Repository(self.db_file).close()
+        self.kb = KnowledgeBase(self.db_file)
+        self.assertEqual(len(self.kb.find_instances_by_range("Animal", "naissance", low="2000-01-01")), 3)
+
+
+class TestCodecs(KnowledgeBaseTestCase):
+    def test_round_trips(self):
+        samples = {
+            "json": {"a": [1, 2]},
+            "timedelta": datetime.timedelta(hours=2),
+            "datetime": datetime.datetime(2024, 5, 1, 12, 30),
+            "bool": False,
+        }
+        self.kb.add_instance("Rex", "Animal")
+        for ptype, value in samples.items():
+            self.kb.add_property(f"p_{ptype}", ptype)
+            self.assertTrue(self.kb.set_instance_value("Rex", "Animal", f"p_{ptype}", value))
+            self.assertEqual(self.kb.get_instance_value("Rex", "Animal", f"p_{ptype}"), value)
+
+    def test_batch_entry_points(self):
+        self.assertEqual(encode_many("int", ["3", "x", None]), [("3", 3.0), None, (None, None)])
+        self.assertEqual(decode_many("bool", ["true", "false", None]), [True, False, None])
+
+    def test_new_type_plugs_in(self):
+        def coerce(value):
+            if value not in ("rouge", "vert"):
+                raise ValueError(value)
+            return value
+
+        register_codec(Codec("couleur", coerce))
+        self.assertTrue(self.kb.add_property("robe", "couleur"))
+        self.kb.add_instance("Rex", "Animal")
+        self.assertTrue(self.kb.set_instance_value("Rex", "Animal", "robe", "vert"))
+        self.assertFalse(self.kb.set_instance_value("Rex", "Animal", "robe", "bleu"))
+        self.assertEqual(self.kb.get_instance_value("Rex", "Animal", "robe"), "vert")
+
+
+class TestInstanceValues(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for prop, ptype in [("masse", "float"), ("domestique", "bool"), ("nom_latin", "string")]:
+            self.kb.add_property(prop, ptype)
+            self.kb.attach_property_to_class("Animal", prop)
+        self.kb.add_instance("Rex", "Animal")
+        self.kb.add_instance("Felix", "Animal")
+        self.kb.set_instance_value("Rex", "Animal", "masse", 30)
+        self.kb.set_instance_value("Rex", "Animal", "domestique", True)
+        self.kb.set_instance_value("Felix", "Animal", "nom_latin", "Felis catus")
+
+    def test_single_instance(self):
+        self.assertEqual(self.kb.get_instance_values("rex", "Animal"),
+                         {"domestique": True, "masse": 30.0, "nom_latin": None})
+        self.assertEqual(self.kb.get_instance_values("Inconnu", "Animal"), {})
+
+    def test_many_instances(self):
+        values = self.kb.get_instances_values("Animal")
+        self.assertEqual(sorted(values), ["Felix", "Rex"])
+        self.assertEqual(values["Felix"]["nom_latin"], "Felis catus")
+        self.assertEqual(self.kb.get_instances_values("Animal", ["REX"])["Rex"]["masse"], 30.0)
+
+    def test_accented_instance_name(self):
+        for prop in ("tension", "intensite", "puissance", "resistance"):
+            self.kb.add_property(prop, "float")
+            self.kb.attach_property_to_class("Animal", prop)
+        self.kb.add_instance("Éolienne", "Animal")
+        self.kb.set_instance_value("Éolienne", "Animal", "tension", 230.0)
+        self.kb.set_instance_value("Éolienne", "Animal", "intensite", 2.0)
+        self.assertEqual(self.kb.get_instance_values("Éolienne", "Animal")["tension"], 230.0)
+        self.assertEqual(list(self.kb.get_instances_values("Animal", ["ÉOLIENNE"])), ["Éolienne"])  # LOWER SQLite : É inchangé des deux côtés
+        event = self.kb.forward_engine.execute("Éolienne", "Animal")
+        self.assertEqual(event.payload["fired"], 2)
+        self.assertEqual(self.kb.get_instance_value("Éolienne", "Animal", "puissance"), 460.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestConnectionPool(KnowledgeBaseTestCase):
+    def test_wal_mode(self):
+        mode = self.kb.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_readers_are_read_only(self):
+        with self.kb.pool.reader() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO seclass (name) VALUES ('Intrus')")
+
+    def test_reader_in_other_thread_during_write(self):
+        self.kb.add_instance("rex", "Animal")
+        seen = []
+        with self.kb.transaction():
+            self.kb.add_instance("felix", "Animal")
+            worker = threading.Thread(target=lambda: seen.extend(self.kb.get_all_instances_global()))
+            worker.start()
+            worker.join(5)
+            # Écriture non commitée : invisible pour le lecteur, visible pour le writer
+            self.assertEqual(len(self.kb.get_all_instances_global()), 2)
+        self.assertEqual([row[1] for row in seen], ["rex"])
+        self.assertEqual(len(self.kb.get_all_instances_global()), 2)
+
+    def test_other_thread_reads_via_pool_and_cannot_write(self):
+        self.kb.add_property("masse", "float")
+        self.kb.attach_property_to_class("Animal", "masse")
+        self.kb.add_instance("rex", "Animal")
+        self.kb.set_instance_value("rex", "Animal", "masse", 30.0)
+        self.kb.catalog.invalidate()  # rechargé depuis le thread secondaire
+        results, errors = {}, []
+
+        def worker():
+            results["props"] = self.kb.get_all_props_for_class("Animal")
+            results["exists"] = self.kb.instance_exists("rex", "Animal")
+            results["value"] = self.kb.get_instance_value("rex", "Animal", "masse")
+            results["summary"] = self.kb.get_numeric_summary("Animal", "masse")["count"]
+            results["range"] = self.kb.find_instances_by_range("Animal", "masse", low=10)
+            results["ancestors"] = self.kb.get_class_ancestors("Animal", include_self=True)
+            try:
+                self.kb.add_instance("intrus", "Animal")
+            except RuntimeError as e:
+                errors.append(e)
+
+        statements = []
+        self.kb.conn.set_trace_callback(statements.append)  # le writer ne doit rien voir passer
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(5)
+        self.kb.conn.set_trace_callback(None)
+        self.assertEqual(results, {"props": ["masse"], "exists": True, "value": 30.0, "summary": 1,
+                                   "range": [("rex", 30.0)], "ancestors": ["Animal"]})
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(statements, [])
+        self.assertFalse(self.kb.instance_exists("intrus", "Animal"))
+
+    def test_memory_database_falls_back_to_writer(self):
+        kb = self.quiet(KnowledgeBase, ":memory:")
+        try:
+            kb.add_instance("rex", "Animal")
+            self.assertEqual([row[1] for row in kb.get_all_instances_global()], ["rex"])
+        finally:
+            kb.close()
+
+    def test_repository_shares_pool(self):
+        from core.repository import Repository
+        repo = Repository(self.db_file, pool=self.kb.pool, catalog=self.kb.catalog)
+        self.assertEqual(repo.get_all_class_names(), ["Animal"])
+        self.quiet(self.kb.add_class, "Chien", "Animal")  # écriture côté KB : catalogue partagé invalidé
+        self.assertIsNotNone(repo.get_class_id("chien"))
+        self.assertIsNone(self.kb.get_property_id("masse"))
+        repo.insert_property("masse", "float")  # et inversement
+        self.assertIsNotNone(self.kb.get_property_id("masse"))
+        repo.close()
+        self.assertEqual(self.kb.get_all_class_names(), ["Animal", "Chien"])
+
+
+class TestPerformanceProfile(KnowledgeBaseTestCase):
+    def pragma(self, name):
+        return self.kb.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_default_is_interactive(self):
+        self.assertEqual(self.kb.pool.profile.name, "interactive")
+        self.assertEqual(self.pragma("foreign_keys"), 0)  # comme la base d'origine
+        self.assertEqual(self.pragma("cache_size"), -16000)
+
+    def test_preset_at_connect_time(self):
+        self.kb.close()
+        self.kb = self.quiet(KnowledgeBase, self.db_file, profile="reporting")
+        self.assertEqual(self.pragma("cache_size"), -64000)
+        with self.kb.pool.reader() as conn:
+            self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -64000)
+
+    def test_use_profile_is_temporary(self):
+        with self.kb.use_profile("bulk_load"):
+            self.assertEqual(self.pragma("synchronous"), 0)  # OFF
+            self.assertEqual(self.pragma("cache_size"), -128000)
+        self.assertEqual(self.pragma("synchronous"), 1)      # NORMAL
+        self.assertEqual(self.pragma("cache_size"), -16000)
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+
+    def test_custom_and_unknown_profiles(self):
+        from core.connection import PROFILES
+        custom = PROFILES["interactive"].replace(name="small", cache_size=-2000)
+        with self.kb.use_profile(custom):
+            self.assertEqual(self.pragma("cache_size"), -2000)
+        with self.assertRaises(ValueError):
+            KnowledgeBase(self.db_file, profile="turbo")
+
+
+class TestClassClosure(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiet(self.kb.add_class, "Mammifere", "Animal")
+        self.quiet(self.kb.add_class, "Chat", "Mammifere")
+        self.quiet(self.kb.add_class, "Oiseau", "Animal")
+        self.kb.add_property("masse", "float")
+        self.kb.add_property("griffes", "bool")
+        self.kb.link_property_to_class("Animal", "masse")
+        self.kb.link_property_to_class("Chat", "griffes")
+        self.kb.add_instance("felix", "Chat")
+        self.kb.add_instance("titi", "Oiseau")
+
+    def test_inherited_properties(self):
+        self.assertEqual(self.kb.get_all_props_for_class("Chat"), ["griffes", "masse"])
+        self.assertEqual(self.kb.get_all_props_for_class("Chat", inherited=False), ["griffes"])
+        self.kb.set_instance_value("felix", "Chat", "masse", 4.2)
+        self.assertEqual(self.kb.get_instance_values("felix", "Chat"), {"griffes": None, "masse": 4.2})
+
+    def test_subclass_queries_and_rollup(self):
+        self.assertEqual(self.kb.get_all_instances("Animal"), [])
+        self.assertEqual(self.kb.get_all_instances("Animal", include_subclasses=True), ["felix", "titi"])
+        self.assertEqual(self.kb.get_class_descendants("Animal"), ["Mammifere", "Oiseau", "Chat"])
+        self.assertEqual(self.kb.get_class_ancestors("Chat"), ["Mammifere", "Animal"])
+        counts = self.kb.get_instance_counts()
+        self.assertEqual((counts["Animal"], counts["Mammifere"], counts["Oiseau"]), (2, 1, 1))
+
+    def test_move_class(self):
+        levels = {name: level for _, name, _, level in self.quiet(self.kb.get_hierarchy)}
+        self.assertEqual(levels["Chat"], 2)
+        self.assertTrue(self.kb.move_class("Mammifere", "Oiseau"))
+        levels = {name: level for _, name, _, level in self.quiet(self.kb.get_hierarchy)}
+        self.assertEqual(levels["Chat"], 3)
+        self.assertEqual(self.kb.get_class_ancestors("Chat"), ["Mammifere", "Oiseau", "Animal"])
+        self.assertFalse(self.kb.move_class("Animal", "Chat"))  # cycle
+        self.assertTrue(self.kb.move_class("Mammifere"))
+        self.assertEqual(self.kb.get_class_ancestors("Chat"), ["Mammifere"])
+        self.assertEqual(self.kb.get_all_props_for_class("Chat"), ["griffes"])
+
+    def test_closure_rebuilt_for_existing_base(self):
+        self.kb.conn.execute("DROP TABLE seclass_closure")
+        self.kb.conn.commit()
+        self.kb.close()
+        self.kb = self.quiet(KnowledgeBase, self.db_file)
+        self.assertEqual(self.kb.get_class_ancestors("Chat"), ["Mammifere", "Animal"])
+
+    def test_repository_inherited_properties(self):
+        from core.repository import Repository
+        repo = Repository(self.db_file, pool=self.kb.pool, catalog=self.kb.catalog)
+        chat = repo.get_class_id("Chat")
+        self.assertEqual([name for _, name, _ in repo.get_properties_for_class(chat)], ["griffes", "masse"])
+        repo.close()
+
+    def test_hierarchy_summary(self):
+        self.kb.add_instance("tom", "Chat")
+        summary = {row[1]: row for row in self.kb.get_hierarchy_summary()}
+        self.assertEqual(summary["Chat"][2:], (summary["Mammifere"][0], 2, 2, 2))
+        self.assertEqual(summary["Animal"][2:], (None, 0, 1, 0))
+        self.assertEqual([row[1] for row in self.kb.get_hierarchy_summary()],
+                         [row[1] for row in self.quiet(self.kb.get_hierarchy)])
+
+
+class TestKeysetPaging(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiet(self.kb.add_class, "Chat", "Animal")
+        with self.kb.transaction():
+            for i in range(25):
+                self.kb.add_instance(f"inst{i:02d}", "Animal" if i % 2 else "Chat")
+
+    def all_pages(self, source, limit=7):
+        rows, cursor = source.page(limit=limit)
+        while cursor is not None:
+            more, cursor = source.page(after=cursor, limit=limit)
+            rows.extend(more)
+        return rows
+
+    def test_pages_cover_every_row_once(self):
+        source = self.kb.table_source("Instances")
+        rows = self.all_pages(source)
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(len({row[0] for row in rows}), 25)
+        # Tri par défaut : classe puis id (ex-aequo départagés par la clé)
+        self.assertEqual(rows, sorted(rows, key=lambda r: (r[2], r[0])))
+
+    def test_sort_and_search_in_sql(self):
+        source = self.kb.table_source("Instances")
+        source.set_sort("Name", descending=True)
+        rows = self.all_pages(source, limit=4)
+        self.assertEqual([r[1] for r in rows], sorted((r[1] for r in rows), reverse=True))
+
+        source.set_search("chat")
+        self.assertEqual(source.count(), 13)
+        self.assertEqual(len(self.all_pages(source, limit=5)), 13)
+
+    def test_pages_are_index_range_scans(self):
+        # Tri par défaut de chaque onglet : parcours d'index / rowid, jamais de tri temporaire complet
+        for table in ("Events", "Classes", "Instances", "Props"):
+            source = self.kb.table_source(table)
+            for after in (None, ("Animal", 10)):
+                plan = " ".join(source.explain(after))
+                self.assertNotIn("TEMP B-TREE", plan, table)
+                self.assertNotIn("COALESCE", source._page_query(after, 1)[0], table)
+        self.assertIn("INTEGER PRIMARY KEY (rowid<?)", " ".join(self.kb.table_source("Events").explain((None, 10))))
+
+    def test_props_for_class_and_unknown_table(self):
+        self.kb.add_property("masse", "float")
+        self.kb.link_property_to_class("Animal", "masse")
+        rows, cursor = self.kb.table_source("Props", class_name="Chat").page()
+        self.assertEqual((rows, cursor), ([("masse", "float")], None))
+        self.assertIsNone(self.kb.table_source("Nope"))
+
+
+class TestEventSink(KnowledgeBaseTestCase):
+    def test_events_written_in_background(self):
+        from core.models.event import Event
+        for i in range(10):
+            self.kb.store_event(Event("tick", "test", entity=f"e{i}"))
+        events = self.kb.get_events(limit=50)  # flush avant lecture
+        self.assertEqual(sum(1 for e in events if e[1] == "tick"), 10)
+        self.assertGreaterEqual(self.kb.events.written, 10)
+
+    def test_close_flushes(self):
+        from core.models.event import Event
+        self.kb.store_event(Event("last", "test"))
+        self.kb.close()
+        conn = sqlite3.connect(self.db_file)
+        count = conn.execute("SELECT COUNT(*) FROM se_events WHERE event_type = 'last'").fetchone()[0]
+        conn.close()
+        self.assertEqual(count, 1)
+        self.kb = self.quiet(KnowledgeBase, self.db_file)
+
+    def test_drop_info_overflow(self):
+        from core.event_sink import EventSink
+        from core.models.event import Event, Severity
+        gate = threading.Event()
+
+        def slow_connect():
+            gate.wait(5)  # thread d'écriture bloqué : la file se remplit
+            return self.kb.pool.connect()
+
+        sink = EventSink(slow_connect, max_queue=2, overflow="drop_info")
+        results = [sink.put(Event("info", "test")) for _ in range(4)]
+        self.assertEqual((results, sink.dropped), ([True, True, False, False], 2))
+        gate.set()
+        sink.close()
+        self.assertEqual(sink.written, 2)
+        with self.assertRaises(ValueError):
+            EventSink(self.kb.pool.connect, overflow="lossy")
+
+    def test_locked_database_retries_in_block_mode(self):
+        from core.event_sink import EventSink
+        from core.models.event import Event
+        locker = sqlite3.connect(self.db_file)
+        locker.execute("BEGIN IMMEDIATE")  # writer long : le sink tombe en busy
+        sink = EventSink(lambda: sqlite3.connect(self.db_file, timeout=0.01), retries=1, max_backoff=0.05)
+        with redirect_stdout(StringIO()):
+            sink.put(Event("audit", "test"))
+            self.assertFalse(sink.flush(timeout=0.3))
+            locker.rollback()
+            locker.close()
+            self.assertTrue(sink.flush(timeout=5))
+            sink.close()
+        self.assertEqual((sink.written, sink.failed), (1, 0))
+
+    def test_synchronous_fallback(self):
+        from core.models.event import Event
+        kb = self.quiet(KnowledgeBase, self.db_file, event_sink=False)
+        try:
+            kb.store_event(Event("sync", "test"))
+            self.assertEqual(kb.get_events(limit=1)[0][1], "sync")
+        finally:
+            kb.close()
+
+
+class TestEventPaging(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        from core.models.event import Event
+        for i in range(30):
+            event = Event("tick" if i % 3 else "tock", "test", entity="moteur" if i % 2 else "pompe",
+                          severity="warning" if i % 5 == 0 else "info")
+            event.timestamp = datetime.datetime(2026, 1, 1, 0, 0, i // 4)  # ex-aequo de timestamp
+            self.kb.store_event(event)
+
+    def walk(self, limit=4, **filters):
+        rows = self.kb.get_events_page(limit=limit, **filters)
+        out = list(rows)
+        while rows:
+            rows = self.kb.get_events_page(after_id=rows[-1][0], limit=limit, **filters)
+            out.extend(rows)
+        return out
+
+    def test_pages_are_complete_and_ordered(self):
+        rows = self.walk()
+        self.assertEqual(len(rows), len({r[0] for r in rows}))
+        self.assertEqual(len([r for r in rows if r[2] == "test"]), 30)
+        keys = [(r[6], r[0]) for r in rows]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_filters(self):
+        self.assertEqual(len(self.walk(entity="moteur")), 15)
+        self.assertEqual(len(self.walk(event_type="tock", severity="warning")), 2)   # i = 0, 15
+        since = datetime.datetime(2026, 1, 1, 0, 0, 5)
+        rows = self.walk(since=since, until="2026-01-01 00:00:06")
+        self.assertEqual(sorted(r[0] for r in rows), sorted(r[0] for r in rows if r[6] >= "2026-01-01 00:00:05"))
+        self.assertEqual(len(rows), 8)
+
+    def test_cursor_row_removed_between_pages(self):
+        first = self.kb.get_events_page(limit=4)
+        last_id, last_ts = first[-1][0], first[-1][6]
+        self.kb.conn.execute("DELETE FROM se_events WHERE id = ?", (last_id,))  # archivée entre deux pages
+        self.kb.conn.commit()
+        expected = [r[0] for r in self.walk(limit=100)][3:]
+        by_key = self.kb.get_events_page(after_id=last_id, after_ts=last_ts, limit=100)
+        self.assertEqual([r[0] for r in by_key], expected)
+        by_id = self.kb.get_events_page(after_id=last_id, limit=100)  # repli sur l'id
+        self.assertEqual([r[0] for r in by_id], expected)
+
+    def test_indexes_used(self):
+        plan = self.kb.conn.execute("EXPLAIN QUERY PLAN SELECT * FROM se_events WHERE entity = ? "
+                                    "ORDER BY timestamp DESC, id DESC LIMIT 10", ("pompe",)).fetchall()
+        self.assertIn("idx_se_events_entity_ts", plan[0][3])
+        self.assertNotIn("TEMP B-TREE", " ".join(row[3] for row in plan))
+
+
+class TestEventArchive(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        from core.models.event import Event
+        self.archive_dir = os.path.join(self.tmpdir.name, "archive")
+        self.now = datetime.datetime(2026, 3, 1, 12, 0, 0)
+        for days, event_type, severity in ((40, "tick", "info"), (40, "boom", "error"), (10, "tick", "info"),
+                                           (8, "instance_values_viewed", "info"), (1, "instance_values_viewed", "info")):
+            event = Event(event_type, "test", entity="moteur", payload={"days": days}, severity=severity)
+            event.timestamp = self.now - datetime.timedelta(days=days)
+            self.kb.store_event(event)
+
+    def test_expired_rows_move_to_daily_archives(self):
+        from core.event_archive import iter_archived_events
+        report = self.kb.archive_events(self.archive_dir, now=self.now)
+        self.assertEqual(report["archived"], 2)  # info de 40 j + vue de 8 j
+        self.assertEqual(len(report["files"]), 2)
+        self.assertTrue(report["vacuumed"])
+        remaining = sorted((e[1], e[5]) for e in self.kb.get_events(limit=100))
+        self.assertEqual(remaining, [("boom", "error"), ("instance_values_viewed", "info"), ("tick", "info")])
+
+        archived = list(iter_archived_events(self.archive_dir))
+        self.assertEqual([r["payload"]["days"] for r in archived], [40, 8])
+        self.assertEqual([r["event_type"] for r in iter_archived_events(self.archive_dir, event_type="tick")], ["tick"])
+        since = self.now - datetime.timedelta(days=20)
+        self.assertEqual(len(list(iter_archived_events(self.archive_dir, since=since))), 1)
+
+    def test_archives_are_append_only(self):
+        from core.event_archive import RetentionPolicy, iter_archived_events
+        self.kb.archive_events(self.archive_dir, now=self.now)
+        self.kb.archive_events(self.archive_dir, policies=[RetentionPolicy(0)], now=self.now)
+        self.assertEqual(self.kb.get_events(limit=100), [])
+        self.assertEqual(len(list(iter_archived_events(self.archive_dir))), 5)
+        self.assertEqual(self.kb.conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+
+
+class TestStreamingIterators(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kb.add_property("masse", "float")
+        self.kb.link_property_to_class("Animal", "masse")
+        with self.kb.transaction():
+            for i in range(50):
+                self.kb.add_instance(f"a{i:02d}", "Animal")
+                self.kb.set_instance_value(f"a{i:02d}", "Animal", "masse", float(i))
+
+    def test_iterators_match_lists(self):
+        self.assertEqual(list(self.kb.iter_all_instances_global(chunk_size=7)), self.kb.get_all_instances_global())
+        self.assertEqual(list(self.kb.iter_all_instances("Animal", chunk_size=3)), self.kb.get_all_instances("Animal"))
+        self.assertEqual(list(self.kb.iter_all_classes()), self.quiet(self.kb.get_all_classes))
+        self.assertEqual(sorted(self.kb.iter_numeric_values("Animal", "masse", chunk_size=8)), [float(i) for i in range(50)])
+        self.assertEqual(list(self.kb.iter_all_instances("Inconnue")), [])
+
+    def test_lazy_and_independent_of_shared_cursor(self):
+        names = self.kb.iter_all_instances("Animal", chunk_size=5)
+        first = next(names)
+        # Appels intercalés sur self.cursor : le générateur garde sa position
+        self.kb.get_instance_value("a10", "Animal", "masse")
+        self.kb.set_instance_value("a20", "Animal", "masse", 99.0)
+        self.assertEqual([first] + list(names), [f"a{i:02d}" for i in range(50)])
+
+    def test_abandoned_iterator_releases_reader(self):
+        for _ in range(10):  # plus que les 4 lecteurs du pool
+            rows = self.kb.iter_all_instances_global(chunk_size=2)
+            next(rows)
+            rows.close()
+        self.assertEqual(len(self.kb.get_all_instances_global()), 50)
+
+    def test_events_and_repository(self):
+        from core.models.event import Event
+        from core.repository import Repository
+        for i in range(5):
+            self.kb.store_event(Event("tick", "test", entity=f"e{i}"))
+        self.assertEqual(len(list(self.kb.iter_events(event_type="tick", chunk_size=2))), 5)
+        repo = Repository(self.db_file, pool=self.kb.pool, catalog=self.kb.catalog)
+        values = repo.iter_all_numeric_values(repo.get_class_id("Animal"), repo.get_property_id("masse"), chunk_size=6)
+        self.assertEqual(sorted(values), sorted(repo.get_all_numeric_values(repo.get_class_id("Animal"),
+                                                                             repo.get_property_id("masse"))))
+        repo.close()
+
+
+class TestThresholdCache(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for prop in ("masse", "taille"):
+            self.kb.add_property(prop, "float")
+            self.kb.link_property_to_class("Animal", prop)
+        with self.kb.transaction():
+            for i, masse in enumerate([2.0, 4.0, 6.0]):
+                self.kb.add_instance(f"a{i}", "Animal")
+                self.kb.set_instance_value(f"a{i}", "Animal", "masse", masse)
+
+    def test_bulk_matches_single(self):
+        bulk = self.kb.get_thresholds_bulk("Animal")
+        self.assertEqual(set(bulk), {"masse", "taille"})
+        self.assertEqual(bulk["masse"], self.kb.get_thresholds("Animal", "masse"))
+        self.assertEqual(bulk["masse"]["M"], 4.0)
+        self.assertAlmostEqual(bulk["masse"]["H"], 6.0)
+        self.assertEqual(bulk["taille"], {"LL": None, "L": None, "M": None, "H": None, "HH": None})
+        self.assertEqual(self.kb.get_thresholds_bulk("Inconnue"), {})
+
+    def test_cached_and_invalidated(self):
+        self.kb.get_thresholds_bulk("Animal")
+        statements = []
+        self.kb.conn.set_trace_callback(statements.append)
+        self.kb.get_thresholds_bulk("Animal")
+        self.kb.conn.set_trace_callback(None)
+        self.assertEqual(statements, [])  # propriétés et seuils servis par les caches
+
+        self.quiet(self.kb.add_class, "Chien", "Animal")
+        self.kb.add_property("race", "string")
+        self.kb.attach_property_to_class("Chien", "race")  # lien invalidé, héritage par le catalogue
+        self.assertEqual(set(self.kb.get_thresholds_bulk("Chien")), {"masse", "taille", "race"})
+        self.assertEqual(set(self.kb.get_thresholds_bulk("Animal")), {"masse", "taille"})
+
+        self.kb.set_manual_thresholds("Animal", "masse", h=5.5)
+        self.assertEqual(self.kb.get_thresholds("Animal", "masse")["H"], 5.5)
+        self.kb.set_instance_value("a0", "Animal", "masse", 10.0)
+        self.assertEqual(self.kb.get_thresholds("Animal", "masse")["M"], 6.0)
+        with self.kb.deferred_stats():
+            self.kb.set_instance_value("a1", "Animal", "masse", 12.0)
+        self.assertEqual(self.kb.get_thresholds("Animal", "masse")["M"], 10.0)
+        self.kb.delete_property("masse")
+        self.assertIsNone(self.kb.get_thresholds("Animal", "masse"))
+
+
+class TestClassifyClass(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for prop, ptype in (("masse", "float"), ("pattes", "int"), ("nom", "string")):
+            self.kb.add_property(prop, ptype)
+            self.kb.link_property_to_class("Animal", prop)
+        with self.kb.transaction():
+            for i, masse in enumerate([1.0, 4.0, 5.0, 6.0, 30.0]):
+                self.kb.add_instance(f"a{i}", "Animal")
+                self.kb.set_instance_value(f"a{i}", "Animal", "masse", masse)
+            self.kb.set_instance_value("a0", "Animal", "pattes", 4)
+        self.kb.set_manual_thresholds("Animal", "masse", ll=2.0, l=3.0, h=10.0, hh=20.0)
+
+    def test_band_matrix(self):
+        report = self.kb.classify_class("Animal")
+        self.assertEqual(report.properties, ["masse", "pattes"])  # propriétés numériques seulement
+        self.assertEqual(report.bands.shape, (5, 2))
+        self.assertEqual(report.bands[:, 0].tolist(), [-2, 0, 0, 0, 2])
+        self.assertEqual(report.band("a0", "masse"), "LL")
+        self.assertIsNone(report.band("a1", "pattes"))
+        self.assertEqual(report.summary()["masse"], {"LL": 1, "L": 0, "M": 3, "H": 0, "HH": 1, "missing": 0})
+        self.assertEqual(report.summary()["pattes"]["missing"], 4)
+        self.assertEqual(report.out_of_band(min_level=2), [("a0", "masse", "LL", 1.0), ("a4", "masse", "HH", 30.0)])
+
+    def test_matches_scalar_rules(self):
+        from core.classification import MISSING
+        report = self.kb.classify_class("Animal")
+        for i, inst in enumerate(report.instances):
+            value = self.kb.get_instance_value(inst, "Animal", "masse")
+            t = self.kb.get_thresholds("Animal", "masse")
+            expected = -2 if value < t["LL"] else -1 if value < t["L"] else 2 if value > t["HH"] else 1 if value > t["H"] else 0
+            self.assertEqual(report.bands[i, 0], expected)
+        self.assertEqual(report.bands[1, 1], MISSING)
+        self.assertIsNone(self.kb.classify_class("Inconnue"))
+
+
+class TestMergeSubmission(KnowledgeBaseTestCase):
+    def _submit(self, changes):
+        self.kb.cursor.execute("INSERT INTO se_submissions (user_id, description, changes_json) VALUES (1, 'test', ?)",
+                               (json.dumps(changes),))
+        self.kb.commit()
+        return self.kb.cursor.lastrowid
+
+    def _status(self, submission_id):
+        return self.kb.conn.execute("SELECT status FROM se_submissions WHERE id = ?", (submission_id,)).fetchone()[0]
+
+    def test_merge_in_dependency_order(self):
+        # Ordre volontairement inversé : valeurs avant instances, enfant avant parent
+        sid = self._submit([
+            {"action": "set_value", "data": {"instance": "rex", "class_name": "Chien", "prop": "masse", "value": "12.5"}},
+            {"action": "add_instance", "data": {"name": "rex", "class_name": "Chien"}},
+            {"action": "attach_property", "data": {"class_name": "Mammifere", "prop_name": "masse"}},
+            {"action": "add_class", "data": {"name": "chien", "parent": "Mammifere"}},
+            {"action": "add_property", "data": {"name": "Masse", "type": "float"}},
+            {"action": "add_class", "data": {"name": "Mammifere", "parent": "Animal"}},
+        ])
+        report = self.kb.merge_submission(sid, 1)
+        self.assertTrue(report)
+        self.assertEqual(report.counts(), {"applied": 6})
+        self.assertEqual(self._status(sid), "validated")
+        self.assertEqual(self.kb.get_class_ancestors("Chien"), ["Mammifere", "Animal"])
+        self.assertEqual(self.kb.get_instance_value("rex", "Chien", "masse"), 12.5)
+        self.assertIn("masse", self.kb.get_all_props_for_class("Chien"))
+        self.assertEqual(self.kb.get_thresholds("Chien", "masse")["M"], 12.5)  # stats recalculées
+
+    def test_strict_rejects_whole_submission(self):
+        self.kb.add_instance("felix", "Animal")
+        sid = self._submit([
+            {"action": "add_class", "data": {"name": "Oiseau", "parent": "Animal"}},
+            {"action": "add_instance", "data": {"name": "Felix", "class_name": "Animal"}},
+            {"action": "add_instance", "data": {"name": "tweety", "class_name": "Inconnue"}},
+        ])
+        report = self.kb.merge_submission(sid, 1)
+        self.assertFalse(report)
+        self.assertEqual([r.status for r in report.results], ["not_applied", "conflict", "error"])
+        self.assertIsNone(self.kb.catalog.class_id("Oiseau"))
+        self.assertEqual(self._status(sid), "pending")
+
+    def test_lenient_applies_valid_changes(self):
+        self.kb.add_property("masse", "float")
+        self.kb.link_property_to_class("Animal", "masse")
+        self.kb.add_instance("felix", "Animal")
+        sid = self._submit([
+            {"action": "attach_property", "data": {"class_name": "Animal", "prop_name": "masse"}},
+            {"action": "set_value", "data": {"instance": "felix", "class_name": "Animal", "prop": "masse", "value": "abc"}},
+            {"action": "set_value", "data": {"instance": "felix", "class_name": "Animal", "prop": "masse", "value": 4}},
+            {"action": "add_class", "data": {"name": "Boucle", "parent": "Boucle2"}},
+            {"action": "add_class", "data": {"name": "Boucle2", "parent": "Boucle"}},
+            {"action": "rename_class", "data": {}},
+        ])
+        report = self.kb.merge_submission(sid, 1, strict=False)
+        self.assertFalse(report)
+        self.assertEqual([r.status for r in report.results], ["skipped", "error", "applied", "error", "error", "error"])
+        self.assertEqual(self.kb.get_instance_value("felix", "Animal", "masse"), 4.0)
+        self.assertEqual(self._status(sid), "pending")
+        self.assertIsNone(self.kb.merge_submission(999, 1))
+
+    def test_large_submission_batched(self):
+        self.kb.add_property("masse", "float")
+        changes = [{"action": "add_instance", "data": {"name": f"a{i}", "class_name": "Animal"}} for i in range(2000)]
+        changes += [{"action": "set_value", "data": {"instance": f"a{i}", "class_name": "Animal", "prop": "masse", "value": i}}
+                    for i in range(2000)]
+        sid = self._submit(changes)
+        statements = []
+        self.kb.conn.set_trace_callback(statements.append)
+        report = self.kb.merge_submission(sid, 1)
+        self.kb.conn.set_trace_callback(None)
+        self.assertTrue(report)
+        self.assertEqual(len(self.kb.get_all_instances("Animal")), 2000)
+        self.assertEqual(self.kb.get_thresholds("Animal", "masse")["M"], 999.5)
+        self.assertLess(len([q for q in statements if "FROM seinst " in q and "SELECT" in q]), 5)
+
+
+class TestWorkingMemory(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        from core.workflow.working_memory import WorkingMemory
+        self.kb.add_property("masse", "float")
+        self.kb.link_property_to_class("Animal", "masse")
+        self.kb.add_instance("felix", "Animal")
+        self.kb.set_instance_value("felix", "Animal", "masse", 4.0)
+        self.wm = WorkingMemory(self.kb)
+
+    def test_overlay_sees_staged_changes(self):
+        overlay = self.wm.overlay
+        self.assertTrue(self.wm.add_class("Chien", parent="Animal"))
+        self.assertFalse(self.wm.add_class("chien"))  # déjà en attente
+        self.assertFalse(self.wm.add_class("Animal"))  # déjà en base
+        self.assertTrue(self.wm.add_instance("rex", "Chien"))
+        self.assertTrue(self.wm.add_property("taille", "int"))
+        self.assertTrue(self.wm.attach_property_to_class("Chien", "taille"))
+        self.assertTrue(self.wm.set_value("rex", "Chien", "taille", "40"))
+        self.assertFalse(self.wm.set_value("rex", "Chien", "taille", "abc"))
+
+        self.assertIn("Chien", overlay.class_names())
+        self.assertIsNone(self.kb.get_class_id("Chien"))  # rien écrit en base
+        self.assertEqual(overlay.instances("Chien"), ["rex"])
+        self.assertEqual(overlay.props_for_class("Chien"), ["taille"])
+        self.assertEqual(overlay.value("rex", "Chien", "taille"), 40)
+        self.assertEqual(overlay.value("felix", "Animal", "masse"), 4.0)
+
+        self.assertTrue(self.wm.delete_instance("felix", "Animal"))
+        self.assertFalse(overlay.instance_exists("felix", "Animal"))
+        self.assertEqual(overlay.instances("Animal"), [])
+        self.assertEqual(len(self.wm), 6)
+
+    def test_unstaging_and_renames(self):
+        overlay = self.wm.overlay
+        self.wm.add_property("taille", "int")
+        self.wm.attach_property_to_class("Animal", "taille")
+        self.wm.set_value("felix", "Animal", "taille", 30)
+        self.assertTrue(self.wm.delete_property("taille"))  # ajout annulé avec ses dépendances
+        self.assertEqual(self.wm.changes, [])
+
+        self.assertTrue(self.wm.set_value("felix", "Animal", "masse", 5.0))
+        self.assertTrue(self.wm.modify_property("masse", new_name="poids"))
+        self.assertFalse(overlay.property_exists("masse"))
+        self.assertEqual(overlay.property_type("poids"), "float")
+        self.assertEqual(overlay.props_for_class("Animal"), ["poids"])
+        self.assertEqual(overlay.value("felix", "Animal", "poids"), 5.0)
+        self.assertEqual([c["data"]["prop"] for c in self.wm.changes if c["action"] == "set_value"], ["poids"])
+
+        self.assertTrue(self.wm.modify_property("poids", new_name="masse"))  # retour au nom en base
+        self.assertTrue(overlay.property_exists("masse"))
+        self.assertEqual([c["action"] for c in self.wm.changes], ["set_value"])
+
+    def test_submit_and_merge(self):
+        self.wm.add_class("Chien", parent="Animal")
+        self.wm.add_instance("rex", "Chien")
+        self.wm.set_value("rex", "Chien", "masse", "12")
+        self.wm.modify_property("masse", new_name="poids")
+        self.wm.delete_value("felix", "Animal", "poids")
+        self.wm.add_instance("tom", "Animal")
+        self.wm.delete_instance("tom", "Animal")
+        sid = self.wm.submit(1, "chiens")
+        self.assertEqual(len(self.wm), 0)
+        self.assertIsNone(self.wm.submit(1, "vide"))
+
+        report = self.kb.merge_submission(sid, 1)
+        self.assertTrue(report, report.failures())
+        self.assertEqual(self.kb.get_instance_value("rex", "Chien", "poids"), 12.0)
+        self.assertIsNone(self.kb.get_instance_value("felix", "Animal", "poids"))
+        self.assertFalse(self.kb.instance_exists("tom", "Animal"))
+
+
+class TestForwardEngine(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for prop in ("tension", "intensite", "puissance", "resistance"):
+            self.kb.add_property(prop, "float")
+            self.kb.link_property_to_class("Animal", prop)
+        self.kb.add_instance("circuit", "Animal")
+
+    def test_execute_writes_derived_values(self):
+        self.kb.set_instance_value("circuit", "Animal", "tension", 12.0)
+        self.kb.set_instance_value("circuit", "Animal", "intensite", 2.0)
+        event = self.kb.forward_engine.execute("circuit", "Animal")
+        self.assertEqual(event.event_type, "forward_done")
+        self.assertEqual(sorted(event.payload["derived"]), ["puissance", "resistance"])
+        self.assertEqual(self.kb.get_instance_value("circuit", "Animal", "puissance"), 24.0)
+        self.assertEqual(self.kb.get_instance_value("circuit", "Animal", "resistance"), 6.0)
+
+    def test_chained_inputs_and_first_rule_wins(self):
+        # resistance + intensite -> tension -> (tension, intensite) -> puissance par la 1re règle
+        agenda = self.kb.forward_engine.infer({"resistance": 3.0, "intensite": 2.0})
+        self.assertEqual(agenda.facts["tension"], 6.0)
+        self.assertEqual(agenda.facts["puissance"], 12.0)
+        self.assertNotIn("resistance", agenda.derived)
+        self.assertEqual(self.kb.forward_engine.infer({"tension": 1.0, "intensite": 0.0}).derived, {"puissance": 0.0})
+
+    def test_long_chain_without_iteration_cap(self):
+        from core.inference import ForwardEngine
+        engine = ForwardEngine(self.kb)
+        calls = []
+        for k in range(100, 0, -1):  # ordre inverse : une règle par "passe" dans l'ancien moteur
+            engine.add_rule([f"x{k - 1}"], f"x{k}", lambda v: calls.append(1) or v + 1)
+        for k in range(500):  # règles sans rapport : jamais évaluées
+            engine.add_rule([f"y{k}", "z"], f"w{k}", lambda a, b: calls.append(1) or a + b)
+        agenda = engine.infer({"x0": 0})
+        self.assertEqual(agenda.facts["x100"], 100)
+        self.assertEqual(len(calls), 100)
+        self.assertEqual(agenda.fired, 100)
+
+    def test_execute_class_batch(self):
+        with self.kb.transaction():
+            for k in range(1, 51):
+                self.kb.add_instance(f"c{k}", "Animal")
+                self.kb.set_instance_value(f"c{k}", "Animal", "tension", 10.0 * k)
+                self.kb.set_instance_value(f"c{k}", "Animal", "intensite", 2.0)
+        statements = []
+        self.kb.conn.set_trace_callback(statements.append)
+        summaries = self.kb.forward_engine.execute_class("Animal")
+        self.kb.conn.set_trace_callback(None)
+
+        self.assertEqual(len(summaries), 51)
+        self.assertEqual(summaries["circuit"], {"fired": 0, "derived": {}, "written": []})
+        self.assertEqual(summaries["c3"]["derived"], {"puissance": 60.0, "resistance": 15.0})
+        self.assertEqual(sorted(summaries["c3"]["written"]), ["puissance", "resistance"])
+        self.assertEqual(self.kb.get_instance_value("c50", "Animal", "puissance"), 1000.0)
+        self.assertEqual(self.kb.get_thresholds("Animal", "puissance")["M"], 510.0)  # stats recalculées
+        self.assertFalse([q for q in statements if "LOWER(name) = LOWER(" in q])  # pas d'écriture par valeur
+        self.assertLess(len([q for q in statements if "seprop_stats" in q]), 10)
+
+    def test_execute_many_matches_execute(self):
+        self.kb.add_instance("autre", "Animal")
+        for inst in ("circuit", "autre"):
+            self.kb.set_instance_value(inst, "Animal", "resistance", 4.0)
+            self.kb.set_instance_value(inst, "Animal", "intensite", 3.0)
+        summaries = self.kb.forward_engine.execute_many([("circuit", "Animal")])
+        self.assertEqual(list(summaries), [("circuit", "Animal")])
+        self.assertEqual(summaries[("circuit", "Animal")]["derived"], {"tension": 12.0, "puissance": 36.0})
+        self.kb.forward_engine.execute("autre", "Animal")
+        self.assertEqual(self.kb.get_instance_values("autre", "Animal"), self.kb.get_instance_values("circuit", "Animal"))
+
+    def _assert_batch_matches_scalar(self, engine, facts):
+        batch = engine.infer_many(facts)
+        for key, row in facts.items():
+            agenda = engine.infer(row)
+            fired, derived = batch[key]
+            self.assertEqual(fired, agenda.fired, key)
+            self.assertEqual(set(derived), set(agenda.derived), key)
+            for prop, value in agenda.derived.items():
+                self.assertIs(type(derived[prop]), type(value), (key, prop))
+                if isinstance(value, float):
+                    self.assertAlmostEqual(derived[prop], value, places=6)
+                else:
+                    self.assertEqual(derived[prop], value)
+        return batch
+
+    def test_vectorized_matches_scalar(self):
+        import random
+        from core.vector_agenda import infer_vectorized
+        engine = self.kb.forward_engine
+        rng = random.Random(7)
+        facts = {}
+        for k in range(300):
+            row = {}
+            for prop in ("tension", "intensite", "resistance", "puissance"):
+                if rng.random() < 0.5:
+                    row[prop] = rng.choice([0.0, 0, rng.uniform(-50, 50), rng.randint(1, 20)])
+            facts[k] = row
+        self.assertEqual(len(infer_vectorized(engine, facts)), 300)  # division par zéro comprise
+        self._assert_batch_matches_scalar(engine, facts)
+
+        # Règle non vectorisée (repli ligne par ligne) au résultat non numérique, entrée texte
+        engine.add_rule(["puissance"], "classe_puissance", lambda p: "forte" if p > 100 else "faible")
+        engine.add_rule(["resistance"], "conductance", lambda r: 1 / r)  # lève pour r == 0 : non comptée
+        facts["texte"] = {"tension": "12", "intensite": 2}
+        batch = self._assert_batch_matches_scalar(engine, facts)
+        self.assertEqual(batch["texte"][1], {"puissance": 1212.0})  # "12" * 2, float par le codec
+
+    def test_vectorized_parity_counts_and_types(self):
+        import math
+        from core.vector_agenda import infer_vectorized
+        self.kb.add_property("energie", "int")
+
+        def no_vector(*args):
+            raise TypeError("forme tableau indisponible")
+
+        engine = self.kb.forward_engine
+        engine.add_rule(["puissance"], "energie", lambda p: p * 3, vectorized=True)
+        engine.add_rule(["energie"], "log_energie", lambda e: math.log(e), vectorized=no_vector)
+        facts = {k: {"tension": 230, "intensite": k - 2} for k in range(6)}  # énergie <= 0 : log lève
+        facts["float"] = {"tension": 1.5, "intensite": 3}
+
+        vector = infer_vectorized(engine, facts)
+        scalar = {key: (agenda.fired, agenda.derived) for key, agenda in
+                  ((key, engine.infer(row)) for key, row in facts.items())}
+        self.assertEqual(set(vector), set(scalar))
+        for key, (fired, derived) in scalar.items():
+            self.assertEqual(vector[key][0], fired, key)
+            self.assertEqual({p: (type(v), round(v, 6)) for p, v in vector[key][1].items()},
+                             {p: (type(v), round(v, 6)) for p, v in derived.items()}, key)
+        self.assertEqual(vector[4][1]["energie"], 1380)  # int, pas 1380.0
+        self.assertEqual(vector[4][1]["puissance"], 460.0)
+        self.assertNotIn("log_energie", vector[0][1])
+        self.assertEqual(engine.infer_many(facts), vector)
+
+
+class TestParallelInference(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self._populate(self.kb)
+
+    def _populate(self, kb):
+        self.quiet(kb.add_class, "Moteur", "Animal")
+        for prop in ("tension", "intensite", "puissance", "resistance"):
+            kb.add_property(prop, "float")
+            self.quiet(kb.link_property_to_class, "Animal", prop)
+        records = []
+        for k in range(120):
+            values = {"tension": 10.0 * k, "intensite": float(k % 7)}
+            if k % 5 == 0:
+                values = {"resistance": 2.0 + k, "intensite": 3.0}
+            records.append({"class": "Moteur" if k % 2 else "Animal", "instance": f"m{k}", "values": values})
+        kb.bulk_load(records)
+
+    def _snapshot(self, kb):
+        return kb.conn.execute("""
+            SELECT i.name, p.name, v.value FROM seinst_value v
+            JOIN seinst i ON i.id = v.inst_id JOIN seprop p ON p.id = v.prop_id
+            ORDER BY i.name, p.name
+        """).fetchall()
+
+    def _other_kb(self, name):
+        with redirect_stdout(StringIO()):
+            kb = KnowledgeBase(os.path.join(self.tmpdir.name, name))
+        self.addCleanup(kb.close)
+        self._populate(kb)
+        return kb
+
+    def test_matches_serial_and_is_deterministic(self):
+        progress = []
+        report = self.kb.run_parallel_inference(workers=2, shard_size=16, on_progress=progress.append)
+        parallel = self._snapshot(self.kb)
+        self.assertEqual(report["shards"], 8)  # 60 + 60 instances, tranches de 16
+        self.assertEqual([e.payload["done"] for e in progress], list(range(1, 9)))
+        self.assertEqual(report["instances"], 120)
+        self.assertGreater(report["written"], 0)
+        self.assertEqual(report["written"], report["derived"])
+        self.assertEqual(self.kb.get_instance_value("m5", "Moteur", "tension"), 21.0)  # 7 * 3 déduit
+
+        serial = self._other_kb("serial.db")
+        for class_name in ("Animal", "Moteur"):
+            serial.forward_engine.execute_class(class_name)
+        self.assertEqual(self._snapshot(serial), parallel)
+
+        in_process = self._other_kb("in_process.db")
+        again = in_process.run_parallel_inference(workers=0, shard_size=50)
+        self.assertEqual(self._snapshot(in_process), parallel)
+        self.assertEqual((again["instances"], again["written"]), (120, report["written"]))
+        self.assertEqual(in_process.get_thresholds("Moteur", "puissance"), serial.get_thresholds("Moteur", "puissance"))
+
+    def test_class_filter_and_guards(self):
+        report = self.kb.run_parallel_inference(["moteur"], workers=0)
+        self.assertEqual((report["shards"], report["instances"]), (1, 60))
+        self.assertIsNone(self.kb.get_instance_value("m0", "Animal", "puissance"))
+        with self.kb.transaction():
+            with self.assertRaises(RuntimeError):
+                self.kb.run_parallel_inference()
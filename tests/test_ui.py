@@ -60,12 +60,8 @@ class TestConsoleUI(unittest.TestCase):
 
     def test_show_tree(self):
         class MockKB:
-            def get_hierarchy(self):
-                return [(1, "Class1", None, 0)]  # Simple mock data
-            def get_all_props_for_class(self, name):
-                return []
-            def get_all_instances(self, name):
-                return []
+            def get_hierarchy_summary(self):
+                return [(1, "Class1", None, 0, 0, 0)]  # Simple mock data
 
         with redirect_stdout(StringIO()) as output:
             self.ui.show_tree(MockKB())
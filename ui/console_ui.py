@@ -17,6 +17,7 @@ from core.models.answer import Answer
 class ConsoleUI(BaseUI):
     def __init__(self):
         self.console = Console()
+        self.controller = None
 
     def handle_event(self, event: Event):
         style = "green" if event.severity == Severity.INFO else "yellow" if event.severity == Severity.WARNING else "red"
@@ -69,15 +70,13 @@ class ConsoleUI(BaseUI):
             self.console.print("[red]Invalide[/]")
 
     def show_tree(self, kb):
-        data = kb.get_hierarchy()
+        data = kb.get_hierarchy_summary()  # compteurs inclus : une seule requête
         if not data:
             self.console.print(Panel("Aucune classe", style="yellow"))
             return
         tree = Tree("[bold blue]=== CLASSES ===[/]")
         nodes = {}
-        for cid, name, pid, level in data:
-            props = len(kb.get_all_props_for_class(name))
-            insts = len(kb.get_all_instances(name))
+        for cid, name, pid, level, props, insts in data:
             label = f"[green]{name}[/] — {props} props — {insts} inst."
             if pid is None:
                 node = tree.add(label)
@@ -87,6 +86,12 @@ class ConsoleUI(BaseUI):
             nodes[cid] = node
         self.console.print(tree)
 
+    def load_instance_values(self, inst_name, class_name):
+        kb = self.controller.kb
+        values = kb.get_instance_values(inst_name, class_name)
+        rows = [(prop, str(value) if value is not None else "None") for prop, value in values.items()]
+        self.show_table(f"Valeurs de {inst_name}", ["Propriété", "Valeur"], rows)
+
     def prompt_choice(self, prompt, choices, default=None):
         return Prompt.ask(prompt, choices=choices, default=default)
 
@@ -1,8 +1,9 @@
 # ui/pyqt_ui.py (version fonctionnelle : fenêtre principale active, menu cliquable, questions non-bloquantes)
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QMessageBox, QInputDialog, QTreeWidget, QTableWidget, QMenuBar, QWidget, QVBoxLayout, QLabel, QTabWidget, QStatusBar , QDialog, QFormLayout, QLineEdit, QPushButton,QComboBox,QTableWidgetItem, QTreeWidgetItem)
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QMessageBox, QInputDialog, QTreeWidget, QTableWidget, QMenuBar, QWidget, QVBoxLayout, QLabel, QTabWidget, QStatusBar , QDialog, QFormLayout, QLineEdit, QPushButton,QComboBox,QTableWidgetItem, QTreeWidgetItem, QTableView)
 from PyQt6.QtGui import QAction
 from PyQt6.QtCore import Qt
 from .base_ui import BaseUI
+from .table_model import LazyTableModel, StaticTableModel
 from core.models.event import Event, Severity
 from core.models.question import Question
 from core.models.answer import Answer
@@ -113,7 +114,14 @@ class PyQtUI(BaseUI):
         self.table_combo.currentTextChanged.connect(self.load_table)
         table_layout.addWidget(self.table_combo)
         
-        self.table_widget = QTableWidget()
+        self.table_search = QLineEdit()
+        self.table_search.setPlaceholderText("Filtrer...")
+        self.table_search.returnPressed.connect(self.filter_table)
+        table_layout.addWidget(self.table_search)
+
+        # QTableView + modèle paresseux : seules les lignes visibles sont chargées (ui/table_model.py)
+        self.table_widget = QTableView()
+        self.table_widget.setSortingEnabled(True)  # tri délégué au modèle (ORDER BY SQL)
         table_layout.addWidget(self.table_widget)
         self.dashboard.addTab(self.table_tab, "Tables")
         #if self.table_combo.count() > 0:
@@ -214,43 +222,26 @@ class PyQtUI(BaseUI):
             return
 
         kb = self.controller.kb
-        columns = []
-        rows = []
-
-        if table_name == "Classes":
-            columns = ["ID", "Name", "Parent Name"]
-            rows = kb.get_all_classes()
-
-        elif table_name == "Instances":
-            columns = ["ID", "Name", "Class Name"]
-            rows = kb.get_all_instances_global()
-
-        elif table_name == "Props":
-            # Cas filtré : on veut les propriétés d'une classe spécifique
-            class_filter = filter_data.get("class_name")
-            if class_filter:
-                columns = ["Name", "Type"]  # Plus léger, pas besoin d'ID ici
-                prop_names = kb.get_all_props_for_class(class_filter)
-                rows = []
-                for name in prop_names:
-                    ptype = kb.get_property_type(name) or "string"
-                    rows.append((name, ptype))
-                title = f"Propriétés de {class_filter}"
-            else:
-                # Cas global : toutes les propriétés
-                columns = ["ID", "Name", "Type"]
-                rows = kb.get_all_properties()
-                title = "Table: Props"
-
-        elif table_name == "Events":
-            columns = ["ID", "Type", "Source", "Entity", "Payload", "Severity", "Timestamp"]
-            rows = kb.get_all_events(limit=100)
-            title = "Table: Events"
-
-        else:
+        # Cas filtré : propriétés d'une classe spécifique (héritées comprises)
+        class_filter = filter_data.get("class_name") if table_name == "Props" else None
+        source = kb.table_source(table_name, class_name=class_filter)
+        if source is None:
             return  # Table inconnue
 
-        self.show_table(title if 'title' in locals() else f"Table: {table_name}", columns, rows)
+        title = f"Propriétés de {class_filter}" if class_filter else f"Table: {table_name}"
+        model = LazyTableModel(source)
+        if self.table_search.text().strip():
+            model.set_search(self.table_search.text())
+        self.table_widget.setModel(model)
+        self.dashboard.setCurrentWidget(self.table_tab)
+        self.dashboard.setTabText(self.dashboard.indexOf(self.table_tab), title)
+        self.status_bar.showMessage(f"{title} : {model.total_count()} lignes", 5000)
+
+    def filter_table(self):
+        # Filtre texte -> WHERE ... LIKE (modèle paresseux uniquement)
+        model = self.table_widget.model()
+        if isinstance(model, LazyTableModel):
+            model.set_search(self.table_search.text())
     
     # Add method to load instance values
     def load_instance_values(self, inst_name, class_name):
@@ -258,12 +249,9 @@ class PyQtUI(BaseUI):
             print(f"Loading values for instance '{inst_name}' in class '{class_name}'")
 
         kb = self.controller.kb
-        props = kb.get_all_props_for_class(class_name)
+        values = kb.get_instance_values(inst_name, class_name)  # une seule requête
         columns = ["Propriété", "Valeur"]
-        rows = []
-        for prop in props:
-            value = kb.get_instance_value(inst_name, class_name, prop)
-            rows.append((prop, str(value) if value is not None else "None"))
+        rows = [(prop, str(value) if value is not None else "None") for prop, value in values.items()]
 
         self.values_tab.setRowCount(len(rows))
         self.values_tab.setColumnCount(len(columns))
@@ -279,23 +267,19 @@ class PyQtUI(BaseUI):
     def show_table(self, title, columns, rows):
         if DEBUG:
             print(f"Entering show_table with title '{title}', {len(columns)} columns, {len(rows)} rows")        
-        self.table_widget.setRowCount(len(rows))
-        self.table_widget.setColumnCount(len(columns))
-        self.table_widget.setHorizontalHeaderLabels(columns)
-        for i, row in enumerate(rows):
-            for j, val in enumerate(row):
-                self.table_widget.setItem(i, j, QTableWidgetItem(str(val)))
+        self.table_widget.setModel(StaticTableModel(columns, rows))
         self.dashboard.setCurrentWidget(self.table_tab)
         self.dashboard.setTabText(self.dashboard.indexOf(self.table_tab), title)
 
     def show_tree(self, kb):
         self.tree_tab.clear()
         self.tree_tab.setHeaderLabel("Classes")
-        data = kb.get_hierarchy()
+        data = kb.get_hierarchy_summary()  # compteurs inclus : une seule requête
         root = self.tree_tab.invisibleRootItem()
         nodes = {}
-        for cid, name, pid, level in data:
-            label = f"{name} — props: {len(kb.get_all_props_for_class(name))} — inst: {len(kb.get_all_instances(name))}"
+        self.tree_tab.setUpdatesEnabled(False)  # pas de repaint par nœud
+        for cid, name, pid, level, props, insts in data:
+            label = f"{name} — props: {props} — inst: {insts}"
             item = QTreeWidgetItem([label])
             if pid is None:
                 root.addChild(item)
@@ -303,6 +287,7 @@ class PyQtUI(BaseUI):
                 parent = nodes[pid]
                 parent.addChild(item)
             nodes[cid] = item
+        self.tree_tab.setUpdatesEnabled(True)
         self.dashboard.setCurrentWidget(self.tree_tab)
 
 
@@ -0,0 +1,107 @@
+# ui/table_model.py
+"""
+Modèles de table pour le dashboard PyQt (QTableView)
+
+- LazyTableModel   : lignes chargées page par page (KeysetQuery, core/paging.py)
+                     via canFetchMore / fetchMore quand la vue défile ;
+                     tri (clic d'en-tête) et filtre texte exécutés en SQL.
+- StaticTableModel : lignes déjà en mémoire (show_table du controller),
+                     sans QTableWidgetItem par cellule.
+"""
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class LazyTableModel(QAbstractTableModel):
+    def __init__(self, source, page_size=200, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.page_size = page_size
+        self._rows = []
+        self._cursor = None
+        self._exhausted = False
+        self._load_first_page()
+
+    # ========== CHARGEMENT ==========
+
+    def _load_first_page(self):
+        self._rows, self._cursor = self.source.page(limit=self.page_size)
+        self._exhausted = self._cursor is None
+
+    def reload(self):
+        self.beginResetModel()
+        self._load_first_page()
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        rows, self._cursor = self.source.page(after=self._cursor, limit=self.page_size)
+        self._exhausted = self._cursor is None
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    # ========== TRI / FILTRE (SQL) ==========
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.source.set_sort(self.source.columns[column], descending=order == Qt.SortOrder.DescendingOrder)
+        self.reload()
+
+    def set_search(self, text):
+        self.source.set_search(text)
+        self.reload()
+
+    def total_count(self):
+        return self.source.count()
+
+    # ========== QAbstractTableModel ==========
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.source.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.source.columns[section]
+        return str(section + 1)
+
+
+class StaticTableModel(QAbstractTableModel):
+    def __init__(self, columns, rows, parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.rows = list(rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return str(self.rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section]
+        return str(section + 1)